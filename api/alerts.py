@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from auth.token import get_current_time
+
+cooldown_periods = {
+    "blink": timedelta(minutes=1),
+    "sitting": timedelta(minutes=1),
+    "distance": timedelta(minutes=1),
+    "thoracic": timedelta(minutes=1),
+    "time_limit_exceed": timedelta(minutes=1),
+}
+
+
+def prepare_alert(detector):
+    """Prepare a combined alert dictionary based on the detector's results."""
+    alert = detector.get_alert()
+    return {
+        "blink": alert.get("blink_alert", False),
+        "sitting": alert.get("sitting_alert", False),
+        "distance": alert.get("distance_alert", False),
+        "thoracic": alert.get("thoracic_alert", False),
+    }
+
+
+def should_send_alert(alert, cooldown_periods, send_alert_time_track):
+    current_time = get_current_time()
+    alert_result = {}
+    for i in cooldown_periods:
+        if alert[i + "_alert"] and send_alert_time_track[i]["send"] is False:
+            send_alert_time_track[i]["send"] = True
+            send_alert_time_track[i]["last_time"] = current_time
+            alert_result[i] = True
+            print(i + ": alert")
+        elif alert[i + "_alert"] is False and send_alert_time_track[i]["send"]:
+            send_alert_time_track[i]["send"] = False
+            send_alert_time_track[i]["last_time"] = None
+            print(i + ": stop alert")
+        elif (alert[i + "_alert"] and send_alert_time_track[i]["send"]) and (
+            (send_alert_time_track[i]["last_time"] + cooldown_periods[i]) < current_time
+        ):
+            send_alert_time_track[i]["last_time"] = current_time
+            alert_result[i] = True
+            print(i + ": alert Again?")
+    return alert_result
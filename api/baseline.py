@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.crud import get_posture_baseline, upsert_posture_baseline
+
+logger = logging.getLogger(__name__)
+
+# Staleness rules for stored baselines
+BASELINE_MAX_AGE = timedelta(days=30)
+BASELINE_MAX_SAMPLES = 10  # Cap on the running-average weight of past sessions
+SHOULDER_DRIFT_TOLERANCE = 0.05  # Same scale as detection.thoracic_threshold
+DIAMETER_DRIFT_TOLERANCE = 0.10  # Same ratio as the relative distance alert
+
+
+def baseline_to_correct_values(baseline):
+    return {
+        "shoulderPosition": baseline.shoulder_position,
+        "diameterRight": baseline.diameter_right,
+        "diameterLeft": baseline.diameter_left,
+    }
+
+
+def warm_start_values(baseline):
+    """Correct values a detector starts from, or None if there is no usable baseline."""
+    if baseline is None or is_baseline_stale(baseline):
+        return None
+    return baseline_to_correct_values(baseline)
+
+
+def is_baseline_stale(baseline, now=None):
+    """A stored baseline is unusable once it is too old or has no shoulder value."""
+    now = now or datetime.now()
+    if baseline.shoulder_position is None:
+        return True
+    return baseline.updated_at is None or now - baseline.updated_at > BASELINE_MAX_AGE
+
+
+def has_baseline_drifted(stored_values, session_values):
+    """Compare a stored baseline with the one measured in the current session."""
+    stored_shoulder = stored_values.get("shoulderPosition")
+    session_shoulder = session_values.get("shoulderPosition")
+    if stored_shoulder is not None and session_shoulder is not None:
+        if abs(stored_shoulder - session_shoulder) > SHOULDER_DRIFT_TOLERANCE:
+            return True
+
+    for key in ("diameterRight", "diameterLeft"):
+        stored = stored_values.get(key)
+        current = session_values.get(key)
+        if (
+            stored
+            and current
+            and abs(current - stored) / stored > (DIAMETER_DRIFT_TOLERANCE)
+        ):
+            return True
+    return False
+
+
+def merge_baseline(stored_values, sample_count, session_values):
+    """Fold a session baseline into the stored running average."""
+    weight = min(sample_count, BASELINE_MAX_SAMPLES - 1)
+    merged = {}
+    for key, current in session_values.items():
+        stored = stored_values.get(key)
+        if stored is None or current is None:
+            merged[key] = current if current is not None else stored
+        else:
+            merged[key] = (stored * weight + current) / (weight + 1)
+    return merged, weight + 1
+
+
+class BaselineTracker:
+    """
+    Warm-starts a detector from a stored baseline and measures the session's own
+    baseline from its first `correct_frame` frames, so the stored value can be
+    refined afterwards or replaced when it has drifted.
+    """
+
+    def __init__(self, detector, stored_baseline=None):
+        self.detector = detector
+        self.stored_baseline = stored_baseline
+        self.stored_values = None
+        self.session_values = None
+        self.drifted = False
+        self._saved_values = []
+
+        self.stored_values = warm_start_values(stored_baseline)
+        if self.stored_values is not None:
+            detector.load_correct_value(self.stored_values)
+
+    @property
+    def warm_started(self):
+        return self.stored_values is not None
+
+    def get_state(self):
+        return {
+            "stored_values": self.stored_values,
+            "session_values": self.session_values,
+            "drifted": self.drifted,
+            "saved_values": list(self._saved_values),
+        }
+
+    def load_state(self, state):
+        self.stored_values = state["stored_values"]
+        self.session_values = state["session_values"]
+        self.drifted = state["drifted"]
+        self._saved_values = list(state["saved_values"])
+
+    def observe(self, current_values):
+        """Returns True when the detector was recalibrated from the session."""
+        if self.session_values is not None:
+            return False
+
+        if not self.warm_started:
+            if self.detector.is_calibrated():
+                self.session_values = self.detector.correct_values
+            return False
+
+        self._saved_values.append(current_values)
+        if len(self._saved_values) < self.detector.correct_frame:
+            return False
+
+        self.session_values = self.detector.compute_correct_value(self._saved_values)
+        self._saved_values = []
+        if has_baseline_drifted(self.stored_values, self.session_values):
+            logger.info("Stored posture baseline drifted; recalibrating from session.")
+            self.drifted = True
+            self.detector.load_correct_value(self.session_values)
+        return self.drifted
+
+
+def load_stored_baseline(db, user_id, device_identifier):
+    """The stored baseline for the user's device, or None."""
+    if not device_identifier:
+        return None
+    try:
+        return get_posture_baseline(db, user_id, device_identifier)
+    except SQLAlchemyError as e:
+        logger.error(f"Error loading posture baseline: {e}")
+        return None
+
+
+def load_baseline_tracker(db, detector, user_id, device_identifier):
+    """Build a tracker for the user's device, warm-started when a baseline exists."""
+    return BaselineTracker(
+        detector, load_stored_baseline(db, user_id, device_identifier)
+    )
+
+
+def stored_baseline_values(db, user_id, device_identifier):
+    """Correct values a new session on the user's device would start from."""
+    return warm_start_values(load_stored_baseline(db, user_id, device_identifier))
+
+
+def save_session_baseline(db, user_id, device_identifier, tracker):
+    """Persist the session baseline, refining or replacing the stored one."""
+    if not device_identifier or tracker.session_values is None:
+        return
+
+    stored = tracker.stored_baseline
+    if stored is None or tracker.drifted or is_baseline_stale(stored):
+        values, sample_count = dict(tracker.session_values), 1
+    else:
+        values, sample_count = merge_baseline(
+            baseline_to_correct_values(stored),
+            stored.sample_count,
+            tracker.session_values,
+        )
+    upsert_posture_baseline(db, user_id, device_identifier, values, sample_count)
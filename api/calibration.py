@@ -1,10 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import cv2 as cv
 import logging
-from pathlib import Path
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Corner detection runs in threads; OpenCV releases the GIL while it works
+CALIBRATION_WORKERS = int(os.getenv("CALIBRATION_WORKERS", "4"))
+# Boards are located on a copy downscaled to this width; 0 searches full resolution
+CALIBRATION_DETECT_WIDTH = int(os.getenv("CALIBRATION_DETECT_WIDTH", "960"))
+
 CHESSBOARD_SIZE = (8, 5)
 SQUARE_SIZE_MM = 20
 
@@ -13,41 +20,168 @@ OBJP = np.zeros((CHESSBOARD_SIZE[0] * CHESSBOARD_SIZE[1], 3), np.float32)
 OBJP[:, :2] = np.mgrid[0 : CHESSBOARD_SIZE[0], 0 : CHESSBOARD_SIZE[1]].T.reshape(-1, 2)
 OBJP *= SQUARE_SIZE_MM
 
+# Calibration target used unless a request names one
+CALIBRATION_BOARD = os.getenv("CALIBRATION_BOARD", "chessboard")
+CALIBRATION_BOARDS = ("chessboard", "charuco")
+
+# ChArUco board with the chessboard's inner corners; its ArUco markers identify
+# each corner, so a partly hidden or cropped board still yields corners
+CHARUCO_SIZE = (CHESSBOARD_SIZE[0] + 1, CHESSBOARD_SIZE[1] + 1)  # Squares
+CHARUCO_MARKER_MM = 15
+CHARUCO_DICTIONARY = cv.aruco.DICT_5X5_100
+CHARUCO_MIN_CORNERS = 6
+CHARUCO_BOARD = cv.aruco.CharucoBoard(
+    CHARUCO_SIZE,
+    SQUARE_SIZE_MM,
+    CHARUCO_MARKER_MM,
+    cv.aruco.getPredefinedDictionary(CHARUCO_DICTIONARY),
+)
+
 # Criteria for cornerSubPix
 CRITERIA = (cv.TERM_CRITERIA_EPS + cv.TERM_CRITERIA_MAX_ITER, 50, 0.001)
 
 
 def calibrate_camera(image_paths):
-    objpoints, imgpoints = [], []
-    frame_size, valid_images, skipped_images = None, 0, 0
+    """Calibrate from image files, e.g. uploads kept for debugging."""
+    return calibrate_images(
+        (image_path, cv.imread(str(image_path), cv.IMREAD_GRAYSCALE))
+        for image_path in image_paths
+    )
+
+
+def downscale(gray, detect_width):
+    """Copy of the image at most `detect_width` wide to search for the board on."""
+    if not detect_width or gray.shape[1] <= detect_width:
+        return gray
+    scale = detect_width / gray.shape[1]
+    return cv.resize(gray, None, fx=scale, fy=scale, interpolation=cv.INTER_AREA)
+
+
+def refine_corners(gray, search, corners):
+    """Map corners found on `search` back to `gray` and refine them there."""
+    corners = corners.reshape(-1, 1, 2).astype(np.float32)
+    if search is not gray:
+        # Scale about pixel centres: (x + 0.5) maps to (x + 0.5) * factor
+        factor = np.divide(gray.shape[::-1], search.shape[::-1], dtype=np.float32)
+        corners = (corners + 0.5) * factor - 0.5
+    return cv.cornerSubPix(gray, corners, (11, 11), (-1, -1), CRITERIA)
+
+
+def find_corners(gray, detect_width=CALIBRATION_DETECT_WIDTH):
+    """
+    Refined chessboard corners of a grayscale image, or None if not found.
+
+    The board is located on a copy downscaled to `detect_width`, with the fast
+    check rejecting images without a board early (a full-resolution search of
+    an empty 4K frame takes minutes). The corners are then mapped back and
+    refined with cornerSubPix on the full-resolution image.
+    """
+    flags = cv.CALIB_CB_ADAPTIVE_THRESH | cv.CALIB_CB_NORMALIZE_IMAGE
+    if detect_width:
+        flags |= cv.CALIB_CB_FAST_CHECK
+    search = downscale(gray, detect_width)
+    ret, corners = cv.findChessboardCorners(search, CHESSBOARD_SIZE, flags=flags)
+    if not ret:
+        return None
+    return refine_corners(gray, search, corners)
+
+
+_charuco = threading.local()  # One detector per detection thread
+
+
+def find_charuco_corners(gray, detect_width=CALIBRATION_DETECT_WIDTH):
+    """
+    (object points, image points) of the ChArUco corners in a grayscale image,
+    or None if too few were found to constrain the pose. Markers are found on
+    a copy downscaled to `detect_width`, as for the chessboard.
+    """
+    detector = getattr(_charuco, "detector", None)
+    if detector is None:
+        detector = _charuco.detector = cv.aruco.CharucoDetector(CHARUCO_BOARD)
+    search = downscale(gray, detect_width)
+    corners, ids, _, _ = detector.detectBoard(search)
+    if ids is None or len(ids) < CHARUCO_MIN_CORNERS:
+        return None
+    # Corners along a single row or column leave the view's pose undetermined
+    rows, columns = np.divmod(ids.ravel(), CHESSBOARD_SIZE[0])
+    if len(set(rows)) < 2 or len(set(columns)) < 2:
+        return None
+    objp, _ = CHARUCO_BOARD.matchImagePoints(corners, ids)
+    return objp.reshape(-1, 3), refine_corners(gray, search, corners)
+
+
+def detect_board(gray, board=CALIBRATION_BOARD, detect_width=CALIBRATION_DETECT_WIDTH):
+    """(object points, image points) of the calibration board, or None."""
+    if board == "charuco":
+        return find_charuco_corners(gray, detect_width)
+    corners = find_corners(gray, detect_width)
+    return None if corners is None else (OBJP, corners)
+
+
+def render_board(board=CALIBRATION_BOARD, pixels_per_mm=4):
+    """Printable image of a calibration board, with a one-square margin."""
+    margin = SQUARE_SIZE_MM * pixels_per_mm
+    if board == "charuco":
+        size = np.array(CHARUCO_SIZE) * margin + 2 * margin
+        return CHARUCO_BOARD.generateImage(tuple(size), marginSize=margin)
 
-    for image_path in image_paths:
-        img = cv.imread(str(image_path))
-        if img is None:
-            logger.error(f"Failed to load image: {image_path}")
+    squares = np.indices(CHARUCO_SIZE[::-1]).sum(axis=0) % 2
+    image = np.where(squares == 0, 0, 255).astype(np.uint8)
+    image = np.kron(image, np.ones((margin, margin), np.uint8))
+    return cv.copyMakeBorder(image, *[margin] * 4, cv.BORDER_CONSTANT, value=255)
+
+
+class CalibrationCancelled(Exception):
+    """Raised when a calibration is cancelled between images."""
+
+
+def calibrate_images(
+    images,
+    executor=None,
+    detect_width=CALIBRATION_DETECT_WIDTH,
+    cancelled=None,
+    board=CALIBRATION_BOARD,
+):
+    """
+    Calibrate from (name, grayscale array) pairs; None marks an unreadable image.
+    Corners of `board` are detected on `executor` (the shared calibration pool by
+    default), and objpoints/imgpoints keep the order of `images` whatever the
+    worker count. Setting the `cancelled` event stops the work at the next image.
+    """
+    frame_size, candidates, skipped_images = None, [], 0
+
+    for name, gray in images:
+        if gray is None:
+            logger.error(f"Failed to load image: {name}")
             continue
 
-        gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
         if frame_size is None:
             frame_size = gray.shape[::-1]
         elif gray.shape[::-1] != frame_size:
-            logger.warning(f"Image {image_path} has a different size. Skipping.")
+            logger.warning(f"Image {name} has a different size. Skipping.")
             skipped_images += 1
             continue
+        candidates.append((name, gray))
 
-        # Find chessboard corners
-        ret, corners = cv.findChessboardCorners(
-            gray,
-            CHESSBOARD_SIZE,
-            flags=cv.CALIB_CB_ADAPTIVE_THRESH | cv.CALIB_CB_NORMALIZE_IMAGE,
-        )
-        if ret:
-            objpoints.append(OBJP)
-            corners2 = cv.cornerSubPix(gray, corners, (11, 11), (-1, -1), CRITERIA)
-            imgpoints.append(corners2)
+    # Find board corners
+    executor = executor or get_calibration_executor()
+    grays = [gray for _, gray in candidates]
+
+    def detect(gray):
+        if cancelled is not None and cancelled.is_set():
+            raise CalibrationCancelled()
+        return detect_board(gray, board, detect_width)
+
+    detected = executor.map(detect, grays) if executor else map(detect, grays)
+
+    objpoints, imgpoints, valid_images = [], [], 0
+    for (name, _), points in zip(candidates, detected):
+        if points is not None:
+            objpoints.append(points[0])
+            imgpoints.append(points[1])
             valid_images += 1
         else:
-            logger.warning(f"Chessboard not found in image: {image_path}")
+            logger.warning(f"No {board} found in image: {name}")
             skipped_images += 1
 
     if not objpoints or not imgpoints:
@@ -55,9 +189,13 @@ def calibrate_camera(image_paths):
         return None
 
     logger.info(
-        f"Found chessboard in {valid_images} images; Skipped {skipped_images} images."
+        f"Found {board} in {valid_images} images; Skipped {skipped_images} images."
     )
+    return solve_calibration(objpoints, imgpoints, frame_size)
+
 
+def solve_calibration(objpoints, imgpoints, frame_size):
+    """Run calibrateCamera on detected corners and return the calibration data."""
     # Perform camera calibration
     ret, camera_matrix, dist_coeffs, rvecs, tvecs = cv.calibrateCamera(
         objpoints, imgpoints, frame_size, None, None
@@ -88,8 +226,24 @@ def calculate_reprojection_error(
         imgpoints_proj, _ = cv.projectPoints(
             objp, rvec, tvec, camera_matrix, dist_coeffs
         )
-        total_error += np.sum((imgp - imgpoints_proj) ** 2)
+        # Corners are (N, 1, 2) or (N, 2) depending on the OpenCV version
+        total_error += np.sum(
+            (imgp.reshape(-1, 2) - imgpoints_proj.reshape(-1, 2)) ** 2
+        )
         total_points += len(imgpoints_proj)
 
     mean_error = np.sqrt(total_error / total_points)
-    return mean_error
+    return float(mean_error)
+
+
+_executor = None
+
+
+def get_calibration_executor():
+    """Per-worker thread pool for corner detection, or None to run inline."""
+    global _executor
+    if _executor is None and CALIBRATION_WORKERS > 1:
+        _executor = ThreadPoolExecutor(
+            max_workers=CALIBRATION_WORKERS, thread_name_prefix="calibration"
+        )
+    return _executor
@@ -0,0 +1,138 @@
+"""
+Bounded queue for camera calibrations.
+
+A calibration holds OpenCV busy for seconds, so at most CALIBRATION_CONCURRENCY
+run at a time on a worker, each on a thread of its own with corner detection on
+the shared calibration pool; the event loop only waits. Further requests wait
+in FIFO order and are told their queue position as it changes, and requests
+beyond CALIBRATION_MAX_PENDING are turned away. A caller that disconnects
+leaves the queue, or stops its running calibration at the next image.
+
+    CALIBRATION_CONCURRENCY=2
+    CALIBRATION_MAX_PENDING=16
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+
+from api.calibration import CalibrationCancelled
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_CONCURRENCY = int(os.getenv("CALIBRATION_CONCURRENCY", "2"))
+CALIBRATION_MAX_PENDING = int(os.getenv("CALIBRATION_MAX_PENDING", "16"))
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+class CalibrationQueueFull(Exception):
+    """Raised when a calibration arrives while the queue is full."""
+
+
+class CalibrationQueue:
+    def __init__(
+        self, concurrency=CALIBRATION_CONCURRENCY, max_pending=CALIBRATION_MAX_PENDING
+    ):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="calibration-run"
+        )
+        self._waiting = deque()
+        self.running = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    def is_full(self):
+        return self.running + len(self._waiting) >= self.max_pending
+
+    async def run(self, func, *args, is_disconnected=None, on_queued=None):
+        """
+        Run `func(*args, cancelled=event)` once a slot is free and return its
+        result. `on_queued(position)` is awaited whenever the position in the
+        queue changes; once `is_disconnected()` returns True the call is
+        abandoned with CalibrationCancelled.
+        """
+        if self.is_full():
+            self.rejected += 1
+            logger.warning("Calibration queue is full; request rejected")
+            raise CalibrationQueueFull()
+
+        loop = asyncio.get_running_loop()
+        ticket = loop.create_future()
+        self._waiting.append(ticket)
+        self._admit()
+        try:
+            reported = None
+            while not ticket.done():
+                position = self._waiting.index(ticket) + 1
+                if on_queued is not None and position != reported:
+                    await on_queued(position)
+                    reported = position
+                await asyncio.wait({ticket}, timeout=DISCONNECT_POLL_SECONDS)
+                if not ticket.done() and await self._disconnected(is_disconnected):
+                    raise CalibrationCancelled()
+        except BaseException:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+            elif ticket.done():  # Admitted just as the caller went away
+                self._release()
+            self.cancelled += 1
+            raise
+
+        cancelled = threading.Event()
+        future = self._executor.submit(func, *args, cancelled=cancelled)
+        # The slot is held until the thread finishes, even if the caller is gone
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        result = asyncio.wrap_future(future)
+        try:
+            while not result.done():
+                await asyncio.wait({result}, timeout=DISCONNECT_POLL_SECONDS)
+                if not result.done() and await self._disconnected(is_disconnected):
+                    raise CalibrationCancelled()
+        except BaseException:
+            cancelled.set()
+            self.cancelled += 1
+            # Nobody awaits the abandoned result; retrieve it to keep asyncio quiet
+            result.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise
+        self.completed += 1
+        return result.result()
+
+    async def _disconnected(self, is_disconnected):
+        return is_disconnected is not None and await is_disconnected()
+
+    def _admit(self):
+        while self._waiting and self.running < self.concurrency:
+            ticket = self._waiting.popleft()
+            self.running += 1
+            ticket.set_result(None)
+
+    def _release(self):
+        self.running -= 1
+        self._admit()
+
+    def get_metrics(self):
+        return {
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "queue_depth": len(self._waiting),
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+        }
+
+
+_queue = None
+
+
+def get_calibration_queue():
+    """Per-worker calibration queue, created on first use."""
+    global _queue
+    if _queue is None:
+        _queue = CalibrationQueue()
+    return _queue
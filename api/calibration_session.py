@@ -0,0 +1,279 @@
+"""
+Incremental camera calibration: images arrive one at a time, the calibration
+board is detected as each one arrives, and every image gets an accept/reject
+answer with hints on which poses are still missing. calibrateCamera runs once
+the accepted views cover enough of the frame, so users stop sending images when
+they have enough rather than finding out at the end that half of them had no
+board.
+
+A view is described by where the board sits in the frame (a 3x3 grid of
+regions), how much of the frame it fills and how far it is tilted; a view too
+close to one already accepted adds nothing and is rejected as a duplicate.
+Once CALIBRATION_MAX_VIEWS are held, a new view is kept only if it fills a
+missing region or tilt, in place of a view that leaves no new gap behind.
+
+    CALIBRATION_MIN_VIEWS=10
+    CALIBRATION_MAX_VIEWS=30
+    CALIBRATION_MIN_REGIONS=5
+"""
+
+import logging
+import os
+
+import cv2 as cv
+import numpy as np
+
+from api.calibration import (
+    CALIBRATION_BOARD,
+    CALIBRATION_DETECT_WIDTH,
+    CHARUCO_BOARD,
+    OBJP,
+    CalibrationCancelled,
+    detect_board,
+    solve_calibration,
+)
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_MIN_VIEWS = int(os.getenv("CALIBRATION_MIN_VIEWS", "10"))
+CALIBRATION_MAX_VIEWS = int(os.getenv("CALIBRATION_MAX_VIEWS", "30"))
+CALIBRATION_MIN_REGIONS = int(os.getenv("CALIBRATION_MIN_REGIONS", "5"))
+MIN_FORCED_VIEWS = 3  # Fewest views a client may ask to calibrate from early
+MIN_TILTED_VIEWS = 2  # Views at an angle are needed to separate focal length
+TILT_THRESHOLD = 0.1  # Relative length difference of opposite board edges
+CLOSE_VIEW_SIZE = 0.15  # Share of the frame a near view covers
+DUPLICATE_DISTANCE = 0.05  # Largest pose difference of a duplicate view
+
+GRID = 3
+ROW_NAMES = ("top", "middle", "bottom")
+COLUMN_NAMES = ("left", "center", "right")
+
+
+def board_outline(object_points):
+    """Quad spanned by a board's inner corners, in order around it, in millimetres."""
+    low, high = object_points[:, :2].min(axis=0), object_points[:, :2].max(axis=0)
+    return np.float32([low, (high[0], low[1]), high, (low[0], high[1])])
+
+
+BOARD_OUTLINES = {
+    "chessboard": board_outline(OBJP),
+    "charuco": board_outline(CHARUCO_BOARD.getChessboardCorners()),
+}
+
+
+def region_name(row, column):
+    if row == 1 and column == 1:
+        return "center"
+    return f"{ROW_NAMES[row]}-{COLUMN_NAMES[column]}"
+
+
+def describe_view(object_points, image_points, frame_size, outline):
+    """
+    Pose descriptor of a view: centre, share of the frame covered and tilt of
+    the whole board, also where only part of it was detected.
+    """
+    width, height = frame_size
+    homography, _ = cv.findHomography(
+        object_points[:, :2].astype(np.float32), image_points.reshape(-1, 2)
+    )
+    quad = cv.perspectiveTransform(outline.reshape(-1, 1, 2), homography)
+    quad = quad.reshape(-1, 2)
+    centre = quad.mean(axis=0) / (width, height)
+    size = abs(cv.contourArea(quad.astype(np.float32))) / (width * height)
+    edges = np.linalg.norm(quad - np.roll(quad, -1, axis=0), axis=1)
+    tilt = max(
+        abs(edges[0] - edges[2]) / max(edges[0], edges[2]),
+        abs(edges[1] - edges[3]) / max(edges[1], edges[3]),
+    )
+    return {
+        "x": float(centre[0]),
+        "y": float(centre[1]),
+        "size": float(size),
+        "tilt": float(tilt),
+    }
+
+
+def view_region(view):
+    row = min(int(view["y"] * GRID), GRID - 1)
+    column = min(int(view["x"] * GRID), GRID - 1)
+    return row, column
+
+
+def pose_distance(a, b):
+    return max(
+        abs(a["x"] - b["x"]),
+        abs(a["y"] - b["y"]),
+        abs(np.sqrt(a["size"]) - np.sqrt(b["size"])),
+        abs(a["tilt"] - b["tilt"]),
+    )
+
+
+class CalibrationSession:
+    """Accepted views of one incremental calibration and their pose coverage."""
+
+    def __init__(
+        self,
+        min_views=CALIBRATION_MIN_VIEWS,
+        max_views=CALIBRATION_MAX_VIEWS,
+        min_regions=CALIBRATION_MIN_REGIONS,
+        detect_width=CALIBRATION_DETECT_WIDTH,
+        board=CALIBRATION_BOARD,
+    ):
+        self.board = board
+        self.min_views = min_views
+        self.max_views = max_views
+        self.min_regions = min(min_regions, GRID * GRID)
+        self.detect_width = detect_width
+        self.frame_size = None
+        self.objpoints = []
+        self.imgpoints = []
+        self.views = []
+        self.received = 0
+
+    def add_image(self, gray):
+        """Detect the board in one grayscale image and report the outcome."""
+        self.received += 1
+        accepted, reason = False, None
+        if gray is None:
+            reason = "unreadable"
+        elif self.frame_size is not None and gray.shape[::-1] != self.frame_size:
+            reason = "size_mismatch"
+        elif len(self.views) >= self.max_views and self.is_ready():
+            reason = "enough_views"
+        else:
+            points = detect_board(gray, self.board, self.detect_width)
+            if points is None:
+                reason = "no_board"
+            else:
+                view = describe_view(
+                    *points, gray.shape[::-1], BOARD_OUTLINES[self.board]
+                )
+                replaced = None
+                if any(
+                    pose_distance(view, other) < DUPLICATE_DISTANCE
+                    for other in self.views
+                ):
+                    reason = "duplicate"
+                elif (
+                    len(self.views) >= self.max_views
+                    and (replaced := self.redundant_view(view)) is None
+                ):
+                    reason = "enough_views"
+                else:
+                    if replaced is not None:
+                        del self.objpoints[replaced]
+                        del self.imgpoints[replaced]
+                        del self.views[replaced]
+                    self.frame_size = gray.shape[::-1]
+                    self.objpoints.append(points[0])
+                    self.imgpoints.append(points[1])
+                    self.views.append(view)
+                    accepted = True
+
+        return {
+            "index": self.received - 1,
+            "accepted": accepted,
+            "reason": reason,
+            "views": len(self.views),
+            "ready": self.is_ready(),
+            "coverage": self.coverage(),
+            "hints": self.hints(),
+        }
+
+    def regions(self):
+        counts = np.zeros((GRID, GRID), dtype=int)
+        for view in self.views:
+            counts[view_region(view)] += 1
+        return counts
+
+    def tilted_views(self):
+        return sum(view["tilt"] >= TILT_THRESHOLD for view in self.views)
+
+    def required_tilted_views(self):
+        return min(MIN_TILTED_VIEWS, self.min_views)
+
+    def shortfall(self, views):
+        """Regions and tilted views `views` still lack for calibration."""
+        regions = len({view_region(view) for view in views})
+        tilted = sum(view["tilt"] >= TILT_THRESHOLD for view in views)
+        return max(self.min_regions - regions, 0) + max(
+            self.required_tilted_views() - tilted, 0
+        )
+
+    def redundant_view(self, view):
+        """
+        Index of the accepted view that `view` should replace at max_views, or
+        None if no swap brings the views closer to covering the regions and
+        tilt that are missing. Among equal swaps the view closest to another one
+        goes, as it is missed least.
+        """
+
+        def swap_cost(index):
+            views = self.views[:index] + self.views[index + 1 :] + [view]
+            nearest = min(
+                pose_distance(self.views[index], other)
+                for other_index, other in enumerate(self.views)
+                if other_index != index
+            )
+            return self.shortfall(views), nearest
+
+        index = min(range(len(self.views)), key=swap_cost, default=None)
+        if index is None or swap_cost(index)[0] >= self.shortfall(self.views):
+            return None
+        return index
+
+    def coverage(self):
+        counts = self.regions()
+        return {
+            "regions": counts.tolist(),
+            "missing_regions": [
+                region_name(row, column)
+                for row in range(GRID)
+                for column in range(GRID)
+                if not counts[row, column]
+            ],
+            "tilted_views": self.tilted_views(),
+            "max_size": round(max((view["size"] for view in self.views), default=0), 3),
+        }
+
+    def is_ready(self):
+        return (
+            len(self.views) >= self.min_views
+            and np.count_nonzero(self.regions()) >= self.min_regions
+            and self.tilted_views() >= self.required_tilted_views()
+        )
+
+    def hints(self):
+        if self.is_ready():
+            return []
+        hints = []
+        missing = self.coverage()["missing_regions"]
+        if GRID * GRID - len(missing) < self.min_regions:
+            hints.append(f"Move the board to the {' or '.join(missing[:2])} area")
+        if self.views and max(view["size"] for view in self.views) < CLOSE_VIEW_SIZE:
+            hints.append("Hold the board closer to the camera")
+        if self.tilted_views() < MIN_TILTED_VIEWS:
+            hints.append("Tilt the board away from the camera")
+        if len(self.views) < self.min_views:
+            needed = self.min_views - len(self.views)
+            hints.append(f"{needed} more view{'s' if needed > 1 else ''} needed")
+        if len(self.views) >= self.max_views:
+            hints.append(
+                "View limit reached: only views that fill a gap above are kept, "
+                "or send finish to calibrate now"
+            )
+        return hints
+
+    def can_calibrate(self):
+        return len(self.views) >= min(MIN_FORCED_VIEWS, self.min_views)
+
+    def calibrate(self, cancelled=None):
+        """Calibrate from the accepted views, or None if there are too few."""
+        if not self.can_calibrate():
+            return None
+        if cancelled is not None and cancelled.is_set():
+            raise CalibrationCancelled()
+        logger.info(
+            f"Calibrating from {len(self.views)} of {self.received} streamed images."
+        )
+        return solve_calibration(self.objpoints, self.imgpoints, self.frame_size)
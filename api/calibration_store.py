@@ -0,0 +1,137 @@
+"""
+Stored camera calibrations, one per user and device.
+
+`/files/calibration` saves its result here and streams with focal length
+enabled look the focal length up instead of waiting for the client to send the
+camera matrix. The focal length is in pixels, so it only applies to a stream
+of the calibrated resolution, or of another with the same aspect ratio once
+rescaled. Lookups are cached per worker; an entry expires after
+CALIBRATION_CACHE_TTL seconds so a calibration saved through another worker is
+picked up, and a save through this worker replaces it at once.
+
+    CALIBRATION_CACHE_SIZE=1024
+    CALIBRATION_CACHE_TTL=300
+"""
+
+from collections import OrderedDict
+import logging
+import os
+import time
+
+from database.crud import get_camera_calibration, upsert_camera_calibration
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_CACHE_SIZE = int(os.getenv("CALIBRATION_CACHE_SIZE", "1024"))
+CALIBRATION_CACHE_TTL = float(os.getenv("CALIBRATION_CACHE_TTL", "300"))
+# Relative difference in aspect ratio still taken for the same framing
+ASPECT_RATIO_TOLERANCE = 0.01
+
+
+def focal_length_from_matrix(camera_matrix):
+    """Mean of fx and fy, as the detector expects it."""
+    fx = round(camera_matrix[0][0], 2)
+    fy = round(camera_matrix[1][1], 2)
+    return (fx + fy) / 2
+
+
+def rescale_focal_length(focal_length, calibrated_resolution, resolution):
+    """
+    Focal length for frames of `resolution` (width, height) from one calibrated
+    at `calibrated_resolution`; None if the aspect ratios differ.
+    """
+    calibrated_width, calibrated_height = calibrated_resolution
+    width, height = resolution
+    calibrated_aspect = calibrated_width / calibrated_height
+    difference = abs(width / height - calibrated_aspect) / calibrated_aspect
+    if difference > ASPECT_RATIO_TOLERANCE:
+        return None
+    return focal_length * width / calibrated_width
+
+
+class FocalLengthCache:
+    """
+    LRU cache of stored (focal_length, resolution) pairs by
+    (user_id, device_identifier); None if absent.
+    """
+
+    def __init__(self, size=CALIBRATION_CACHE_SIZE, ttl=CALIBRATION_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns (found, (focal_length, resolution) or None)."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[0]
+
+    def put(self, key, calibration):
+        self._entries[key] = (calibration, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def get_metrics(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+focal_length_cache = FocalLengthCache()
+
+
+def get_focal_length(db, user_id, device_identifier, resolution):
+    """
+    Focal length of the stored calibration for this device, rescaled to the
+    stream's `resolution` (width, height). None without a calibration, without
+    a resolution to check it against, or if the aspect ratios differ.
+    """
+    if not device_identifier or resolution is None:
+        return None
+    key = (str(user_id), device_identifier)
+    found, stored = focal_length_cache.get(key)
+    if not found:
+        calibration = get_camera_calibration(db, user_id, device_identifier)
+        stored = (
+            (
+                focal_length_from_matrix(calibration.camera_matrix),
+                (calibration.image_width, calibration.image_height),
+            )
+            if calibration
+            else None
+        )
+        focal_length_cache.put(key, stored)
+    if stored is None:
+        return None
+
+    focal_length = rescale_focal_length(*stored, resolution)
+    if focal_length is None:
+        logger.warning(
+            f"Stored calibration for device {device_identifier} is for "
+            f"{stored[1][0]}x{stored[1][1]}, not {resolution[0]}x{resolution[1]}"
+        )
+    return focal_length
+
+
+def save_calibration(db, user_id, device_identifier, calibration_data, resolution):
+    """Store a calibration result for this device and refresh the cached lookup."""
+    if not device_identifier:
+        return None
+    calibration = upsert_camera_calibration(
+        db, user_id, device_identifier, calibration_data, resolution
+    )
+    if calibration is not None:
+        focal_length_cache.put(
+            (str(user_id), device_identifier),
+            (
+                focal_length_from_matrix(calibration_data["cameraMatrix"]),
+                tuple(resolution),
+            ),
+        )
+        logger.info(f"Saved camera calibration for device {device_identifier}")
+    return calibration
@@ -0,0 +1,160 @@
+"""
+Optional learned posture classifier.
+
+A TorchScript model scores the features produced by `extract_current_values`
+on CPU and returns the probability of bad (thoracic) posture. The model takes a
+float32 tensor of shape (batch, 10): the five features in FEATURE_KEYS (missing
+values as 0.0) followed by one presence flag per feature, and returns
+probabilities of shape (batch,) or (batch, 1).
+
+Set POSTURE_MODEL_PATH to enable it; the model is loaded when the worker starts.
+Frames from every live session on a worker are gathered into micro-batches by
+one InferenceScheduler, so model cost grows with batches rather than with
+connection count.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+POSTURE_MODEL_PATH = os.getenv("POSTURE_MODEL_PATH")
+POSTURE_BATCH_SIZE = int(os.getenv("POSTURE_BATCH_SIZE", "32"))
+POSTURE_BATCH_DELAY_MS = float(os.getenv("POSTURE_BATCH_DELAY_MS", "5"))
+POSTURE_MODEL_THREADS = int(os.getenv("POSTURE_MODEL_THREADS", "1"))
+
+FEATURE_KEYS = (
+    "shoulderPosition",
+    "diameterRight",
+    "diameterLeft",
+    "eyeAspectRatioRight",
+    "eyeAspectRatioLeft",
+)
+
+
+def encode_features(current_values):
+    values = [current_values.get(key) for key in FEATURE_KEYS]
+    return [v if v is not None else 0.0 for v in values] + [
+        0.0 if v is None else 1.0 for v in values
+    ]
+
+
+class PostureClassifier:
+    def __init__(self, model_path, num_threads=POSTURE_MODEL_THREADS):
+        import torch  # Optional dependency, only needed when a model is configured
+
+        self.torch = torch
+        torch.set_num_threads(num_threads)
+        self.model = torch.jit.load(model_path, map_location="cpu")
+        self.model.eval()
+
+    def predict_batch(self, rows):
+        """Score a list of encoded feature rows in one forward pass."""
+        torch = self.torch
+        with torch.inference_mode():
+            output = self.model(torch.tensor(rows, dtype=torch.float32))
+        return output.reshape(len(rows)).tolist()
+
+    def predict(self, current_values):
+        return self.predict_batch([encode_features(current_values)])[0]
+
+
+class InferenceScheduler:
+    """
+    Micro-batches classifier requests from concurrent sessions. A batch is run as
+    soon as it holds `max_batch_size` frames, or `max_delay` seconds after its
+    first frame arrived, whichever comes first. Inference runs on a dedicated
+    thread so the event loop keeps serving websockets.
+    """
+
+    def __init__(
+        self,
+        classifier,
+        max_batch_size=POSTURE_BATCH_SIZE,
+        max_delay=POSTURE_BATCH_DELAY_MS / 1000,
+    ):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="posture-inference"
+        )
+        self.batches = 0
+        self.frames = 0
+
+    async def score(self, current_values):
+        """Return the bad-posture probability, or None if inference failed."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((encode_features(current_values), future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        rows = [row for row, _ in batch]
+        try:
+            scores = await loop.run_in_executor(
+                self._executor, self.classifier.predict_batch, rows
+            )
+        except Exception as e:
+            logger.error(f"Posture inference failed for batch of {len(rows)}: {e}")
+            scores = [None] * len(rows)
+        else:
+            self.batches += 1
+            self.frames += len(rows)
+
+        for (_, future), score in zip(batch, scores):
+            if not future.done():  # The session may have disconnected
+                future.set_result(score)
+
+    def get_metrics(self):
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "mean_batch_size": self.frames / self.batches if self.batches else 0,
+        }
+
+
+_scheduler = None
+_scheduler_loaded = False
+_scheduler_lock = threading.Lock()
+
+
+def get_inference_scheduler():
+    """
+    Per-worker scheduler, or None when no model is configured. The first call
+    loads the model, which blocks: make it from a thread, not the event loop.
+    """
+    global _scheduler, _scheduler_loaded
+    with _scheduler_lock:
+        if not _scheduler_loaded:
+            if POSTURE_MODEL_PATH:
+                try:
+                    _scheduler = InferenceScheduler(
+                        PostureClassifier(POSTURE_MODEL_PATH)
+                    )
+                    logger.info(f"Loaded posture classifier from {POSTURE_MODEL_PATH}")
+                except Exception as e:
+                    logger.error(f"Posture classifier disabled: {e}")
+            _scheduler_loaded = True
+    return _scheduler
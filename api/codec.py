@@ -0,0 +1,48 @@
+"""
+Shared JSON codec backed by orjson, used for websocket messages and as the
+default REST response class. UUIDs, datetimes and NumPy arrays serialize
+natively, so handlers can return them without str()/isoformat() passes.
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+import orjson
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so existing handlers
+# catching the stdlib exception keep working.
+JSONDecodeError = orjson.JSONDecodeError
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def loads(data):
+    return orjson.loads(data)
+
+
+def dumps(obj) -> bytes:
+    return orjson.dumps(obj, option=OPTIONS)
+
+
+def dumps_canonical(obj) -> bytes:
+    """Key-sorted encoding, for hashing content regardless of key order."""
+    return orjson.dumps(obj, option=OPTIONS | orjson.OPT_SORT_KEYS)
+
+
+def dumps_text(obj) -> str:
+    return orjson.dumps(obj, option=OPTIONS).decode()
+
+
+class CodecResponse(JSONResponse):
+    """JSONResponse rendered with the shared codec."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def receive_json(websocket):
+    return loads(await websocket.receive_text())
+
+
+async def send_json(websocket, data):
+    await websocket.send_text(dumps_text(data))
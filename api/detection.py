@@ -1,5 +1,19 @@
+import copy
+
+from api.session_stats import SessionStats
+from api.timeline import compact_closed_interval, finalize_intervals
+
+
 class detection:
-    def __init__(self, frame_per_second=1, correct_frame=15, focal_length=0):
+    def __init__(
+        self,
+        frame_per_second=1,
+        correct_frame=15,
+        focal_length=0,
+        timeline_merge_gap=2,
+        timeline_min_duration=3,
+        keep_raw_timeline=False,
+    ):
         # Constants
         self.correct_frame = correct_frame
         self.frame_per_second = frame_per_second
@@ -8,6 +22,7 @@ class detection:
         self.focal_length = focal_length
         self.iris_diameter = 1.17  # cm
         self.thoracic_threshold = 0.05
+        self.posture_score_threshold = 0.5  # Learned classifier, when enabled
 
         # Initialization of variables
         self.response_counter = 0
@@ -44,37 +59,71 @@ class detection:
             "thoracic": [],
         }
 
+        # Timeline compaction for noisy topics (seconds, scaled to frames)
+        self.compacted_topics = ("blink", "thoracic")
+        self.timeline_merge_gap = timeline_merge_gap * frame_per_second
+        self.timeline_min_duration = timeline_min_duration * frame_per_second
+        self.raw_timeline_result = (
+            {topic: [] for topic in self.compacted_topics}
+            if keep_raw_timeline
+            else None
+        )
+
         self.response_counter_for_correct_frame = 0
         self.response_counter = 0
+        self.session_stats = SessionStats(frame_per_second, focal_length)
 
     def set_correct_value(self, input):
         self.response_counter_for_correct_frame += 1
         self.saved_values.append(input)
 
+        if self.response_counter_for_correct_frame == self.correct_frame:
+            self.correct_values = self.compute_correct_value(self.saved_values)
+
+    def compute_correct_value(self, values):
+        """Average calibration frames into a shoulder/iris baseline."""
+
         def average(values):
             valid_values = [v for v in values if v is not None]
             return sum(valid_values) / len(valid_values) if valid_values else None
 
-        if self.response_counter_for_correct_frame == self.correct_frame:
-            self.correct_values = {
-                "shoulderPosition": average(
-                    [v["shoulderPosition"] for v in self.saved_values]
-                ),
-                "diameterRight": average(
-                    [v["diameterRight"] for v in self.saved_values]
-                ),
-                "diameterLeft": average([v["diameterLeft"] for v in self.saved_values]),
-            }
-            if (
-                self.correct_values["shoulderPosition"] + self.thoracic_threshold
-                >= 0.95
-            ):
-                self.correct_values["shoulderPosition"] = 0.95 - self.thoracic_threshold
+        correct_values = {
+            "shoulderPosition": average([v["shoulderPosition"] for v in values]),
+            "diameterRight": average([v["diameterRight"] for v in values]),
+            "diameterLeft": average([v["diameterLeft"] for v in values]),
+        }
+        if (
+            correct_values["shoulderPosition"] is not None
+            and correct_values["shoulderPosition"] + self.thoracic_threshold >= 0.95
+        ):
+            correct_values["shoulderPosition"] = 0.95 - self.thoracic_threshold
+        return correct_values
+
+    def load_correct_value(self, correct_values):
+        """Warm-start from a known baseline so detection runs from the first frame."""
+        self.correct_values = {
+            "shoulderPosition": correct_values.get("shoulderPosition"),
+            "diameterRight": correct_values.get("diameterRight"),
+            "diameterLeft": correct_values.get("diameterLeft"),
+        }
+        self.response_counter_for_correct_frame = self.correct_frame
 
-    def detect(self, input, faceDetect):
+    def is_calibrated(self):
+        return self.response_counter_for_correct_frame >= self.correct_frame
+
+    def detect(self, input, faceDetect, posture_score=None):
         self.response_counter += 1
         if self.response_counter_for_correct_frame >= self.correct_frame:
-            if input["shoulderPosition"] is None:
+            blinked = False
+            frame_distance = None
+            shoulder_drift = None
+            if posture_score is not None:
+                # Classifier output replaces the shoulder-height rule
+                if posture_score >= self.posture_score_threshold:
+                    self.thoracic_stack += 1
+                else:
+                    self.thoracic_stack = 0
+            elif input["shoulderPosition"] is None:
                 self.thoracic_stack = 0
             elif (
                 self.correct_values.get("shoulderPosition") is not None
@@ -85,21 +134,19 @@ class detection:
             else:
                 self.thoracic_stack = 0
 
+            if (
+                input["shoulderPosition"] is not None
+                and self.correct_values.get("shoulderPosition") is not None
+            ):
+                shoulder_drift = (
+                    input["shoulderPosition"] - self.correct_values["shoulderPosition"]
+                )
+
+            self.update_presence(faceDetect)
             if faceDetect is False:
                 self.blink_stack = 0
                 self.distance_stack = 0
-                self.not_sitting_stack += 1
-                if (
-                    self.not_sitting_stack
-                    >= self.not_sitting_stack_threshold * self.frame_per_second
-                ):
-                    self.sitting_stack = 0
-                    self.not_sitting_stack = 0
-                else:
-                    self.sitting_stack += 1
             else:
-                self.sitting_stack += 1
-
                 # Update distance_stack
                 diameter_right = input.get("diameterRight")
                 diameter_left = input.get("diameterLeft")
@@ -136,6 +183,13 @@ class detection:
                         else:
                             self.distance_stack = 0
 
+                if diameter_right or diameter_left:
+                    frame_distance = (
+                        self.real_distance
+                        if self.focal_length
+                        else max(diameter_right or 0, diameter_left or 0)
+                    )
+
                 # Update blink_stack
                 ear_left = input.get("eyeAspectRatioLeft")
                 ear_right = input.get("eyeAspectRatioRight")
@@ -152,6 +206,7 @@ class detection:
                     if not self.blink_detected:
                         self.blink_stack = 0
                         self.blink_detected = True
+                        blinked = True
                     self.ear_below_threshold = False
                 else:
                     self.blink_detected = False
@@ -159,19 +214,15 @@ class detection:
 
             if self.blink_stack >= self.blink_stack_threshold * self.frame_per_second:
                 if self.result["blink_alert"] is False:
-                    self.timeline_result["blink"].append([])
-                    self.timeline_result["blink"][
-                        len(self.timeline_result["blink"]) - 1
-                    ].append(
+                    self.open_timeline_interval(
+                        "blink",
                         self.response_counter
-                        - (self.blink_stack_threshold * self.frame_per_second)
+                        - (self.blink_stack_threshold * self.frame_per_second),
                     )
                 self.result["blink_alert"] = True
             else:
                 if self.result["blink_alert"] is True:
-                    self.timeline_result["blink"][
-                        len(self.timeline_result["blink"]) - 1
-                    ].append(self.response_counter)
+                    self.close_timeline_interval("blink", self.response_counter)
                 self.result["blink_alert"] = False
 
             if (
@@ -179,21 +230,18 @@ class detection:
                 >= self.sitting_stack_threshold * self.frame_per_second
             ):
                 if self.result["sitting_alert"] is False:
-                    self.timeline_result["sitting"].append([])
-                    self.timeline_result["sitting"][
-                        len(self.timeline_result["sitting"]) - 1
-                    ].append(
+                    self.open_timeline_interval(
+                        "sitting",
                         self.response_counter
-                        - (self.sitting_stack_threshold * self.frame_per_second)
+                        - (self.sitting_stack_threshold * self.frame_per_second),
                     )
                 self.result["sitting_alert"] = True
             else:
                 if self.result["sitting_alert"] is True:
-                    self.timeline_result["sitting"][
-                        len(self.timeline_result["sitting"]) - 1
-                    ].append(
+                    self.close_timeline_interval(
+                        "sitting",
                         self.response_counter
-                        - (self.not_sitting_stack_threshold * self.frame_per_second)
+                        - (self.not_sitting_stack_threshold * self.frame_per_second),
                     )
                 self.result["sitting_alert"] = False
 
@@ -202,19 +250,15 @@ class detection:
                 >= self.distance_stack_threshold * self.frame_per_second
             ):
                 if self.result["distance_alert"] is False:
-                    self.timeline_result["distance"].append([])
-                    self.timeline_result["distance"][
-                        len(self.timeline_result["distance"]) - 1
-                    ].append(
+                    self.open_timeline_interval(
+                        "distance",
                         self.response_counter
-                        - (self.distance_stack_threshold * self.frame_per_second)
+                        - (self.distance_stack_threshold * self.frame_per_second),
                     )
                 self.result["distance_alert"] = True
             else:
                 if self.result["distance_alert"] is True:
-                    self.timeline_result["distance"][
-                        len(self.timeline_result["distance"]) - 1
-                    ].append(self.response_counter)
+                    self.close_timeline_interval("distance", self.response_counter)
                 self.result["distance_alert"] = False
 
             if (
@@ -222,19 +266,15 @@ class detection:
                 >= self.thoracic_stack_threshold * self.frame_per_second
             ):
                 if self.result["thoracic_alert"] is False:
-                    self.timeline_result["thoracic"].append([])
-                    self.timeline_result["thoracic"][
-                        len(self.timeline_result["thoracic"]) - 1
-                    ].append(
+                    self.open_timeline_interval(
+                        "thoracic",
                         self.response_counter
-                        - (self.thoracic_stack_threshold * self.frame_per_second)
+                        - (self.thoracic_stack_threshold * self.frame_per_second),
                     )
                 self.result["thoracic_alert"] = True
             else:
                 if self.result["thoracic_alert"] is True:
-                    self.timeline_result["thoracic"][
-                        len(self.timeline_result["thoracic"]) - 1
-                    ].append(self.response_counter)
+                    self.close_timeline_interval("thoracic", self.response_counter)
                 self.result["thoracic_alert"] = False
 
             if (
@@ -243,8 +283,68 @@ class detection:
             ):
                 self.result["time_limit_exceed_alert"] = True
 
+            self.session_stats.update(
+                faceDetect, frame_distance, shoulder_drift, blinked
+            )
+
+    def update_presence(self, faceDetect):
+        """Sitting counters; these depend on face presence alone."""
+        if faceDetect is False:
+            self.not_sitting_stack += 1
+            if (
+                self.not_sitting_stack
+                >= self.not_sitting_stack_threshold * self.frame_per_second
+            ):
+                self.sitting_stack = 0
+                self.not_sitting_stack = 0
+            else:
+                self.sitting_stack += 1
+        else:
+            self.sitting_stack += 1
+
+    def open_timeline_interval(self, topic, start):
+        self.timeline_result[topic].append([start])
+        if self.raw_timeline_result is not None and topic in self.raw_timeline_result:
+            self.raw_timeline_result[topic].append([start])
+
+    def close_timeline_interval(self, topic, end):
+        intervals = self.timeline_result[topic]
+        intervals[-1].append(end)
+        if topic in self.compacted_topics:
+            compact_closed_interval(
+                intervals, self.timeline_merge_gap, self.timeline_min_duration
+            )
+            if self.raw_timeline_result is not None:
+                self.raw_timeline_result[topic][-1].append(end)
+
+    def finalize_timeline(self):
+        """Apply the final compaction step once the session has ended."""
+        for topic in self.compacted_topics:
+            finalize_intervals(self.timeline_result[topic], self.timeline_min_duration)
+
+    def get_state(self):
+        """JSON-serializable snapshot, so a session can resume on a new detector."""
+        state = {
+            name: copy.deepcopy(value)
+            for name, value in vars(self).items()
+            if name != "session_stats"
+        }
+        state["session_stats"] = self.session_stats.get_state()
+        return state
+
+    def load_state(self, state):
+        state = copy.deepcopy(state)
+        self.session_stats.load_state(state.pop("session_stats"))
+        vars(self).update(state)
+
     def get_timeline_result(self):
         return self.timeline_result
 
+    def get_raw_timeline_result(self):
+        return self.raw_timeline_result
+
     def get_alert(self):
         return self.result
+
+    def get_session_stats(self):
+        return self.session_stats.summary()
@@ -0,0 +1,91 @@
+"""
+Helpers for streaming camera frames to the server for landmark extraction.
+
+Thin clients send JPEG/WebP frames at a low rate and the server runs MediaPipe
+on them in the landmark extraction pool. Each connection has at most one frame
+in inference; a frame that arrives meanwhile waits in a single slot and is
+replaced (skipped) by the next one, so a slow server scores the newest frame
+instead of falling further behind. FRAME_STREAM_MAX_IN_FLIGHT bounds the frames
+in the pool across all connections of a worker.
+
+    FRAME_STREAM_FPS=5
+    FRAME_STREAM_MAX_IN_FLIGHT=4
+"""
+
+import asyncio
+import os
+
+FRAME_STREAM_FPS = int(os.getenv("FRAME_STREAM_FPS", "5"))
+FRAME_STREAM_MAX_IN_FLIGHT = int(os.getenv("FRAME_STREAM_MAX_IN_FLIGHT", "4"))
+FRAME_STATS_INTERVAL = 30  # Scored frames between frame_stats messages
+
+STAGES = ("queue", "decode", "inference", "transfer", "detection", "total")
+
+
+class LatestFrame:
+    """Single-slot mailbox: a new frame replaces one not yet picked up."""
+
+    def __init__(self):
+        self._item = None
+        self._closed = False
+        self._event = asyncio.Event()
+        self.skipped = 0
+
+    def put(self, item):
+        if self._item is not None:
+            self.skipped += 1
+        self._item = item
+        self._event.set()
+
+    def close(self):
+        self._closed = True
+        self._event.set()
+
+    async def get(self):
+        """The newest frame, or None once closed and drained."""
+        while self._item is None:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        item, self._item = self._item, None
+        return item
+
+
+class StageLatency:
+    """Per-stage latency of one frame stream, in milliseconds."""
+
+    def __init__(self):
+        self.frames = 0
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self.maxima = dict.fromkeys(STAGES, 0.0)
+
+    def record(self, **seconds):
+        self.frames += 1
+        for stage, value in seconds.items():
+            self.totals[stage] += value
+            self.maxima[stage] = max(self.maxima[stage], value)
+
+    def summary(self, skipped=0):
+        return {
+            "frames": self.frames,
+            "skipped": skipped,
+            "mean_ms": {
+                stage: round(total / self.frames * 1000, 2) if self.frames else None
+                for stage, total in self.totals.items()
+            },
+            "max_ms": {
+                stage: round(value * 1000, 2) for stage, value in self.maxima.items()
+            },
+        }
+
+
+_inference_slots = None
+
+
+def get_inference_slots():
+    """Per-worker bound on frames in the landmark pool, created on first use."""
+    global _inference_slots
+    if _inference_slots is None:
+        _inference_slots = asyncio.Semaphore(FRAME_STREAM_MAX_IN_FLIGHT)
+    return _inference_slots
@@ -5,52 +5,58 @@ import cv2
 from fastapi.responses import FileResponse
 import numpy as np
 import logging
-from datetime import datetime
+import os
+import uuid
 
 # Directory paths
-IMAGE_SAVE_DIR = Path("images")
 RESULT_DIR = Path("calibrate_result")
+# Set to keep calibration uploads on disk for debugging; off by default
+CALIBRATION_DEBUG_DIR = os.getenv("CALIBRATION_DEBUG_DIR")
 
 logger = logging.getLogger(__name__)
 
 
-# Function to generate unique filenames
-def generate_unique_filename(base_name: str) -> str:
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"{base_name}_{timestamp}.png"
+# Keep a calibration upload for debugging
+async def save_debug_image(image_data: bytes, name: str) -> Path:
+    debug_dir = Path(CALIBRATION_DEBUG_DIR)
+    debug_dir.mkdir(parents=True, exist_ok=True)
+    file_path = debug_dir / name
+    async with aiofiles.open(file_path, "wb") as out_file:
+        await out_file.write(image_data)
+    return file_path
 
 
-# Save image asynchronously
-async def save_image(file: UploadFile, index: int) -> Path:
-    try:
-        image_data = await file.read()
-        unique_filename = generate_unique_filename(f"calibration_{index}")
-        file_path = IMAGE_SAVE_DIR / unique_filename
-        IMAGE_SAVE_DIR.mkdir(parents=True, exist_ok=True)
-        async with aiofiles.open(file_path, "wb") as out_file:
-            await out_file.write(image_data)
-        np_arr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError("Unable to decode the image")
-        logger.info(f"Received image with shape: {img.shape}")
-        return file_path
-    except Exception as e:
-        logger.error(f"Failed to save and process image: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to process image: {e}")
+# Decode an encoded image to grayscale; None if it is not an image
+def decode_grayscale(image_data: bytes):
+    return cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_GRAYSCALE)
 
 
-# Upload images
-async def receive_upload_images(files: list[UploadFile]):
-    try:
-        file_paths = [await save_image(file, index) for index, file in enumerate(files)]
-        return {
-            "message": "Images saved successfully",
-            "file_paths": [str(path) for path in file_paths],
-        }
-    except Exception as e:
-        logger.error(f"Error in upload endpoint: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+# Decode uploads straight to grayscale, without a round trip through disk;
+# 400 for an upload that is not an image, 500 if reading or decoding fails
+async def decode_calibration_images(files: list[UploadFile]):
+    images = []
+    batch = uuid.uuid4().hex[:8]
+    for index, file in enumerate(files):
+        name = file.filename or f"calibration_{index}"
+        try:
+            image_data = await file.read()
+            if CALIBRATION_DEBUG_DIR:
+                suffix = Path(file.filename or "").suffix or ".png"
+                await save_debug_image(
+                    image_data, f"calibration_{batch}_{index}{suffix}"
+                )
+            gray = decode_grayscale(image_data)
+        except Exception as e:
+            logger.error(f"Failed to process image: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to process image: {e}")
+        if gray is None:
+            logger.warning(f"Calibration upload {name} is not a decodable image")
+            raise HTTPException(
+                status_code=400, detail=f"Unable to decode image {name}"
+            )
+        logger.info(f"Received image with shape: {gray.shape}")
+        images.append((name, gray))
+    return images
 
 
 # Download file
@@ -0,0 +1,220 @@
+"""
+Background processing of uploaded video results.
+
+Uploads are spooled to disk and recorded as a VideoJob row, then scored in a
+bounded process pool so the CPU-bound detection loop never runs on the event
+loop. Jobs left queued or running by a restart are resubmitted on startup; each
+job's sitting_session_id is fixed when it is created, so a re-run cannot create
+a second session.
+
+Every server worker recovers on startup, so a job is claimed before it runs: a
+conditional UPDATE moves it to running with a lease that the running worker
+renews. Only a job whose lease has expired, because its worker died, can be
+claimed again.
+
+    VIDEO_JOB_WORKERS=2
+    VIDEO_JOB_MAX_PENDING=64
+    VIDEO_JOB_SPOOL_DIR=video_jobs
+    VIDEO_JOB_LEASE_SECONDS=300
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+
+from api import codec
+from database.database import SessionLocal, engine
+from database.crud import (
+    claim_video_job,
+    get_unfinished_video_jobs,
+    renew_video_job_lease,
+)
+from database.model import SittingSession, VideoJob
+
+logger = logging.getLogger(__name__)
+
+VIDEO_JOB_WORKERS = int(os.getenv("VIDEO_JOB_WORKERS", "2"))
+VIDEO_JOB_MAX_PENDING = int(os.getenv("VIDEO_JOB_MAX_PENDING", "64"))
+VIDEO_JOB_SPOOL_DIR = Path(os.getenv("VIDEO_JOB_SPOOL_DIR", "video_jobs"))
+VIDEO_JOB_LEASE_SECONDS = float(os.getenv("VIDEO_JOB_LEASE_SECONDS", "300"))
+JOB_LATENCY_HISTORY = 200
+
+
+def spool_frames(job_id, frames):
+    """Write a job's frames to the spool directory and return the path."""
+    VIDEO_JOB_SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    path = VIDEO_JOB_SPOOL_DIR / f"{job_id}.json"
+    path.write_bytes(codec.dumps(frames))
+    return str(path)
+
+
+def _init_worker():
+    # Connections inherited from the parent must not be reused after fork
+    engine.dispose(close=False)
+
+
+def _renew_lease(job_id, stop):
+    """Keep renewing a running job's lease until `stop` is set."""
+    while not stop.wait(VIDEO_JOB_LEASE_SECONDS / 3):
+        db = SessionLocal()
+        try:
+            renew_video_job_lease(db, job_id, VIDEO_JOB_LEASE_SECONDS)
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not renew lease of video job {job_id}: {e}")
+        finally:
+            db.close()
+
+
+def run_video_job(job_id):
+    """
+    Score one job inside a pool worker. Returns (status, queue_seconds,
+    run_seconds) for the parent's metrics; status is "skipped" if the job
+    finished or is held by another worker.
+    """
+    from api.video_scoring import VideoScorer, hash_frames
+
+    started = time.time()
+    db = SessionLocal()
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_renew_lease, args=(job_id, stop), daemon=True)
+    try:
+        job = db.get(VideoJob, job_id)
+        if job is None:
+            return "missing", 0.0, 0.0
+        if not claim_video_job(db, job_id, VIDEO_JOB_LEASE_SECONDS):
+            return "skipped", 0.0, 0.0
+        heartbeat.start()
+        queue_seconds = (job.started_at - job.created_at).total_seconds()
+
+        try:
+            if db.get(SittingSession, job.sitting_session_id) is None:
+                frames = codec.loads(Path(job.payload_path).read_bytes())
+                scorer = VideoScorer(db, job.user_id, job.device_identifier)
+                scorer.add_frames(frames)
+                scorer.finish()
+                scorer.save(
+                    job.video_name,
+                    job.thumbnail,
+                    job.sitting_session_id,
+                    hash_frames(frames, baseline=scorer.baseline_tracker.stored_values),
+                )
+            # Otherwise the session was saved before a crash; only the status is stale
+            job.status = "done"
+        except HTTPException as e:
+            db.rollback()
+            job.status, job.error = "failed", e.detail
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Video job {job_id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+
+        stop.set()
+        heartbeat.join()
+        job.finished_at = datetime.now()
+        job.lease_expires_at = None
+        db.commit()
+        Path(job.payload_path).unlink(missing_ok=True)
+        return job.status, queue_seconds, time.time() - started
+    finally:
+        stop.set()
+        db.close()
+
+
+class VideoJobQueue:
+    def __init__(self, workers=VIDEO_JOB_WORKERS, max_pending=VIDEO_JOB_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker
+        )
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.missing = 0
+        self.latencies = deque(maxlen=JOB_LATENCY_HISTORY)
+
+    def is_full(self):
+        return self.pending >= self.max_pending
+
+    def submit(self, job_id):
+        with self._lock:
+            self.pending += 1
+        submitted = time.monotonic()
+        future = self._executor.submit(run_video_job, job_id)
+        future.add_done_callback(lambda f: self._on_done(job_id, f, submitted))
+
+    def _on_done(self, job_id, future, submitted):
+        latency = time.monotonic() - submitted
+        try:
+            status, queue_seconds, run_seconds = future.result()
+        except Exception as e:  # The worker process itself died
+            logger.error(f"Video job {job_id} crashed: {e}")
+            status, queue_seconds, run_seconds = "failed", None, None
+        with self._lock:
+            self.pending -= 1
+            if status == "failed":
+                self.failed += 1
+            elif status == "skipped":
+                pass  # Finished, or run by another worker
+            elif status == "missing":
+                self.missing += 1  # The job's row was deleted before it ran
+            else:
+                self.completed += 1
+                self.latencies.append((latency, queue_seconds, run_seconds))
+        logger.info(f"Video job {job_id} {status} in {latency:.2f}s")
+
+    def recover(self):
+        """Resubmit jobs left unfinished by a previous run."""
+        db = SessionLocal()
+        try:
+            jobs = get_unfinished_video_jobs(db)
+        finally:
+            db.close()
+        for job in jobs:
+            self.submit(job.job_id)
+        if jobs:
+            logger.info(f"Resubmitted {len(jobs)} unfinished video jobs")
+
+    def get_metrics(self):
+        with self._lock:
+            latencies = sorted(latency for latency, _, _ in self.latencies)
+            queue_waits = [q for _, q, _ in self.latencies if q is not None]
+            run_times = [r for _, _, r in self.latencies if r is not None]
+            return {
+                "workers": self.workers,
+                "queue_depth": max(self.pending - self.workers, 0),
+                "running": min(self.pending, self.workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "missing": self.missing,
+                "latency_mean_s": (
+                    sum(latencies) / len(latencies) if latencies else None
+                ),
+                "latency_p95_s": (
+                    latencies[int(0.95 * (len(latencies) - 1))] if latencies else None
+                ),
+                "queue_wait_mean_s": (
+                    sum(queue_waits) / len(queue_waits) if queue_waits else None
+                ),
+                "run_mean_s": sum(run_times) / len(run_times) if run_times else None,
+            }
+
+
+_queue = None
+
+
+def get_video_job_queue():
+    """Per-worker job queue, created on first use."""
+    global _queue
+    if _queue is None:
+        _queue = VideoJobQueue()
+    return _queue
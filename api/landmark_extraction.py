@@ -0,0 +1,202 @@
+"""
+Server-side landmark extraction from raw video files.
+
+OpenCV decodes the video in the calling thread while a process pool of
+pre-warmed MediaPipe models (Pose, and FaceMesh with iris refinement) turns
+frames into the same landmark dicts the desktop client sends. Decode and
+inference overlap: at most LANDMARK_MAX_IN_FLIGHT frames are in the pool at a
+time and results come back in frame order, so a video is never held in memory.
+
+Frames of one video are spread over several workers, so the models run in
+static-image mode rather than tracking between frames.
+
+    LANDMARK_WORKERS=2
+    LANDMARK_MAX_IN_FLIGHT=8
+    LANDMARK_TARGET_FPS=15
+    LANDMARK_MAX_WIDTH=640
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import importlib.util
+import logging
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from api.procressData import LANDMARK_GROUPS
+
+logger = logging.getLogger(__name__)
+
+LANDMARK_WORKERS = int(os.getenv("LANDMARK_WORKERS", "2"))
+LANDMARK_MAX_IN_FLIGHT = int(os.getenv("LANDMARK_MAX_IN_FLIGHT", "8"))
+LANDMARK_TARGET_FPS = int(os.getenv("LANDMARK_TARGET_FPS", "15"))
+LANDMARK_MAX_WIDTH = int(os.getenv("LANDMARK_MAX_WIDTH", "640"))
+SHOULDER_MIN_VISIBILITY = 0.5
+
+# MediaPipe Pose indices; "left" is the person's left, as on the client
+POSE_LANDMARKS = (("leftShoulder", 11), ("rightShoulder", 12))
+
+_pose = None
+_face_mesh = None
+
+
+def _point(landmark):
+    return {"x": landmark.x, "y": landmark.y}
+
+
+def landmarks_to_frame(pose_landmarks, face_landmarks):
+    """Build a client-format frame from MediaPipe Pose and FaceMesh results."""
+    frame = {"faceDetect": face_landmarks is not None}
+    for name, index in POSE_LANDMARKS:
+        landmark = pose_landmarks.landmark[index] if pose_landmarks else None
+        frame[name] = (
+            _point(landmark)
+            if landmark is not None and landmark.visibility >= SHOULDER_MIN_VISIBILITY
+            else None
+        )
+
+    face = face_landmarks[0].landmark if face_landmarks else None
+    for part, keys in LANDMARK_GROUPS:
+        if keys is not None:
+            frame[part] = {
+                key: _point(face[int(key)]) if face else None for key in keys
+            }
+    return frame
+
+
+def _load_models():
+    """Pool initializer: load the models once per worker and warm them up."""
+    global _pose, _face_mesh
+    import mediapipe as mp  # Imported in the worker only; it does not survive fork
+
+    _pose = mp.solutions.pose.Pose(static_image_mode=True, model_complexity=1)
+    _face_mesh = mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True, max_num_faces=1, refine_landmarks=True
+    )
+    blank = np.zeros((64, 64, 3), dtype=np.uint8)
+    _pose.process(blank)
+    _face_mesh.process(blank)
+
+
+def _ready():
+    return True
+
+
+def extract_landmarks(image):
+    """Pool task: landmarks of one BGR frame."""
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    pose = _pose.process(rgb)
+    face = _face_mesh.process(rgb)
+    return landmarks_to_frame(pose.pose_landmarks, face.multi_face_landmarks)
+
+
+def extract_image_landmarks(data):
+    """
+    Pool task: decode one JPEG/WebP frame and extract its landmarks. Returns
+    the frame (None if the image does not decode) with the decode and
+    inference times in seconds.
+    """
+    started = time.perf_counter()
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    decoded = time.perf_counter()
+    if image is None:
+        return None, decoded - started, 0.0
+    frame = extract_landmarks(_downscale(image))
+    return frame, decoded - started, time.perf_counter() - decoded
+
+
+def _downscale(image):
+    height, width = image.shape[:2]
+    if width <= LANDMARK_MAX_WIDTH:
+        return image
+    scale = LANDMARK_MAX_WIDTH / width
+    return cv2.resize(
+        image, (LANDMARK_MAX_WIDTH, round(height * scale)), interpolation=cv2.INTER_AREA
+    )
+
+
+def video_frame_rate(path, target_fps=LANDMARK_TARGET_FPS):
+    """
+    Rate of the frames `iter_video_landmarks` yields: the container's frame
+    rate, capped at `target_fps`.
+    """
+    capture = cv2.VideoCapture(str(path))
+    try:
+        if not capture.isOpened():
+            raise ValueError(f"Unable to open video {path}")
+        source_fps = capture.get(cv2.CAP_PROP_FPS)
+    finally:
+        capture.release()
+    return min(source_fps, target_fps) if source_fps > 0 else target_fps
+
+
+def iter_video_landmarks(
+    path,
+    executor,
+    target_fps=LANDMARK_TARGET_FPS,
+    max_in_flight=LANDMARK_MAX_IN_FLIGHT,
+):
+    """
+    Yield a landmark frame for each sampled video frame, in order. Frames are
+    sampled down to `target_fps`, the rate the detector's thresholds assume.
+    """
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise ValueError(f"Unable to open video {path}")
+
+    source_fps = capture.get(cv2.CAP_PROP_FPS) or target_fps
+    step = max(source_fps / target_fps, 1.0)
+    pending = deque()
+    try:
+        index, next_sample = 0, 0.0
+        while True:
+            if index >= next_sample:
+                ok, image = capture.read()
+                if not ok:
+                    break
+                pending.append(executor.submit(extract_landmarks, _downscale(image)))
+                next_sample += step
+            elif not capture.grab():  # Skipped frames are not converted
+                break
+            index += 1
+
+            while pending and (len(pending) >= max_in_flight or pending[0].done()):
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        capture.release()
+        for future in pending:
+            future.cancel()
+
+
+def landmark_extraction_available():
+    return importlib.util.find_spec("mediapipe") is not None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_landmark_executor():
+    """
+    Per-worker pool of pre-warmed models, or None when MediaPipe is not
+    installed. Every worker is started and warmed on first use, which blocks
+    until the models have loaded: call it from a thread, not the event loop.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None and landmark_extraction_available():
+            executor = ProcessPoolExecutor(
+                max_workers=LANDMARK_WORKERS, initializer=_load_models
+            )
+            for future in [executor.submit(_ready) for _ in range(LANDMARK_WORKERS)]:
+                future.result()
+            _executor = executor
+            logger.info(f"Started {LANDMARK_WORKERS} landmark extraction workers")
+    return _executor
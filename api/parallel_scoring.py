@@ -0,0 +1,199 @@
+"""
+Segment-parallel scoring of long videos.
+
+The detector is a state machine, so segments cannot be scored independently.
+Once the calibration prefix has been scored, the rest of a video is split into
+segments and scored like this:
+
+1. The presence counters (response_counter, sitting_stack, not_sitting_stack)
+   depend only on the face-detection sequence, so their exact values at every
+   segment start are computed up front in one cheap pass.
+2. Each segment is scored speculatively in a process pool. It starts from the
+   exact presence counters, and the remaining carry state (blink, distance and
+   thoracic stacks, eye flags, latest distance) is rebuilt by replaying a
+   warm-up window before the boundary. Those stacks reset every few seconds,
+   so the rebuilt state almost always matches.
+3. Segments are stitched in order. If a segment started from exactly the state
+   its predecessor ended in, its timeline events are replayed onto the live
+   detector and its session stats absorbed; otherwise it is re-scored
+   sequentially. Segments start on session-stats block boundaries, which makes
+   absorbing them bit-identical to a single pass.
+
+The result is identical to sequential scoring by construction; the speed-up
+depends on how often speculation holds and on the cores available.
+
+    PARALLEL_SCORING_WORKERS=4
+    PARALLEL_SCORING_MIN_FRAMES=27000
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import logging
+import math
+import os
+
+from api.detection import detection
+from api.pipeline import feature_rows
+from api.session_stats import STATS_BLOCK_SIZE, SessionStats
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_SCORING_WORKERS = int(os.getenv("PARALLEL_SCORING_WORKERS", "4"))
+# Shorter videos are not worth the process round trip (30 minutes at 15 fps)
+PARALLEL_SCORING_MIN_FRAMES = int(os.getenv("PARALLEL_SCORING_MIN_FRAMES", "27000"))
+SEGMENT_WARMUP_SECONDS = 60
+
+PRESENCE_FIELDS = ("response_counter", "sitting_stack", "not_sitting_stack")
+OUTPUT_FIELDS = frozenset(
+    ("timeline_result", "raw_timeline_result", "session_stats", "timeline_events")
+)
+
+
+def carry_state(detector):
+    """Everything that affects how the detector scores the next frame."""
+    return {
+        name: copy.deepcopy(value)
+        for name, value in vars(detector).items()
+        if name not in OUTPUT_FIELDS
+    }
+
+
+def load_carry_state(detector, carry):
+    vars(detector).update(copy.deepcopy(carry))
+
+
+class SegmentDetector(detection):
+    """Detector that records its timeline events instead of applying them."""
+
+    def __init__(self, carry):
+        super().__init__()
+        load_carry_state(self, carry)
+        self.timeline_events = []
+
+    def open_timeline_interval(self, topic, start):
+        self.timeline_events.append((True, topic, start))
+
+    def close_timeline_interval(self, topic, end):
+        self.timeline_events.append((False, topic, end))
+
+    def start_segment(self):
+        self.timeline_events = []
+        self.session_stats = SessionStats(
+            self.frame_per_second, self.focal_length, keep_blocks=True
+        )
+
+
+def score_segment(carry, features, faces, warmup):
+    """
+    Pool task: score the rows of `features` after the first `warmup`, which
+    only rebuild the carry state. Returns the carry state the segment started
+    from, the one it ended in, its timeline events and its session stats.
+    """
+    detector = SegmentDetector(carry)
+    rows = zip(feature_rows(features), faces)
+    for _, (current_values, face_detect) in zip(range(warmup), rows):
+        detector.detect(current_values, face_detect)
+
+    start = carry_state(detector)
+    detector.start_segment()
+    for current_values, face_detect in rows:
+        detector.detect(current_values, face_detect)
+    return (
+        start,
+        carry_state(detector),
+        detector.timeline_events,
+        detector.session_stats,
+    )
+
+
+def presence_counters(detector, faces, positions):
+    """Exact presence counters before each of the (sorted) `positions`."""
+    probe = SegmentDetector(carry_state(detector))
+    counters = []
+    wanted = iter(positions)
+    position = next(wanted, None)
+    for index, face_detect in enumerate(faces):
+        while position == index:
+            counters.append({name: getattr(probe, name) for name in PRESENCE_FIELDS})
+            position = next(wanted, None)
+        probe.response_counter += 1
+        probe.update_presence(face_detect)
+    return counters
+
+
+def score_segments(
+    detector, features, faces, executor, workers=PARALLEL_SCORING_WORKERS
+):
+    """
+    Score feature rows on a calibrated detector, exactly as calling
+    `detector.detect` on each in turn would. Returns the number of segments
+    that had to be re-scored.
+    """
+
+    def detect_rows(start, stop):
+        for current_values, face_detect in zip(
+            feature_rows(features, start, stop), faces[start:stop]
+        ):
+            detector.detect(current_values, face_detect)
+
+    # Run up to the next stats block boundary in place so segments align
+    head = min(-detector.session_stats.frames % STATS_BLOCK_SIZE, len(faces))
+    detect_rows(0, head)
+    if head == len(faces):
+        return 0
+
+    remaining = len(faces) - head
+    segment_size = STATS_BLOCK_SIZE * math.ceil(remaining / workers / STATS_BLOCK_SIZE)
+    bounds = list(range(head, len(faces), segment_size))
+    warmup = int(SEGMENT_WARMUP_SECONDS * detector.frame_per_second)
+    starts = [max(head, bound - warmup) for bound in bounds]
+    base = carry_state(detector)
+
+    futures = [
+        executor.submit(
+            score_segment,
+            {**base, **counters},
+            {
+                key: column[start : bound + segment_size]
+                for key, column in features.items()
+            },
+            faces[start : bound + segment_size],
+            bound - start,
+        )
+        for bound, start, counters in zip(
+            bounds,
+            starts,
+            presence_counters(detector, faces[head:], [s - head for s in starts]),
+        )
+    ]
+
+    rescored = 0
+    for bound, future in zip(bounds, futures):
+        start, end, timeline_events, session_stats = future.result()
+        if start == carry_state(detector):
+            for opened, topic, position in timeline_events:
+                if opened:
+                    detector.open_timeline_interval(topic, position)
+                else:
+                    detector.close_timeline_interval(topic, position)
+            detector.session_stats.absorb(session_stats)
+            load_carry_state(detector, end)
+        else:
+            rescored += 1
+            detect_rows(bound, bound + segment_size)
+
+    logger.info(
+        f"Scored {len(faces)} frames in {len(bounds)} segments, {rescored} re-scored"
+    )
+    return rescored
+
+
+_executor = None
+
+
+def get_segment_executor():
+    """Per-worker process pool for segment scoring, created on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PARALLEL_SCORING_WORKERS)
+    return _executor
@@ -0,0 +1,154 @@
+from itertools import islice
+import logging
+
+import numpy as np
+
+from api.procressData import batch_features, frames_to_arrays, processData
+
+logger = logging.getLogger(__name__)
+
+
+def extract_current_values(processed_data):
+    try:
+        return {
+            "shoulderPosition": processed_data.get_shoulder_position(),
+            "diameterRight": processed_data.get_diameter_right(),
+            "diameterLeft": processed_data.get_diameter_left(),
+            "eyeAspectRatioRight": processed_data.get_blink_right(),
+            "eyeAspectRatioLeft": processed_data.get_blink_left(),
+        }
+    except KeyError as e:
+        logger.error(f"Error extracting current values: missing key {e}")
+        return None
+    except TypeError as e:
+        logger.error(f"Error extracting current values: {e}")
+        return None
+
+
+def iter_frame_values(frames, batch_size=1024):
+    """
+    Yield (entry, current_values) for each frame, extracting features in
+    vectorized batches. current_values is None for malformed frames.
+    """
+    frames = iter(frames)
+    while True:
+        batch = list(islice(frames, batch_size))
+        if not batch:
+            return
+        points, mask, valid = frames_to_arrays(batch)
+        features = batch_features(points, mask)
+        keys = list(features)
+        rows = zip(batch, valid.tolist(), *(features[key].tolist() for key in keys))
+        for entry, is_valid, *values in rows:
+            if not is_valid:
+                logger.error("Error extracting current values: malformed frame")
+                yield entry, None
+                continue
+            # NaN marks a missing feature, as None does in extract_current_values
+            yield entry, {
+                key: (value if value == value else None)
+                for key, value in zip(keys, values)
+            }
+
+
+def extract_feature_columns(frames, batch_size=1024):
+    """
+    Vectorized features of the well-formed frames as arrays (NaN for a missing
+    feature), their faceDetect flags and the total frame count. Compact enough
+    to hand to worker processes; `feature_rows` turns them back into the dicts
+    `iter_frame_values` yields.
+    """
+    frames = iter(frames)
+    columns, faces, total = [], [], 0
+    while True:
+        batch = list(islice(frames, batch_size))
+        if not batch:
+            break
+        total += len(batch)
+        points, mask, valid = frames_to_arrays(batch)
+        features = batch_features(points, mask)
+        columns.append({key: values[valid] for key, values in features.items()})
+        faces += [
+            entry.get("faceDetect")
+            for entry, is_valid in zip(batch, valid.tolist())
+            if is_valid
+        ]
+    malformed = total - len(faces)
+    if malformed:
+        logger.error(f"Error extracting current values: {malformed} malformed frames")
+    if not columns:
+        return {}, faces, total
+    return (
+        {key: np.concatenate([c[key] for c in columns]) for key in columns[0]},
+        faces,
+        total,
+    )
+
+
+def feature_rows(features, start=0, stop=None):
+    """current_values dicts for rows [start, stop) of `extract_feature_columns`."""
+    keys = list(features)
+    columns = [features[key][start:stop].tolist() for key in keys]
+    return [
+        {key: (value if value == value else None) for key, value in zip(keys, row)}
+        for row in zip(*columns)
+    ]
+
+
+def score_values(detector, current_values, face_detect, posture_score=None):
+    """Calibrate the detector until it has a baseline, then detect."""
+    if not detector.is_calibrated():
+        detector.set_correct_value(current_values)
+    else:
+        detector.detect(current_values, face_detect, posture_score)
+
+
+def score_frame(detector, entry):
+    """
+    Run one client frame through feature extraction and the detector.
+    Returns the extracted values, or None if the frame was malformed.
+    """
+    current_values = extract_current_values(processData(entry))
+    if current_values is None:
+        return None
+
+    score_values(detector, current_values, entry.get("faceDetect"))
+    return current_values
+
+
+def score_frames(detector, frames):
+    """Score an iterable of frames; returns the number of frames consumed."""
+    count = 0
+    for entry, current_values in iter_frame_values(frames):
+        if current_values is not None:
+            score_values(detector, current_values, entry.get("faceDetect"))
+        count += 1
+    return count
+
+
+def decimated_fps(frame_per_second, decimation):
+    """Rate the detector sees when every `decimation`-th frame is scored."""
+    if frame_per_second % decimation == 0:
+        return frame_per_second // decimation
+    return frame_per_second / decimation
+
+
+def decimate_frames(frames, decimation, offset=0):
+    """Frames scored out of a sequence whose first frame has index `offset`."""
+    return frames[-offset % decimation :: decimation]
+
+
+def scale_timeline(timeline, scale):
+    """
+    Map timeline positions from scored frames to `scale` times as many frames,
+    e.g. back to source frames after a decimation of `scale`.
+    """
+    if scale == 1:
+        return timeline
+    return {
+        topic: [
+            [round(position * scale) for position in interval]
+            for interval in intervals
+        ]
+        for topic, intervals in timeline.items()
+    }
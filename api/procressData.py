@@ -1,133 +1,464 @@
 import math
 
+import numpy as np
+
+# Landmarks used by the features, as (part, key) with key None for single points
+LANDMARKS = (
+    ("leftShoulder", None),
+    ("rightShoulder", None),
+    *(("rightEye", key) for key in ("33", "133", "144", "153", "158", "160")),
+    *(("leftEye", key) for key in ("263", "362", "373", "380", "385", "387")),
+    *(("rightIris", key) for key in ("469", "471")),
+    *(("leftIris", key) for key in ("474", "476")),
+)
+LANDMARK_INDEX = {landmark: index for index, landmark in enumerate(LANDMARKS)}
+LANDMARK_GROUPS = (
+    ("leftShoulder", None),
+    ("rightShoulder", None),
+    ("rightEye", ("33", "133", "144", "153", "158", "160")),
+    ("leftEye", ("263", "362", "373", "380", "385", "387")),
+    ("rightIris", ("469", "471")),
+    ("leftIris", ("474", "476")),
+)
+
+
+# JSON numbers; bool is a type of its own, so true/false are rejected too
+NUMBER_TYPES = frozenset((int, float))
+
+
+def check_numbers(*values):
+    if not NUMBER_TYPES.issuperset(map(type, values)):
+        raise TypeError("landmark coordinates must be numbers")
+
+
+def coordinates(point):
+    """(x, y) of a landmark point, or None if it was reported as missing."""
+    if point is None:
+        return None
+    x, y = point["x"], point["y"]
+    check_numbers(x, y)
+    return x, y
+
+
+def eye_aspect_ratio(p1, p4, p2, p6, p3, p5):
+    """EAR of an eye's six points; None if one is missing or the eye has no width."""
+    if None in (p1, p4, p2, p6, p3, p5):
+        for point in (p1, p4, p2, p6, p3, p5):
+            coordinates(point)
+        return None
+    x1, y1, x4, y4 = p1["x"], p1["y"], p4["x"], p4["y"]
+    x2, y2, x6, y6 = p2["x"], p2["y"], p6["x"], p6["y"]
+    x3, y3, x5, y5 = p3["x"], p3["y"], p5["x"], p5["y"]
+    check_numbers(x1, y1, x4, y4, x2, y2, x6, y6, x3, y3, x5, y5)
+    dis_p1p4 = math.sqrt(pow(x1 - x4, 2) + pow(y1 - y4, 2))
+    if not dis_p1p4:
+        return None
+    dis_p2p6 = math.sqrt(pow(x2 - x6, 2) + pow(y2 - y6, 2))
+    dis_p3p5 = math.sqrt(pow(x3 - x5, 2) + pow(y3 - y5, 2))
+    return (dis_p2p6 + dis_p3p5) / dis_p1p4
+
+
+def iris_diameter(iris1, iris2):
+    if iris1 is None or iris2 is None:
+        coordinates(iris1)
+        coordinates(iris2)
+        return None
+    x1, y1, x2, y2 = iris1["x"], iris1["y"], iris2["x"], iris2["y"]
+    check_numbers(x1, y1, x2, y2)
+    return math.sqrt(pow(x1 - x2, 2) + pow(y1 - y2, 2))
+
 
 class processData:
+    """
+    Features of one frame. Raises KeyError for a missing part, key or coordinate
+    and TypeError for a point that is not a dict of numbers.
+    """
+
     def __init__(self, data):
         self.data = data
 
     def get_shoulder_position(self):
-        if (
-            self.data["leftShoulder"] is not None
-            and self.data["rightShoulder"] is not None
-        ):
-            shoulder_left = self.data["leftShoulder"]
-            shoulder_right = self.data["rightShoulder"]
-            return (shoulder_left["y"] + shoulder_right["y"]) / 2
-        elif self.data["leftShoulder"] is not None:
-            return self.data["leftShoulder"]["y"]
-        elif self.data["rightShoulder"] is not None:
-            return self.data["rightShoulder"]["y"]
+        shoulder_left = self.data["leftShoulder"]
+        shoulder_right = self.data["rightShoulder"]
+        if shoulder_left is not None and shoulder_right is not None:
+            left_y, right_y = shoulder_left["y"], shoulder_right["y"]
+            check_numbers(shoulder_left["x"], left_y, shoulder_right["x"], right_y)
+            return (left_y + right_y) / 2
+        elif shoulder_left is not None:
+            return coordinates(shoulder_left)[1]
+        elif shoulder_right is not None:
+            return coordinates(shoulder_right)[1]
         return None
 
     def get_blink_right(self):
-        if (
-            self.data["rightEye"]["33"] is not None
-            and self.data["rightEye"]["133"] is not None
-            and self.data["rightEye"]["144"] is not None
-            and self.data["rightEye"]["153"] is not None
-            and self.data["rightEye"]["158"] is not None
-            and self.data["rightEye"]["160"] is not None
-        ):
-            dis_p1p4 = math.sqrt(
-                pow(
-                    self.data["rightEye"]["33"]["x"]
-                    - self.data["rightEye"]["133"]["x"],
-                    2,
-                )
-                + pow(
-                    self.data["rightEye"]["33"]["y"]
-                    - self.data["rightEye"]["133"]["y"],
-                    2,
-                )
-            )
-            dis_p2p6 = math.sqrt(
-                pow(
-                    self.data["rightEye"]["160"]["x"]
-                    - self.data["rightEye"]["144"]["x"],
-                    2,
-                )
-                + pow(
-                    self.data["rightEye"]["160"]["y"]
-                    - self.data["rightEye"]["144"]["y"],
-                    2,
-                )
-            )
-            dis_p3p5 = math.sqrt(
-                pow(
-                    self.data["rightEye"]["158"]["x"]
-                    - self.data["rightEye"]["153"]["x"],
-                    2,
-                )
-                + pow(
-                    self.data["rightEye"]["158"]["y"]
-                    - self.data["rightEye"]["153"]["y"],
-                    2,
-                )
-            )
-            eAR = (dis_p2p6 + dis_p3p5) / (dis_p1p4)
-            return eAR
-        return None
+        eye = self.data["rightEye"]
+        return eye_aspect_ratio(
+            eye["33"], eye["133"], eye["160"], eye["144"], eye["158"], eye["153"]
+        )
 
     def get_blink_left(self):
-        if (
-            self.data["leftEye"]["263"] is not None
-            and self.data["leftEye"]["362"] is not None
-            and self.data["leftEye"]["373"] is not None
-            and self.data["leftEye"]["380"] is not None
-            and self.data["leftEye"]["385"] is not None
-            and self.data["leftEye"]["387"] is not None
-        ):
-            dis_p1p4 = math.sqrt(
-                pow(
-                    self.data["leftEye"]["362"]["x"] - self.data["leftEye"]["263"]["x"],
-                    2,
-                )
-                + pow(
-                    self.data["leftEye"]["362"]["y"] - self.data["leftEye"]["263"]["y"],
-                    2,
-                )
-            )
-            dis_p2p6 = math.sqrt(
-                pow(
-                    self.data["leftEye"]["385"]["x"] - self.data["leftEye"]["380"]["x"],
-                    2,
-                )
-                + pow(
-                    self.data["leftEye"]["385"]["y"] - self.data["leftEye"]["380"]["y"],
-                    2,
-                )
-            )
-            dis_p3p5 = math.sqrt(
-                pow(
-                    self.data["leftEye"]["387"]["x"] - self.data["leftEye"]["373"]["x"],
-                    2,
-                )
-                + pow(
-                    self.data["leftEye"]["387"]["y"] - self.data["leftEye"]["373"]["y"],
-                    2,
-                )
-            )
-            eAR = (dis_p2p6 + dis_p3p5) / (dis_p1p4)
-            return eAR
-        return None
+        eye = self.data["leftEye"]
+        return eye_aspect_ratio(
+            eye["362"], eye["263"], eye["385"], eye["380"], eye["387"], eye["373"]
+        )
 
     def get_diameter_right(self):
-        if self.data["rightIris"]["469"] is not None and self.data["rightIris"]["471"]:
-            iris1 = self.data["rightIris"]["469"]
-            iris2 = self.data["rightIris"]["471"]
-            return math.sqrt(
-                pow((iris1["x"] - iris2["x"]), 2) + pow((iris1["y"] - iris2["y"]), 2)
-            )
-        return None
+        iris = self.data["rightIris"]
+        return iris_diameter(iris["469"], iris["471"])
 
     def get_diameter_left(self):
+        iris = self.data["leftIris"]
+        return iris_diameter(iris["474"], iris["476"])
+
+
+def frames_to_arrays(frames):
+    """
+    Pack frame dicts into an (N, K, 2) point array, an (N, K) validity mask for
+    points reported as None, and an (N,) flag for frames that are malformed
+    (missing parts, keys or coordinates, or points that are not dicts of
+    numbers, see NUMBER_TYPES), which the scalar path rejects as well. Malformed
+    frames are all NaN.
+    """
+    coords, valid = [], []
+    nan = math.nan
+    missing = [nan, nan] * len(LANDMARKS)
+    for frame in frames:
+        try:
+            row = []
+            append = row.append
+            for part, keys in LANDMARK_GROUPS:
+                points = frame[part]
+                for point in (points,) if keys is None else [points[k] for k in keys]:
+                    if point is None:
+                        append(nan)
+                        append(nan)
+                        continue
+                    x, y = point["x"], point["y"]
+                    if type(x) not in NUMBER_TYPES or type(y) not in NUMBER_TYPES:
+                        raise TypeError("landmark coordinates must be numbers")
+                    append(x)
+                    append(y)
+            valid.append(True)
+        except (KeyError, TypeError):
+            row = missing
+            valid.append(False)
+        coords += row
+
+    points = np.array(coords, dtype=np.float64).reshape(-1, len(LANDMARKS), 2)
+    mask = ~np.isnan(points[:, :, 0])
+    return points, mask, np.array(valid, dtype=bool)
+
+
+def _distance(points, a, b):
+    delta = points[:, LANDMARK_INDEX[a]] - points[:, LANDMARK_INDEX[b]]
+    return np.hypot(delta[:, 0], delta[:, 1])
+
+
+def _present(mask, *landmarks):
+    return np.logical_and.reduce([mask[:, LANDMARK_INDEX[lm]] for lm in landmarks])
+
+
+def _eye_aspect_ratio(points, mask, part, p1, p4, p2, p6, p3, p5):
+    landmarks = [(part, key) for key in (p1, p4, p2, p6, p3, p5)]
+    width = _distance(points, landmarks[0], landmarks[1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ear = (
+            _distance(points, landmarks[2], landmarks[3])
+            + _distance(points, landmarks[4], landmarks[5])
+        ) / width
+    # An eye without width has no ratio, as in eye_aspect_ratio
+    return np.where(_present(mask, *landmarks) & (width != 0), ear, np.nan)
+
+
+def batch_features(points, mask):
+    """
+    Vectorized equivalent of processData over N frames at once. Takes the
+    (N, K, 2) points and (N, K) mask from `frames_to_arrays` and returns
+    N-length arrays keyed like `extract_current_values`, NaN where the scalar
+    methods return None.
+    """
+    left, right = ("leftShoulder", None), ("rightShoulder", None)
+    left_y = points[:, LANDMARK_INDEX[left], 1]
+    right_y = points[:, LANDMARK_INDEX[right], 1]
+    has_left, has_right = _present(mask, left), _present(mask, right)
+    shoulder = np.where(
+        has_left & has_right,
+        (left_y + right_y) / 2,
+        np.where(has_left, left_y, np.where(has_right, right_y, np.nan)),
+    )
+
+    iris_right = (("rightIris", "469"), ("rightIris", "471"))
+    iris_left = (("leftIris", "474"), ("leftIris", "476"))
+    return {
+        "shoulderPosition": shoulder,
+        "diameterRight": np.where(
+            _present(mask, *iris_right), _distance(points, *iris_right), np.nan
+        ),
+        "diameterLeft": np.where(
+            _present(mask, *iris_left), _distance(points, *iris_left), np.nan
+        ),
+        "eyeAspectRatioRight": _eye_aspect_ratio(
+            points, mask, "rightEye", "33", "133", "160", "144", "158", "153"
+        ),
+        "eyeAspectRatioLeft": _eye_aspect_ratio(
+            points, mask, "leftEye", "362", "263", "385", "380", "387", "373"
+        ),
+    }
+
+
+_MISSING = object()
+
+# Bits of LANDMARKS slots in FrameDecoder's present mask
+LEFT_SHOULDER, RIGHT_SHOULDER = 1 << 0, 1 << 1
+RIGHT_EYE = 0b111111 << 2
+LEFT_EYE = 0b111111 << 8
+RIGHT_IRIS = 0b11 << 14
+LEFT_IRIS = 0b11 << 16
+
+
+class FrameDecoder:
+    """
+    Single-frame fast path for streaming. Decodes a frame into a reused flat
+    [x0, y0, x1, y1, ...] buffer ordered like LANDMARKS, with present points in
+    a bitmask, and computes the features from constant buffer offsets. Every
+    check is a plain key or type test rather than an exception, so a malformed
+    frame is turned away after a few lookups. The decoding is written out point
+    by point: loops over LANDMARKS cost about half as much again per frame.
+    """
+
+    def __init__(self):
+        self.buffer = [0.0] * (2 * len(LANDMARKS))
+
+    def extract(self, frame):
+        """Return the same values as extract_current_values, or None if malformed."""
+        if type(frame) is not dict:
+            return None
+        left_shoulder = frame.get("leftShoulder", _MISSING)
+        right_shoulder = frame.get("rightShoulder", _MISSING)
+        right_eye, left_eye = frame.get("rightEye"), frame.get("leftEye")
+        right_iris, left_iris = frame.get("rightIris"), frame.get("leftIris")
         if (
-            self.data["leftIris"]["474"] is not None
-            and self.data["leftIris"]["476"] is not None
+            left_shoulder is _MISSING
+            or right_shoulder is _MISSING
+            or type(right_eye) is not dict
+            or type(left_eye) is not dict
+            or type(right_iris) is not dict
+            or type(left_iris) is not dict
         ):
-            iris1 = self.data["leftIris"]["474"]
-            iris2 = self.data["leftIris"]["476"]
-            return math.sqrt(
-                pow((iris1["x"] - iris2["x"]), 2) + pow((iris1["y"] - iris2["y"]), 2)
-            )
-        return None
+            return None
+
+        # A point is a dict, whose coordinates are type checked at the end, or
+        # None, whose slot is zeroed so that the whole buffer is from this frame.
+        # A missing key reads as _MISSING and is neither.
+        buffer = self.buffer
+        present = 0
+        point = left_shoulder
+        if type(point) is dict:
+            buffer[0], buffer[1] = point.get("x"), point.get("y")
+            present |= 1 << 0
+        elif point is None:
+            buffer[0] = buffer[1] = 0.0
+        else:
+            return None
+
+        point = right_shoulder
+        if type(point) is dict:
+            buffer[2], buffer[3] = point.get("x"), point.get("y")
+            present |= 1 << 1
+        elif point is None:
+            buffer[2] = buffer[3] = 0.0
+        else:
+            return None
+
+        point = right_eye.get("33", _MISSING)
+        if type(point) is dict:
+            buffer[4], buffer[5] = point.get("x"), point.get("y")
+            present |= 1 << 2
+        elif point is None:
+            buffer[4] = buffer[5] = 0.0
+        else:
+            return None
+
+        point = right_eye.get("133", _MISSING)
+        if type(point) is dict:
+            buffer[6], buffer[7] = point.get("x"), point.get("y")
+            present |= 1 << 3
+        elif point is None:
+            buffer[6] = buffer[7] = 0.0
+        else:
+            return None
+
+        point = right_eye.get("144", _MISSING)
+        if type(point) is dict:
+            buffer[8], buffer[9] = point.get("x"), point.get("y")
+            present |= 1 << 4
+        elif point is None:
+            buffer[8] = buffer[9] = 0.0
+        else:
+            return None
+
+        point = right_eye.get("153", _MISSING)
+        if type(point) is dict:
+            buffer[10], buffer[11] = point.get("x"), point.get("y")
+            present |= 1 << 5
+        elif point is None:
+            buffer[10] = buffer[11] = 0.0
+        else:
+            return None
+
+        point = right_eye.get("158", _MISSING)
+        if type(point) is dict:
+            buffer[12], buffer[13] = point.get("x"), point.get("y")
+            present |= 1 << 6
+        elif point is None:
+            buffer[12] = buffer[13] = 0.0
+        else:
+            return None
+
+        point = right_eye.get("160", _MISSING)
+        if type(point) is dict:
+            buffer[14], buffer[15] = point.get("x"), point.get("y")
+            present |= 1 << 7
+        elif point is None:
+            buffer[14] = buffer[15] = 0.0
+        else:
+            return None
+
+        point = left_eye.get("263", _MISSING)
+        if type(point) is dict:
+            buffer[16], buffer[17] = point.get("x"), point.get("y")
+            present |= 1 << 8
+        elif point is None:
+            buffer[16] = buffer[17] = 0.0
+        else:
+            return None
+
+        point = left_eye.get("362", _MISSING)
+        if type(point) is dict:
+            buffer[18], buffer[19] = point.get("x"), point.get("y")
+            present |= 1 << 9
+        elif point is None:
+            buffer[18] = buffer[19] = 0.0
+        else:
+            return None
+
+        point = left_eye.get("373", _MISSING)
+        if type(point) is dict:
+            buffer[20], buffer[21] = point.get("x"), point.get("y")
+            present |= 1 << 10
+        elif point is None:
+            buffer[20] = buffer[21] = 0.0
+        else:
+            return None
+
+        point = left_eye.get("380", _MISSING)
+        if type(point) is dict:
+            buffer[22], buffer[23] = point.get("x"), point.get("y")
+            present |= 1 << 11
+        elif point is None:
+            buffer[22] = buffer[23] = 0.0
+        else:
+            return None
+
+        point = left_eye.get("385", _MISSING)
+        if type(point) is dict:
+            buffer[24], buffer[25] = point.get("x"), point.get("y")
+            present |= 1 << 12
+        elif point is None:
+            buffer[24] = buffer[25] = 0.0
+        else:
+            return None
+
+        point = left_eye.get("387", _MISSING)
+        if type(point) is dict:
+            buffer[26], buffer[27] = point.get("x"), point.get("y")
+            present |= 1 << 13
+        elif point is None:
+            buffer[26] = buffer[27] = 0.0
+        else:
+            return None
+
+        point = right_iris.get("469", _MISSING)
+        if type(point) is dict:
+            buffer[28], buffer[29] = point.get("x"), point.get("y")
+            present |= 1 << 14
+        elif point is None:
+            buffer[28] = buffer[29] = 0.0
+        else:
+            return None
+
+        point = right_iris.get("471", _MISSING)
+        if type(point) is dict:
+            buffer[30], buffer[31] = point.get("x"), point.get("y")
+            present |= 1 << 15
+        elif point is None:
+            buffer[30] = buffer[31] = 0.0
+        else:
+            return None
+
+        point = left_iris.get("474", _MISSING)
+        if type(point) is dict:
+            buffer[32], buffer[33] = point.get("x"), point.get("y")
+            present |= 1 << 16
+        elif point is None:
+            buffer[32] = buffer[33] = 0.0
+        else:
+            return None
+
+        point = left_iris.get("476", _MISSING)
+        if type(point) is dict:
+            buffer[34], buffer[35] = point.get("x"), point.get("y")
+            present |= 1 << 17
+        elif point is None:
+            buffer[34] = buffer[35] = 0.0
+        else:
+            return None
+
+        if not NUMBER_TYPES.issuperset(map(type, buffer)):
+            return None
+        return decoded_features(buffer, present)
+
+
+def decoded_features(b, present, hypot=math.hypot):
+    """Features from a FrameDecoder buffer; offsets are 2 * the LANDMARKS slot."""
+    if present & LEFT_SHOULDER and present & RIGHT_SHOULDER:
+        shoulder = (b[1] + b[3]) / 2
+    elif present & LEFT_SHOULDER:
+        shoulder = b[1]
+    elif present & RIGHT_SHOULDER:
+        shoulder = b[3]
+    else:
+        shoulder = None
+
+    # p1, p4 are the eye corners, p2, p6 and p3, p5 the lid pairs (get_blink_*)
+    ear_right = ear_left = None
+    if present & RIGHT_EYE == RIGHT_EYE:
+        width = hypot(b[4] - b[6], b[5] - b[7])  # 33, 133
+        if width:
+            ear_right = (
+                hypot(b[14] - b[8], b[15] - b[9])  # 160, 144
+                + hypot(b[12] - b[10], b[13] - b[11])  # 158, 153
+            ) / width
+    if present & LEFT_EYE == LEFT_EYE:
+        width = hypot(b[18] - b[16], b[19] - b[17])  # 362, 263
+        if width:
+            ear_left = (
+                hypot(b[24] - b[22], b[25] - b[23])  # 385, 380
+                + hypot(b[26] - b[20], b[27] - b[21])  # 387, 373
+            ) / width
+
+    return {
+        "shoulderPosition": shoulder,
+        "diameterRight": (
+            hypot(b[28] - b[30], b[29] - b[31])  # 469, 471
+            if present & RIGHT_IRIS == RIGHT_IRIS
+            else None
+        ),
+        "diameterLeft": (
+            hypot(b[32] - b[34], b[33] - b[35])  # 474, 476
+            if present & LEFT_IRIS == LEFT_IRIS
+            else None
+        ),
+        "eyeAspectRatioRight": ear_right,
+        "eyeAspectRatioLeft": ear_left,
+    }
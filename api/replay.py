@@ -0,0 +1,123 @@
+"""
+Replay recorded sessions through the detector without FastAPI or the database.
+
+Usage:
+    python -m api.replay recordings/*.ndjson --workers 4 --output results.ndjson
+
+Input files are either NDJSON (one frame per line, streamed) or JSON holding a
+list of frames or a video upload body with a "files" list.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from pathlib import Path
+import sys
+import time
+
+from api import codec
+from api.detection import detection
+from api.pipeline import score_frames
+
+logger = logging.getLogger(__name__)
+
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+
+
+def iter_frames(path):
+    """Yield frames from a recorded session file."""
+    path = Path(path)
+    if path.suffix in NDJSON_SUFFIXES:
+        with path.open("rb") as f:
+            for line in f:
+                if line.strip():
+                    yield codec.loads(line)
+        return
+
+    with path.open("rb") as f:
+        data = codec.loads(f.read())
+    yield from data["files"] if isinstance(data, dict) else data
+
+
+def replay_file(path, frame_per_second=15, focal_length=0, raw_timeline=False):
+    """Score one recording and return its timeline, stats and throughput."""
+    detector = detection(
+        frame_per_second=frame_per_second,
+        focal_length=focal_length,
+        keep_raw_timeline=raw_timeline,
+    )
+    start = time.perf_counter()
+    frames = score_frames(detector, iter_frames(path))
+    detector.finalize_timeline()
+    elapsed = time.perf_counter() - start
+    result = {
+        "file": str(path),
+        "frames": frames,
+        "seconds": elapsed,
+        "frames_per_second": frames / elapsed if elapsed else None,
+        "timeline": detector.get_timeline_result(),
+        "stats": detector.get_session_stats(),
+    }
+    if raw_timeline:
+        result["raw_timeline"] = detector.get_raw_timeline_result()
+    return result
+
+
+def replay_files(
+    paths, workers=1, frame_per_second=15, focal_length=0, raw_timeline=False
+):
+    """Replay files in order, across a process pool when workers > 1."""
+    args = [(path, frame_per_second, focal_length, raw_timeline) for path in paths]
+    if workers <= 1:
+        for arg in args:
+            yield replay_file(*arg)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(replay_file, *zip(*args))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="+", help="Recorded session files")
+    parser.add_argument("--workers", type=int, default=1, help="Process pool size")
+    parser.add_argument("--fps", type=int, default=15, help="Recording frame rate")
+    parser.add_argument(
+        "--focal-length", type=float, default=0, help="Camera focal length, 0 = off"
+    )
+    parser.add_argument(
+        "--raw-timeline",
+        action="store_true",
+        help="Also output uncompacted blink/thoracic timelines",
+    )
+    parser.add_argument(
+        "--output", help="Write per-file results as NDJSON (default: stdout)"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    out = open(args.output, "w") if args.output else sys.stdout
+    total_frames, start = 0, time.perf_counter()
+    try:
+        for result in replay_files(
+            args.files, args.workers, args.fps, args.focal_length, args.raw_timeline
+        ):
+            total_frames += result["frames"]
+            logger.info(
+                f"{result['file']}: {result['frames']} frames, "
+                f"{result['frames_per_second'] or 0:.0f} frames/sec"
+            )
+            out.write(codec.dumps_text(result) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Replayed {len(args.files)} files, {total_frames} frames in {elapsed:.2f}s "
+        f"({total_frames / elapsed:.0f} frames/sec overall)"
+    )
+
+
+if __name__ == "__main__":
+    main()
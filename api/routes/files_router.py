@@ -1,35 +1,89 @@
-from datetime import datetime
 import logging
-import shutil
 from typing import List
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import Response
+from datetime import datetime
+from functools import partial
+import os
+import tempfile
 import uuid
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from pathlib import Path
+import cv2
 from requests import Session
+from starlette.concurrency import run_in_threadpool
 
-from api.calibration import calibrate_camera
-from api.image_processing import download_file, receive_upload_images
-from api.procressData import processData
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+
+from api import codec
+from api.baseline import stored_baseline_values
+from api.calibration import (
+    CALIBRATION_BOARD,
+    CALIBRATION_BOARDS,
+    CalibrationCancelled,
+    calibrate_images,
+    render_board,
+)
+from api.calibration_queue import CalibrationQueueFull, get_calibration_queue
+from api.calibration_store import save_calibration
+from api.codec import JSONDecodeError
+from api.image_processing import decode_calibration_images, download_file
+from api.jobs import get_video_job_queue, spool_frames
+from api.landmark_extraction import (
+    LANDMARK_TARGET_FPS,
+    get_landmark_executor,
+    iter_video_landmarks,
+    video_frame_rate,
+)
+from api.parallel_scoring import PARALLEL_SCORING_MIN_FRAMES, get_segment_executor
 from api.request_user import get_current_user
+from api.shadow import get_shadow_evaluator
+from api.video_scoring import (
+    VideoScorer,
+    content_hasher,
+    dedup_counters,
+    hash_frames,
+    idempotent_session_id,
+    session_exists,
+    update_content_hash,
+)
+from database.crud import (
+    create_video_job,
+    get_or_create_video_upload,
+    get_session_by_content_hash,
+    get_video_job,
+    get_video_upload,
+)
 from database.database import get_db
 
-from api.detection import detection
-
-# from api.detection import Detection
-from database.model import SittingSession
-from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-
-from database.schemas.User import VideoUploadRequest
+from database.schemas.User import (
+    VideoChunkRequest,
+    VideoNameRequest,
+    VideoUploadRequest,
+)
 
 
 logger = logging.getLogger(__name__)
 
 files_router = APIRouter()
 
+MAX_NDJSON_LINE_BYTES = 8 * 1024 * 1024  # Header line carries the thumbnail
+MAX_VIDEO_FILE_BYTES = int(os.getenv("MAX_VIDEO_FILE_BYTES", str(2 * 1024**3)))
+VIDEO_FILE_CHUNK_BYTES = 1024 * 1024
+
 
 @files_router.post("/upload/video", status_code=status.HTTP_200_OK)
 async def video_process_result_upload(
     request: VideoUploadRequest,
+    http_request: Request,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
@@ -38,104 +92,515 @@ async def video_process_result_upload(
     if not object_data:
         raise HTTPException(status_code=400, detail="No file data provided")
 
-    # Initialize and extract variables
-    detector = detection(frame_per_second=15)
-    sitting_session_id = uuid.uuid4()
-    user_id = current_user["user_id"]
-    date = datetime.now()
-
-    # Process each frame entry in object_data
-    for i, entry in enumerate(object_data):
-        processed_data = processData(entry)
-        current_values = {
-            "shoulderPosition": processed_data.get_shoulder_position(),
-            "diameterRight": processed_data.get_diameter_right(),
-            "diameterLeft": processed_data.get_diameter_left(),
-            "eyeAspectRatioRight": processed_data.get_blink_right(),
-            "eyeAspectRatioLeft": processed_data.get_blink_left(),
-        }
-
-        # Set baseline values if within first 15 frames; otherwise, detect issues
-        if i < 15:
-            detector.set_correct_value(current_values)
-        else:
-            detector.detect(current_values, entry.get("faceDetect"))
-
-    # Retrieve detection results
-    timeline_result = detector.get_timeline_result()
-
-    # Create SittingSession record
-    db_sitting_session = SittingSession(
-        sitting_session_id=sitting_session_id,
-        user_id=user_id,
-        blink=timeline_result["blink"],
-        sitting=timeline_result["sitting"],
-        distance=timeline_result["distance"],
-        thoracic=timeline_result["thoracic"],
-        date=date,
-        duration=len(object_data),
-        file_name=request.video_name,
-        thumbnail=request.thumbnail,
-        session_type="video",
-        is_complete=True,
+    # A retried request with the same Idempotency-Key returns the first result
+    sitting_session_id = None
+    idempotency_key = http_request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        sitting_session_id = idempotent_session_id(
+            current_user["user_id"], idempotency_key
+        )
+        if session_exists(db, sitting_session_id):
+            return {"sitting_session_id": str(sitting_session_id)}
+
+    # Identical frames were already scored for this user; reuse that session
+    device_identifier = http_request.headers.get("Device-Identifier")
+    baseline = stored_baseline_values(db, current_user["user_id"], device_identifier)
+    content_hash = await run_in_threadpool(hash_frames, object_data, baseline=baseline)
+    duplicate = get_session_by_content_hash(db, current_user["user_id"], content_hash)
+    dedup_counters.record(len(object_data), duplicate is not None)
+    if duplicate is not None:
+        return {"sitting_session_id": str(duplicate.sitting_session_id)}
+
+    scorer = VideoScorer(db, current_user["user_id"], device_identifier)
+    if len(object_data) >= PARALLEL_SCORING_MIN_FRAMES:
+        await run_in_threadpool(
+            scorer.add_frames_parallel, object_data, get_segment_executor()
+        )
+    else:
+        await run_in_threadpool(scorer.add_frames, object_data)
+    scorer.finish()
+
+    try:
+        sitting_session_id = scorer.save(
+            request.video_name, request.thumbnail, sitting_session_id, content_hash
+        )
+    except HTTPException:
+        # A concurrent retry with the same Idempotency-Key saved it first
+        if idempotency_key and session_exists(db, sitting_session_id):
+            return {"sitting_session_id": str(sitting_session_id)}
+        raise
+    return {"sitting_session_id": str(sitting_session_id)}
+
+
+@files_router.post("/upload/video/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_video_job(
+    request: VideoUploadRequest,
+    http_request: Request,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Queue a video for background scoring. Poll /upload/video/jobs/{job_id} for
+    the resulting sitting_session_id.
+    """
+    if not request.files:
+        raise HTTPException(status_code=400, detail="No file data provided")
+
+    job_queue = get_video_job_queue()
+    if job_queue.is_full():
+        raise HTTPException(
+            status_code=503, detail="Video processing queue is full, retry later."
+        )
+
+    job_id = uuid.uuid4()
+    baseline = stored_baseline_values(
+        db, current_user["user_id"], http_request.headers.get("Device-Identifier")
     )
+    content_hash = await run_in_threadpool(
+        hash_frames, request.files, baseline=baseline
+    )
+    duplicate = get_session_by_content_hash(db, current_user["user_id"], content_hash)
+    dedup_counters.record(len(request.files), duplicate is not None)
+    if duplicate is not None:
+        # Record a finished job so clients poll it like any other
+        create_video_job(
+            db,
+            job_id,
+            current_user["user_id"],
+            http_request.headers.get("Device-Identifier"),
+            request.video_name,
+            request.thumbnail,
+            "",
+            status="done",
+            sitting_session_id=duplicate.sitting_session_id,
+        )
+        return {"job_id": str(job_id), "status": "done"}
+
+    payload_path = await run_in_threadpool(spool_frames, job_id, request.files)
+    create_video_job(
+        db,
+        job_id,
+        current_user["user_id"],
+        http_request.headers.get("Device-Identifier"),
+        request.video_name,
+        request.thumbnail,
+        payload_path,
+    )
+    job_queue.submit(job_id)
+    return {"job_id": str(job_id), "status": "queued"}
+
+
+@files_router.get("/upload/video/jobs/metrics")
+async def video_job_metrics(current_user: dict = Depends(get_current_user)):
+    shadow_evaluator = get_shadow_evaluator()
+    return {
+        **get_video_job_queue().get_metrics(),
+        "shadow": shadow_evaluator.get_metrics() if shadow_evaluator else None,
+    }
+
+
+@files_router.get("/upload/video/dedup/metrics")
+async def video_dedup_metrics(current_user: dict = Depends(get_current_user)):
+    return dedup_counters.get_metrics()
+
+
+@files_router.get("/upload/video/jobs/{job_id}")
+async def video_job_status(
+    job_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    job = get_video_job(db, job_id, current_user["user_id"])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "sitting_session_id": (
+            job.sitting_session_id if job.status == "done" else None
+        ),
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def video_upload_status(upload):
+    return {
+        "upload_id": upload.upload_id,
+        "status": upload.status,
+        "offset": upload.received_frames,
+        "sitting_session_id": (
+            upload.sitting_session_id if upload.status == "committed" else None
+        ),
+    }
+
+
+def restore_video_scorer(db, upload):
+    scorer = VideoScorer(db, upload.user_id, upload.device_identifier, shadow=False)
+    if upload.state is not None:
+        scorer.load_state(upload.state)
+    return scorer
+
+
+@files_router.post("/upload/video/chunked", status_code=status.HTTP_201_CREATED)
+async def start_video_upload(
+    request: VideoNameRequest,
+    http_request: Request,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Start (or look up) a resumable upload. Frames are then sent with PUT
+    /upload/video/chunked/{upload_id} and scored as each chunk arrives; the
+    session is stored on commit. The Idempotency-Key header identifies the
+    logical upload, so retries resume it instead of starting over.
+    """
+    idempotency_key = http_request.headers.get("Idempotency-Key")
+    if not idempotency_key:
+        raise HTTPException(status_code=400, detail="Idempotency-Key header required")
+
+    upload = get_or_create_video_upload(
+        db,
+        current_user["user_id"],
+        idempotency_key,
+        http_request.headers.get("Device-Identifier"),
+        request.video_name,
+        request.thumbnail,
+        idempotent_session_id(current_user["user_id"], idempotency_key),
+    )
+    return video_upload_status(upload)
+
+
+@files_router.get("/upload/video/chunked/{upload_id}")
+async def get_video_upload_status(
+    upload_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    upload = get_video_upload(db, upload_id, current_user["user_id"])
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return video_upload_status(upload)
+
+
+@files_router.put("/upload/video/chunked/{upload_id}")
+async def upload_video_chunk(
+    upload_id: uuid.UUID,
+    request: VideoChunkRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Append frames starting at `offset`. Frames the server already holds are
+    skipped, so a chunk can be resent safely after a timeout.
+    """
+    upload = get_video_upload(db, upload_id, current_user["user_id"], for_update=True)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.status != "open":
+        raise HTTPException(status_code=409, detail="Upload already committed")
+    if request.offset > upload.received_frames:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Chunk offset {request.offset} is past the received "
+            f"{upload.received_frames} frames",
+        )
+
+    new_frames = request.files[upload.received_frames - request.offset :]
+    if new_frames:
+        scorer = restore_video_scorer(db, upload)
+        await run_in_threadpool(scorer.add_frames, new_frames)
+        upload.state = scorer.get_state()
+        upload.received_frames = scorer.frames
+        upload.updated_at = datetime.now()
+        try:
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error saving upload chunk: {e}")
+            raise HTTPException(status_code=500, detail="Error saving upload chunk.")
+    else:
+        db.rollback()  # Release the row lock
+    return video_upload_status(upload)
+
+
+@files_router.post("/upload/video/chunked/{upload_id}/commit")
+async def commit_video_upload(
+    upload_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    upload = get_video_upload(db, upload_id, current_user["user_id"], for_update=True)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.status == "committed":
+        db.rollback()
+        return video_upload_status(upload)
+    if not upload.received_frames:
+        raise HTTPException(status_code=400, detail="No file data provided")
 
-    # Database transaction
+    # The session may already exist if a previous commit failed after saving it
+    if not session_exists(db, upload.sitting_session_id):
+        scorer = restore_video_scorer(db, upload)
+        scorer.finish()
+        scorer.save(upload.video_name, upload.thumbnail, upload.sitting_session_id)
+
+    upload.status = "committed"
+    upload.state = None
+    upload.updated_at = datetime.now()
     try:
-        db.add(db_sitting_session)
         db.commit()
-        db.refresh(db_sitting_session)
-        return {"sitting_session_id": str(sitting_session_id)}
-    except IntegrityError:
+    except SQLAlchemyError as e:
         db.rollback()
-        raise HTTPException(
-            status_code=400, detail="A session with this ID already exists."
+        logger.error(f"Error committing upload: {e}")
+        raise HTTPException(status_code=500, detail="Error committing upload.")
+    return video_upload_status(upload)
+
+
+async def iter_ndjson_lines(request: Request):
+    """Yield non-empty lines of the request body as they arrive."""
+    # Only the new chunk is scanned for newlines; the buffer holds one partial line
+    buffer = bytearray()
+    async for chunk in request.stream():
+        view = memoryview(chunk)
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            buffer += view[start:end]
+            start = end + 1
+            if len(buffer) > MAX_NDJSON_LINE_BYTES:
+                raise HTTPException(status_code=413, detail="NDJSON line too large")
+            if buffer.strip():
+                yield bytes(buffer)
+            buffer.clear()
+        buffer += view[start:]
+        if len(buffer) > MAX_NDJSON_LINE_BYTES:
+            raise HTTPException(status_code=413, detail="NDJSON line too large")
+    if buffer.strip():
+        yield bytes(buffer)
+
+
+@files_router.post("/upload/video/stream", status_code=status.HTTP_200_OK)
+async def video_process_result_stream(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Streaming variant of /upload/video. The body is NDJSON: a header line with
+    video_name and thumbnail, then one frame per line. Frames are hashed and
+    spooled to disk as they arrive and scored only if no identical upload was
+    scored before, so memory stays flat regardless of video length.
+    """
+    lines = iter_ndjson_lines(request)
+    try:
+        header = VideoNameRequest(**codec.loads(await anext(lines)))
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="No file data provided")
+    except (JSONDecodeError, TypeError, ValidationError):
+        raise HTTPException(status_code=400, detail="Invalid NDJSON header line")
+
+    device_identifier = request.headers.get("Device-Identifier")
+    baseline = stored_baseline_values(db, current_user["user_id"], device_identifier)
+    hasher = content_hasher(baseline=baseline)
+    frames = 0
+    with tempfile.TemporaryFile() as spooled:
+        async for line in lines:
+            try:
+                entry = codec.loads(line)
+            except JSONDecodeError:
+                entry = None
+            if not isinstance(entry, dict):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid frame JSON at line {frames + 2}",
+                )
+            update_content_hash(hasher, entry)
+            spooled.write(line)
+            spooled.write(b"\n")
+            frames += 1
+
+        if not frames:
+            raise HTTPException(status_code=400, detail="No file data provided")
+        content_hash = hasher.hexdigest()
+        duplicate = get_session_by_content_hash(
+            db, current_user["user_id"], content_hash
         )
-    except SQLAlchemyError:
-        db.rollback()
+        dedup_counters.record(frames, duplicate is not None)
+        if duplicate is not None:
+            return {"sitting_session_id": str(duplicate.sitting_session_id)}
+
+        spooled.seek(0)
+        scorer = VideoScorer(db, current_user["user_id"], device_identifier)
+        await run_in_threadpool(score_spooled_frames, scorer, spooled)
+    scorer.finish()
+
+    sitting_session_id = scorer.save(
+        header.video_name, header.thumbnail, content_hash=content_hash
+    )
+    return {"sitting_session_id": str(sitting_session_id)}
+
+
+def score_spooled_frames(scorer, spooled):
+    for line in spooled:
+        scorer.add_frame(codec.loads(line))
+
+
+async def hash_video_file(file: UploadFile, hasher):
+    """Hash an uploaded video where Starlette spooled it and return its size."""
+    size = 0
+    while chunk := await file.read(VIDEO_FILE_CHUNK_BYTES):
+        size += len(chunk)
+        if size > MAX_VIDEO_FILE_BYTES:
+            raise HTTPException(status_code=413, detail="Video file too large")
+        hasher.update(chunk)
+    return size
+
+
+def video_file_path(file: UploadFile):
+    """
+    Path OpenCV can open an uploaded video by, without copying it. Small uploads
+    are held in memory until rolled over; on Linux the spooled file is anonymous
+    and reached through its descriptor.
+    """
+    file.file.rollover()
+    name = file.file.name
+    return f"/proc/self/fd/{name}" if isinstance(name, int) else name
+
+
+def score_video_file(scorer, path, executor):
+    for frame in iter_video_landmarks(path, executor):
+        scorer.add_frame(frame)
+
+
+@files_router.post("/upload/video/file", status_code=status.HTTP_200_OK)
+async def video_file_upload(
+    http_request: Request,
+    file: UploadFile = File(...),
+    video_name: str = Form(...),
+    thumbnail: str = Form(""),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Score a raw video file. Landmarks are extracted on the server, for clients
+    too slow to run MediaPipe themselves.
+    """
+    executor = await run_in_threadpool(get_landmark_executor)
+    if executor is None:
         raise HTTPException(
-            status_code=500, detail="Database error while creating sitting session."
+            status_code=503, detail="Server-side landmark extraction is unavailable."
         )
 
+    device_identifier = http_request.headers.get("Device-Identifier")
+    baseline = stored_baseline_values(db, current_user["user_id"], device_identifier)
+    hasher = content_hasher(LANDMARK_TARGET_FPS, baseline=baseline)
+    hasher.update(b"video-file:")
+    size = await hash_video_file(file, hasher)
+    content_hash = hasher.hexdigest()
+    duplicate = get_session_by_content_hash(db, current_user["user_id"], content_hash)
+    dedup_counters.record(0, duplicate is not None)
+    if duplicate is not None:
+        return {"sitting_session_id": str(duplicate.sitting_session_id)}
+
+    try:
+        path = await run_in_threadpool(video_file_path, file)
+        # Videos below the target rate are scored at their own rate
+        frame_per_second = await run_in_threadpool(video_frame_rate, path)
+        scorer = VideoScorer(
+            db,
+            current_user["user_id"],
+            device_identifier,
+            frame_per_second=frame_per_second,
+        )
+        await run_in_threadpool(score_video_file, scorer, path, executor)
+    except ValueError as e:
+        logger.error(f"Error decoding uploaded video: {e}")
+        raise HTTPException(status_code=400, detail="Unable to decode video file")
+
+    if not scorer.frames:
+        raise HTTPException(status_code=400, detail="Video file has no frames")
+    scorer.finish()
+    logger.info(
+        f"Extracted {scorer.frames} frames at {frame_per_second:g} fps "
+        f"from a {size} byte video"
+    )
+
+    sitting_session_id = scorer.save(video_name, thumbnail, content_hash=content_hash)
+    return {"sitting_session_id": str(sitting_session_id)}
+
 
 @files_router.post("/calibration")
 async def upload_and_calibrate_images(
-    files: List[UploadFile] = File(...), current_user: str = Depends(get_current_user)
+    http_request: Request,
+    files: List[UploadFile] = File(...),
+    board: str = CALIBRATION_BOARD,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
 ):
-    # Step 1: Upload and save images
+    if board not in CALIBRATION_BOARDS:
+        raise HTTPException(status_code=400, detail="Unknown calibration board")
+
+    # Step 1: Decode the uploaded images in memory
     try:
-        upload_response = await receive_upload_images(files)
+        images = await decode_calibration_images(files)
         logger.info("Images uploaded successfully.")
-        image_paths = [Path(path) for path in upload_response["file_paths"]]
-        image_dir = image_paths[
-            0
-        ].parent  # Assuming all images are in the same directory
     except HTTPException as e:
         logger.error(f"Error in uploading images: {e.detail}")
+        if e.status_code < 500:
+            raise
         raise HTTPException(status_code=500, detail="Failed to upload images.")
 
+    # Step 2: Calibrate the camera using the decoded images, once a slot is free
     try:
-        # Step 2: Calibrate the camera using the saved images
-        calibration_data = calibrate_camera(image_paths)
-        if calibration_data is None:
-            logger.error("Calibration failed due to insufficient valid images.")
-            raise HTTPException(
-                status_code=400, detail="Calibration failed: No valid images found."
-            )
-
-        # Step 3: Return the calibration data
-        return {
-            "message": "Calibration successful",
-            "calibration_data": calibration_data,
-        }
-
-    finally:
-        # Cleanup: Delete the image directory
-        try:
-            shutil.rmtree(image_dir)
-            logger.info("Image directory deleted successfully.")
-        except Exception as e:
-            logger.error(f"Error deleting image directory: {e}")
+        calibration_data = await get_calibration_queue().run(
+            partial(calibrate_images, board=board),
+            images,
+            is_disconnected=http_request.is_disconnected,
+        )
+    except CalibrationQueueFull:
+        raise HTTPException(
+            status_code=503, detail="Calibration queue is full, retry later."
+        )
+    except CalibrationCancelled:
+        logger.info("Calibration cancelled: the client disconnected.")
+        raise HTTPException(status_code=499, detail="Client closed request")
+    if calibration_data is None:
+        logger.error("Calibration failed due to insufficient valid images.")
+        raise HTTPException(
+            status_code=400, detail="Calibration failed: No valid images found."
+        )
+
+    # Step 3: Store it for streams from this device
+    height, width = images[0][1].shape[:2]
+    save_calibration(
+        db,
+        current_user["user_id"],
+        http_request.headers.get("Device-Identifier"),
+        calibration_data,
+        (width, height),
+    )
+
+    # Step 4: Return the calibration data
+    return {
+        "message": "Calibration successful",
+        "calibration_data": calibration_data,
+    }
+
+
+@files_router.get("/calibration/board")
+async def calibration_board(board: str = CALIBRATION_BOARD):
+    """Printable PNG of a calibration board, at 4 pixels per millimetre."""
+    if board not in CALIBRATION_BOARDS:
+        raise HTTPException(status_code=400, detail="Unknown calibration board")
+    _, png = cv2.imencode(".png", render_board(board))
+    return Response(content=png.tobytes(), media_type="image/png")
+
+
+@files_router.get("/calibration/metrics")
+async def calibration_metrics(current_user: dict = Depends(get_current_user)):
+    return get_calibration_queue().get_metrics()
 
 
 @files_router.get("/download/{filename}")
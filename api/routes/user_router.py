@@ -2,10 +2,11 @@ import logging
 import os
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, NoResultFound
+from api.codec import CodecResponse
 from api.request_user import get_current_user
 from auth.mail.mail_config import load_email_template
 from auth.token import check_token, get_current_time
@@ -130,6 +131,7 @@ def get_user_summary(
         distance=user_summary.distance,
         thoracic=user_summary.thoracic,
         duration=user_summary.duration,
+        stats=user_summary.stats,
     )
 
 
@@ -161,19 +163,19 @@ def get_user_history(
 
     all_user_sessions = query.all()
 
-    # Prepare response data
+    # Prepare response data; the codec serializes UUIDs and datetimes natively
     response_data = [
         {
-            "sitting_session_id": str(session.sitting_session_id),
+            "sitting_session_id": session.sitting_session_id,
             "file_name": session.file_name,
             "thumbnail": session.thumbnail,
-            "date": session.date.isoformat(),  # Use `isoformat()` for standardized formatting
+            "date": session.date,
             "session_type": session.session_type,
         }
         for session in all_user_sessions
     ]
 
-    return JSONResponse(content=response_data)
+    return CodecResponse(content=response_data)
 
 
 @user_router.get("/history/latest")
@@ -222,4 +224,4 @@ def get_latest_user_history(
     else:
         response_data = {"error": "Session not found"}
 
-    return JSONResponse(content=response_data)
+    return CodecResponse(content=response_data)
@@ -1,23 +1,54 @@
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime
 import time
-import json
 import logging
+from typing import Optional
 import uuid
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Query,
     WebSocket,
     WebSocketDisconnect,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.websockets import WebSocketState
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
-from api.procressData import processData
+from api.alerts import cooldown_periods, prepare_alert, should_send_alert
+from api.baseline import load_baseline_tracker, save_session_baseline
+from api.calibration import (
+    CALIBRATION_BOARD,
+    CALIBRATION_BOARDS,
+    CalibrationCancelled,
+)
+from api.calibration_queue import CalibrationQueueFull, get_calibration_queue
+from api.calibration_session import CalibrationSession
+from api.calibration_store import (
+    focal_length_from_matrix,
+    get_focal_length,
+    save_calibration,
+)
+from api.classifier import get_inference_scheduler
+from api import codec
+from api.codec import JSONDecodeError, receive_json, send_json
+from api.frame_stream import (
+    FRAME_STATS_INTERVAL,
+    FRAME_STREAM_FPS,
+    LatestFrame,
+    StageLatency,
+    get_inference_slots,
+)
+from api.image_processing import decode_grayscale
+from api.landmark_extraction import extract_image_landmarks, get_landmark_executor
+from api.pipeline import scale_timeline, score_values
+from api.shadow import get_shadow_evaluator
+from api.procressData import FrameDecoder
+from api.video_scoring import VIDEO_FRAME_PER_SECOND
 from api.request_user import get_current_user
-from auth.token import LOCAL_TZ, get_current_time, get_sub_from_token, verify_token
+from auth.token import LOCAL_TZ, get_sub_from_token, verify_token
 from api.detection import detection
 from database.database import get_db
 from database.model import SittingSession
@@ -28,15 +59,6 @@ logger = logging.getLogger(__name__)
 websocket_router = APIRouter()
 
 
-cooldown_periods = {
-    "blink": timedelta(minutes=1),
-    "sitting": timedelta(minutes=1),
-    "distance": timedelta(minutes=1),
-    "thoracic": timedelta(minutes=1),
-    "time_limit_exceed": timedelta(minutes=1),
-}
-
-
 @websocket_router.post("/video_name")
 async def receive_video_name(
     request: VideoNameRequest,
@@ -71,133 +93,281 @@ async def receive_video_name(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@websocket_router.websocket("/results")
-async def landmark_results(
-    websocket: WebSocket,
-    db: Session = Depends(get_db),
-    stream: bool = False,
-    focal_length_enabled: bool = False,
-):
+async def authenticate_websocket(websocket):
+    """Accept the connection and return (access_token, user_id), or None if closed."""
     await websocket.accept()
     acc_token = websocket.cookies.get("access_token")
 
     if not acc_token:
         logger.error("Access token missing in WebSocket cookies.")
         await websocket.close(code=4003, reason="Access token missing")
-        return
+        return None
 
     try:
-        verify_token(acc_token)
+        return acc_token, verify_token(acc_token).get("sub")
     except HTTPException as e:
         logger.error(f"WebSocket token verification failed: {e.detail}")
         await websocket.close(code=4001, reason=e.detail)
-        return
+        return None
 
-    detector = None
-    focal_length_values = None
-    if focal_length_enabled:
-        try:
-            init_message = await websocket.receive_text()
-            init_data = json.loads(init_message)
-            focal_length_data = init_data.get("focal_length", {})
-            camera_matrix = focal_length_data.get("cameraMatrix")
-            if camera_matrix:
-                fx = round(camera_matrix[0][0], 2)
-                fy = round(camera_matrix[1][1], 2)
-                focal_length_values = (fx + fy) / 2
-                detector = detection(
-                    frame_per_second=15, focal_length=focal_length_values
-                )
-            else:
-                logger.error("Focal length data is missing or incomplete.")
-                await websocket.close(code=4003, reason="Focal length data missing")
-                return
-        except json.JSONDecodeError as e:
-            logger.error(f"Error decoding initial message JSON: {e}")
-            await websocket.close(code=4003, reason="Invalid initial data")
-            return
-        except Exception as e:
-            logger.error(f"Error setting up focal length: {e}")
-            await websocket.close(code=1011, reason="Failed to initialize")
+
+def stream_resolution(frame_width, frame_height):
+    """The (width, height) a client streams at, if it sent both."""
+    return (frame_width, frame_height) if frame_width and frame_height else None
+
+
+def stored_focal_length(
+    db, user_id, device_identifier, focal_length_enabled, resolution
+):
+    """
+    Focal length from the device's stored calibration at the stream's
+    `resolution`, looked up when needed.
+    """
+    if not focal_length_enabled:
+        return None
+    try:
+        return get_focal_length(db, user_id, device_identifier, resolution)
+    except SQLAlchemyError as e:
+        logger.error(f"Error loading camera calibration: {e}")
+        return None
+
+
+async def create_detector(
+    websocket, focal_length_enabled, frame_per_second=15, focal_length=None
+):
+    """
+    Detector for a stream. With focal length enabled, a stored calibration
+    (`focal_length`) is announced with a calibration_loaded message; without
+    one the first message must carry the camera calibration.
+    Returns None if the connection was closed.
+    """
+    if not focal_length_enabled:
+        return detection(frame_per_second=frame_per_second)
+    if focal_length is not None:
+        await send_json(
+            websocket,
+            {"type": "calibration_loaded", "data": {"focal_length": focal_length}},
+        )
+        return detection(frame_per_second=frame_per_second, focal_length=focal_length)
+
+    try:
+        init_data = await receive_json(websocket)
+        focal_length_data = init_data.get("focal_length", {})
+        camera_matrix = focal_length_data.get("cameraMatrix")
+        if camera_matrix:
+            return detection(
+                frame_per_second=frame_per_second,
+                focal_length=focal_length_from_matrix(camera_matrix),
+            )
+        else:
+            logger.error("Focal length data is missing or incomplete.")
+            await websocket.close(code=4003, reason="Focal length data missing")
+            return None
+    except JSONDecodeError as e:
+        logger.error(f"Error decoding initial message JSON: {e}")
+        await websocket.close(code=4003, reason="Invalid initial data")
+        return None
+    except Exception as e:
+        logger.error(f"Error setting up focal length: {e}")
+        await websocket.close(code=1011, reason="Failed to initialize")
+        return None
+
+
+class StreamSession:
+    """
+    Scoring, alerting and persistence for one live stream, whether the client
+    sends landmarks or camera frames for the server to extract them from.
+    """
+
+    def __init__(self, websocket, db, acc_token, user_id, detector, device_identifier):
+        self.websocket = websocket
+        self.db = db
+        self.acc_token = acc_token
+        self.user_id = user_id
+        self.detector = detector
+        self.device_identifier = device_identifier
+        # Warm-start from the stored baseline for this device, if any
+        self.baseline_tracker = load_baseline_tracker(
+            db, detector, user_id, device_identifier
+        )
+        # Sessions are stored in frames at VIDEO_FRAME_PER_SECOND
+        self.stored_frames_per_frame = (
+            VIDEO_FRAME_PER_SECOND / detector.frame_per_second
+        )
+
+        self.sitting_session = None
+        self.sitting_session_id = None
+        self.response_counter = 0
+        self.frames = 0
+        self.saved_frames = 0
+        self.is_initialization_sent = False
+        self.frame_decoder = FrameDecoder()
+        self.malformed_frames = 0
+        self.inference_scheduler = get_inference_scheduler()
+        self.shadow_evaluator = get_shadow_evaluator()
+        self.shadow_session = (
+            self.shadow_evaluator.start_session(detector)
+            if self.shadow_evaluator
+            else None
+        )
+        self.send_alert_time_track = {
+            i: {"send": False, "last_time": None} for i in cooldown_periods
+        }
+
+    async def handle_frame(self, data, frames=1):
+        """
+        Score one client-format frame and send the resulting alerts. `frames` is
+        how many stream frames it stands for: once calibrated, frames dropped
+        before it are scored as copies of it, so the detector keeps time.
+        """
+        detector = self.detector
+        current_values = self.frame_decoder.extract(data)
+        if current_values is None:
+            self.malformed_frames += 1
             return
-    else:
-        detector = detection(frame_per_second=15) if stream else None
-
-    session_start = None
-    sitting_session = None
-    sitting_session_id = None
-    response_counter = 0
-    is_session_initialized = False  # Flag to check if session is already initialized
-    send_alert_time_track = {
-        i: {"send": False, "last_time": None} for i in cooldown_periods
-    }
+
+        self.response_counter += 1
+        self.frames += frames
+
+        if self.response_counter == 1 and not self.sitting_session:
+            self.sitting_session, self.sitting_session_id = initialize_session(
+                self.acc_token, self.db
+            )
+
+        posture_score = None
+        if self.inference_scheduler and detector.is_calibrated():
+            posture_score = await self.inference_scheduler.score(current_values)
+        repeats = frames if detector.is_calibrated() else 1
+        for _ in range(repeats):
+            score_values(
+                detector, current_values, data.get("faceDetect"), posture_score
+            )
+            if self.shadow_session:
+                self.shadow_evaluator.submit(
+                    self.shadow_session,
+                    current_values,
+                    data.get("faceDetect"),
+                    posture_score,
+                )
+        if self.baseline_tracker.observe(current_values) and self.shadow_session:
+            self.shadow_evaluator.load_correct_value(
+                self.shadow_session, detector.correct_values
+            )
+
+        if not self.is_initialization_sent and detector.is_calibrated():
+            await send_json(
+                self.websocket,
+                {
+                    "type": "initialization_success",
+                    "sitting_session_id": self.sitting_session_id,
+                },
+            )
+            self.is_initialization_sent = True
+            logger.info("Initialization success message sent")
+
+        if self.response_counter % 3 == 0:
+            await send_json(
+                self.websocket,
+                {"type": "all_topic_alerts", "data": prepare_alert(detector)},
+            )
+
+        triggered_alerts = should_send_alert(
+            detector.get_alert(), cooldown_periods, self.send_alert_time_track
+        )
+
+        if triggered_alerts:
+            await send_json(
+                self.websocket, {"type": "triggered_alerts", "data": triggered_alerts}
+            )
+
+        if self.frames - self.saved_frames >= 5:
+            self.saved_frames = self.frames
+            self.save()
+
+    def duration(self):
+        return round(self.frames * self.stored_frames_per_frame)
+
+    def save(self):
+        update_sitting_session(
+            self.detector,
+            self.duration(),
+            self.sitting_session,
+            self.db,
+            scale=self.stored_frames_per_frame,
+        )
+
+    def end(self):
+        """Finalize and store the session once the client has disconnected."""
+        logger.info(f"Session Duration: {self.frames} frames")
+        if self.malformed_frames:
+            logger.warning(f"Rejected {self.malformed_frames} malformed frames")
+        if self.sitting_session:
+            self.detector.finalize_timeline()
+            self.save()
+        if self.shadow_session:
+            self.shadow_evaluator.finish(self.shadow_session, self.detector)
+        end_sitting_session(self.sitting_session, self.duration(), self.db)
+        save_session_baseline(
+            self.db, self.user_id, self.device_identifier, self.baseline_tracker
+        )
+        logger.info("WebSocket disconnected")
+
+
+@websocket_router.websocket("/results")
+async def landmark_results(
+    websocket: WebSocket,
+    db: Session = Depends(get_db),
+    stream: bool = False,
+    focal_length_enabled: bool = False,
+    device_identifier: Optional[str] = None,
+    frame_width: Optional[int] = Query(None, ge=1),
+    frame_height: Optional[int] = Query(None, ge=1),
+):
+    """
+    Stream of client-extracted landmarks. With focal length enabled, a stored
+    calibration of the device is used if the client states the resolution it
+    streams at (frame_width, frame_height) and the calibration fits it.
+    """
+    credentials = await authenticate_websocket(websocket)
+    if credentials is None:
+        return
+    acc_token, user_id = credentials
+
+    device_identifier = device_identifier or websocket.headers.get("Device-Identifier")
+    detector = await create_detector(
+        websocket,
+        focal_length_enabled,
+        focal_length=stored_focal_length(
+            db,
+            user_id,
+            device_identifier,
+            focal_length_enabled,
+            stream_resolution(frame_width, frame_height),
+        ),
+    )
+    if detector is None or not stream:
+        return
+
+    session = StreamSession(
+        websocket, db, acc_token, user_id, detector, device_identifier
+    )
 
     try:
-        while stream:
+        while True:
             try:
-                message = await websocket.receive_text()
-                message_data = json.loads(message)
+                message_data = await receive_json(websocket)
                 data = message_data.get("data")
                 if data:
-                    processed_data = processData(data)
-                    current_values = extract_current_values(processed_data)
-                    if current_values is None:
-                        continue
-
-                    response_counter += 1
-
-                    if not is_session_initialized:
-                        if response_counter == 1 and not sitting_session:
-                            session_start = time.time()
-                            sitting_session, sitting_session_id = initialize_session(
-                                acc_token, db
-                            )
-                            is_session_initialized = True  # Mark session as initialized
-
-                    if response_counter <= 15:
-                        detector.set_correct_value(current_values)
-                        if response_counter == 15:
-                            await websocket.send_json(
-                                {
-                                    "type": "initialization_success",
-                                    "sitting_session_id": str(sitting_session_id),
-                                }
-                            )
-                            logger.info("Initialization success message sent")
-                    else:
-                        detector.detect(current_values, data.get("faceDetect"))
-
-                    if response_counter % 3 == 0:
-                        await websocket.send_json(
-                            {
-                                "type": "all_topic_alerts",
-                                "data": prepare_alert(detector),
-                            }
-                        )
-
-                    triggered_alerts = should_send_alert(
-                        detector.get_alert(), cooldown_periods, send_alert_time_track
-                    )
-
-                    if triggered_alerts:
-                        await websocket.send_json(
-                            {"type": "triggered_alerts", "data": triggered_alerts}
-                        )
-
-                    if response_counter % 5 == 0:
-                        update_sitting_session(
-                            detector, response_counter, sitting_session, db
-                        )
+                    await session.handle_frame(data)
+                elif "focal_length" in message_data:
+                    logger.info("Ignoring camera matrix; using stored calibration.")
                 else:
                     logger.warning("Received message without 'data' key.")
 
             except WebSocketDisconnect:
-                logger.info(f"Session Duration: {response_counter} seconds")
-                end_sitting_session(sitting_session, response_counter, db)
-                response_counter = 0
-                logger.info("WebSocket disconnected")
+                session.end()
                 break
-            except json.JSONDecodeError as e:
+            except JSONDecodeError as e:
                 logger.warning(f"Error decoding message JSON: {e}")
 
             except Exception as e:
@@ -209,6 +379,245 @@ async def landmark_results(
         await websocket.close(code=1011, reason="Unexpected error occurred")
 
 
+@websocket_router.websocket("/frames")
+async def landmark_frames(
+    websocket: WebSocket,
+    db: Session = Depends(get_db),
+    focal_length_enabled: bool = False,
+    device_identifier: Optional[str] = None,
+    frame_per_second: int = Query(FRAME_STREAM_FPS, ge=1, le=30),
+    frame_width: Optional[int] = Query(None, ge=1),
+    frame_height: Optional[int] = Query(None, ge=1),
+):
+    """
+    Stream of JPEG/WebP camera frames, sent as binary messages, for clients that
+    cannot run MediaPipe. Landmarks are extracted on the server and scored with
+    the same alert protocol as /results; frames that arrive while the previous
+    one is still in inference are skipped, and the next scored frame stands in
+    for them. A frame_stats message reports per-stage latency every
+    FRAME_STATS_INTERVAL scored frames. A stored calibration is used as on
+    /results.
+    """
+    credentials = await authenticate_websocket(websocket)
+    if credentials is None:
+        return
+    acc_token, user_id = credentials
+
+    executor = await run_in_threadpool(get_landmark_executor)
+    if executor is None:
+        logger.error("Frame stream requested but mediapipe is not installed.")
+        await websocket.close(code=1011, reason="Server-side inference unavailable")
+        return
+
+    device_identifier = device_identifier or websocket.headers.get("Device-Identifier")
+    detector = await create_detector(
+        websocket,
+        focal_length_enabled,
+        frame_per_second,
+        stored_focal_length(
+            db,
+            user_id,
+            device_identifier,
+            focal_length_enabled,
+            stream_resolution(frame_width, frame_height),
+        ),
+    )
+    if detector is None:
+        return
+
+    session = StreamSession(
+        websocket, db, acc_token, user_id, detector, device_identifier
+    )
+    mailbox = LatestFrame()
+    latency = StageLatency()
+
+    async def receive_frames():
+        index = 0
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    index += 1
+                    mailbox.put((message["bytes"], time.perf_counter(), index))
+                else:
+                    logger.warning("Received frame stream message without image data.")
+        finally:
+            mailbox.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    scored_index = 0
+    try:
+        while (item := await mailbox.get()) is not None:
+            image, received, index = item
+            async with get_inference_slots():
+                submitted = time.perf_counter()
+                data, decode_seconds, inference_seconds = await asyncio.wrap_future(
+                    executor.submit(extract_image_landmarks, image)
+                )
+            extracted = time.perf_counter()
+            if data is None:
+                session.malformed_frames += 1
+                continue
+
+            # Frames skipped or undecodable since the last scored one
+            await session.handle_frame(data, frames=index - scored_index)
+            scored_index = index
+            scored = time.perf_counter()
+            latency.record(
+                queue=submitted - received,
+                decode=decode_seconds,
+                inference=inference_seconds,
+                transfer=extracted - submitted - decode_seconds - inference_seconds,
+                detection=scored - extracted,
+                total=scored - received,
+            )
+            if latency.frames % FRAME_STATS_INTERVAL == 0:
+                await send_json(
+                    websocket,
+                    {"type": "frame_stats", "data": latency.summary(mailbox.skipped)},
+                )
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error during frame stream processing: {e}")
+    finally:
+        receiver.cancel()
+        logger.info(f"Frame stream latency: {latency.summary(mailbox.skipped)}")
+        session.end()
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
+
+
+async def calibrate_session(websocket, session):
+    """
+    Calibrate on the calibration queue, sending calibration_queued messages
+    with the queue position while waiting. Only a disconnect cancels the
+    calibration; other messages in the meantime are ignored.
+    """
+
+    async def receive_until_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            logger.warning("Ignoring calibration message received while calibrating.")
+
+    receiver = asyncio.create_task(receive_until_disconnect())
+
+    async def is_disconnected():
+        return receiver.done()
+
+    async def on_queued(position):
+        await send_json(
+            websocket, {"type": "calibration_queued", "data": {"position": position}}
+        )
+
+    try:
+        return await get_calibration_queue().run(
+            session.calibrate, is_disconnected=is_disconnected, on_queued=on_queued
+        )
+    finally:
+        receiver.cancel()
+
+
+def is_finish_message(text):
+    try:
+        return codec.loads(text or "{}").get("type") == "finish"
+    except (JSONDecodeError, AttributeError):
+        return False
+
+
+@websocket_router.websocket("/calibration")
+async def calibration_session(
+    websocket: WebSocket,
+    db: Session = Depends(get_db),
+    device_identifier: Optional[str] = None,
+    board: str = CALIBRATION_BOARD,
+):
+    """
+    Incremental calibration. Each binary message is one image of the `board`
+    (chessboard or charuco) and is answered with a calibration_image message:
+    accepted or the reason for the rejection, the pose coverage so far and
+    hints for the next views. Once the views are diverse enough the camera is
+    calibrated, the result is stored for the device and sent as
+    calibration_result, and the connection is closed.
+    A {"type": "finish"} message calibrates early from the views so far.
+    """
+    credentials = await authenticate_websocket(websocket)
+    if credentials is None:
+        return
+    _, user_id = credentials
+    if board not in CALIBRATION_BOARDS:
+        await websocket.close(code=4003, reason="Unknown calibration board")
+        return
+    device_identifier = device_identifier or websocket.headers.get("Device-Identifier")
+    session = CalibrationSession(board=board)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                logger.info("Calibration session disconnected before finishing")
+                return
+
+            if message.get("bytes"):
+                gray = await run_in_threadpool(decode_grayscale, message["bytes"])
+                result = await run_in_threadpool(session.add_image, gray)
+                await send_json(
+                    websocket, {"type": "calibration_image", "data": result}
+                )
+                if not result["ready"]:
+                    continue
+            elif not is_finish_message(message.get("text")):
+                logger.warning("Received calibration message without image data.")
+                continue
+            elif not session.can_calibrate():
+                await send_json(
+                    websocket,
+                    {
+                        "type": "calibration_error",
+                        "data": {"detail": "Not enough views to calibrate"},
+                    },
+                )
+                continue
+
+            try:
+                calibration_data = await calibrate_session(websocket, session)
+            except CalibrationQueueFull:
+                await send_json(
+                    websocket,
+                    {
+                        "type": "calibration_error",
+                        "data": {"detail": "Calibration queue is full, retry later"},
+                    },
+                )
+                continue
+            await run_in_threadpool(
+                save_calibration,
+                db,
+                user_id,
+                device_identifier,
+                calibration_data,
+                session.frame_size,
+            )
+            await send_json(
+                websocket,
+                {"type": "calibration_result", "data": calibration_data},
+            )
+            await websocket.close(reason="Calibration complete")
+            return
+
+    except WebSocketDisconnect:
+        logger.info("Calibration session disconnected before finishing")
+    except CalibrationCancelled:
+        logger.info("Calibration cancelled before finishing")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close(code=1011, reason="Calibration cancelled")
+    except Exception as e:
+        logger.error(f"Error during calibration session: {e}")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close(code=1011, reason="Calibration failed")
+
+
 def initialize_session(acc_token, db):
     try:
         sitting_session_id = uuid.uuid4()
@@ -242,39 +651,18 @@ def initialize_session(acc_token, db):
         )
 
 
-def extract_current_values(processed_data):
-    try:
-        return {
-            "shoulderPosition": processed_data.get_shoulder_position(),
-            "diameterRight": processed_data.get_diameter_right(),
-            "diameterLeft": processed_data.get_diameter_left(),
-            "eyeAspectRatioRight": processed_data.get_blink_right(),
-            "eyeAspectRatioLeft": processed_data.get_blink_left(),
-        }
-    except KeyError as e:
-        logger.error(f"Error extracting current values: missing key {e}")
-        return None
-
-
-def prepare_alert(detector):
-    """Prepare a combined alert dictionary based on the detector's results."""
-    alert = detector.get_alert()
-    return {
-        "blink": alert.get("blink_alert", False),
-        "sitting": alert.get("sitting_alert", False),
-        "distance": alert.get("distance_alert", False),
-        "thoracic": alert.get("thoracic_alert", False),
-    }
-
-
-def update_sitting_session(detector, duration, sitting_session, db):
-    """Update the sitting session in the database with detector timeline results."""
+def update_sitting_session(detector, duration, sitting_session, db, scale=1):
+    """
+    Update the sitting session in the database with detector timeline results,
+    mapped to stored frames by `scale` (see scale_timeline).
+    """
     try:
-        timeline_result = detector.get_timeline_result()
+        timeline_result = scale_timeline(detector.get_timeline_result(), scale)
         sitting_session.blink = timeline_result["blink"]
         sitting_session.sitting = timeline_result["sitting"]
         sitting_session.distance = timeline_result["distance"]
         sitting_session.thoracic = timeline_result["thoracic"]
+        sitting_session.stats = detector.get_session_stats()
         sitting_session.duration = duration
         db.commit()
     except SQLAlchemyError as e:
@@ -303,25 +691,3 @@ def update_video_session(video_name, thumbnail, sitting_session, db):
     except SQLAlchemyError as e:
         db.rollback()
         logger.error(f"Error updating video session: {e}")
-
-
-def should_send_alert(alert, cooldown_periods, send_alert_time_track):
-    current_time = get_current_time()
-    alert_result = {}
-    for i in cooldown_periods:
-        if alert[i + "_alert"] and send_alert_time_track[i]["send"] is False:
-            send_alert_time_track[i]["send"] = True
-            send_alert_time_track[i]["last_time"] = current_time
-            alert_result[i] = True
-            print(i + ": alert")
-        elif alert[i + "_alert"] is False and send_alert_time_track[i]["send"]:
-            send_alert_time_track[i]["send"] = False
-            send_alert_time_track[i]["last_time"] = None
-            print(i + ": stop alert")
-        elif (alert[i + "_alert"] and send_alert_time_track[i]["send"]) and (
-            (send_alert_time_track[i]["last_time"] + cooldown_periods[i]) < current_time
-        ):
-            send_alert_time_track[i]["last_time"] = current_time
-            alert_result[i] = True
-            print(i + ": alert Again?")
-    return alert_result
@@ -0,0 +1,272 @@
+import math
+
+
+# Running stats are folded in blocks of this many frames (see RunningStats)
+STATS_BLOCK_SIZE = 1024
+
+
+class RunningStats:
+    """
+    Welford mean/variance with min/max, O(1) per update. Values accumulate in
+    an open block that the owner closes at fixed frame positions; closed blocks
+    are folded into the total in order (Chan et al.). Segments scored separately
+    from block boundaries can therefore be absorbed with bit-identical results.
+    """
+
+    def __init__(self, keep_blocks=False):
+        self.count = 0  # Closed blocks only
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.block_count = 0
+        self.block_mean = 0.0
+        self.block_m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.blocks = [] if keep_blocks else None
+
+    def update(self, value):
+        self.block_count += 1
+        delta = value - self.block_mean
+        self.block_mean += delta / self.block_count
+        self.block_m2 += delta * (value - self.block_mean)
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def update_many(self, values):
+        """`update` with each of `values` in turn, with the block state in locals."""
+        if not values:
+            return
+        count, mean, m2 = self.block_count, self.block_mean, self.block_m2
+        for value in values:
+            count += 1
+            delta = value - mean
+            mean += delta / count
+            m2 += delta * (value - mean)
+        self.block_count, self.block_mean, self.block_m2 = count, mean, m2
+        low, high = min(values), max(values)
+        if self.minimum is None or low < self.minimum:
+            self.minimum = low
+        if self.maximum is None or high > self.maximum:
+            self.maximum = high
+
+    def close_block(self):
+        block = (self.block_count, self.block_mean, self.block_m2)
+        if self.blocks is not None:
+            self.blocks.append(block)
+        self.count, self.mean, self.m2 = self._fold(
+            (self.count, self.mean, self.m2), block
+        )
+        self.block_count, self.block_mean, self.block_m2 = 0, 0.0, 0.0
+
+    @staticmethod
+    def _fold(total, block):
+        count, mean, m2 = total
+        block_count, block_mean, block_m2 = block
+        if not block_count:
+            return total
+        if not count:
+            return block
+        merged = count + block_count
+        delta = block_mean - mean
+        return (
+            merged,
+            mean + delta * block_count / merged,
+            m2 + block_m2 + delta * delta * count * block_count / merged,
+        )
+
+    def absorb(self, other):
+        """
+        Append the values of `other`, which started at one of our block
+        boundaries.
+        """
+        for block in other.blocks:
+            self.count, self.mean, self.m2 = self._fold(
+                (self.count, self.mean, self.m2), block
+            )
+        self.block_count = other.block_count
+        self.block_mean = other.block_mean
+        self.block_m2 = other.block_m2
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                if self.minimum is None or value < self.minimum:
+                    self.minimum = value
+                if self.maximum is None or value > self.maximum:
+                    self.maximum = value
+
+    def get_state(self):
+        return dict(vars(self))
+
+    def load_state(self, state):
+        vars(self).update(state)
+
+    def summary(self):
+        count, mean, m2 = self._fold(
+            (self.count, self.mean, self.m2),
+            (self.block_count, self.block_mean, self.block_m2),
+        )
+        if not count:
+            return {"count": 0, "mean": None, "std": None, "min": None, "max": None}
+        return {
+            "count": count,
+            "mean": mean,
+            "std": math.sqrt(m2 / (count - 1)) if count > 1 else 0.0,
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+
+
+class FixedHistogram:
+    """Fixed-bin histogram over [low, high) for streaming percentiles."""
+
+    def __init__(self, low, high, bins):
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.width = (high - low) / bins
+        self.counts = [0] * bins
+        self.total = 0
+
+    def update(self, value):
+        index = int((value - self.low) / self.width)
+        self.counts[min(max(index, 0), self.bins - 1)] += 1
+        self.total += 1
+
+    def update_many(self, values):
+        low, width, last = self.low, self.width, self.bins - 1
+        counts = self.counts
+        for value in values:
+            index = int((value - low) / width)
+            counts[min(max(index, 0), last)] += 1
+        self.total += len(values)
+
+    def absorb(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+
+    def get_state(self):
+        return {"counts": list(self.counts), "total": self.total}
+
+    def load_state(self, state):
+        self.counts = list(state["counts"])
+        self.total = state["total"]
+
+    def percentile(self, q):
+        """Interpolated q-th percentile (0-100); out-of-range values are clamped."""
+        if not self.total:
+            return None
+        target = self.total * q / 100
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= target:
+                fraction = (target - cumulative) / count
+                return self.low + (index + fraction) * self.width
+            cumulative += count
+        return self.high
+
+
+class SessionStats:
+    """
+    Per-session signal statistics, updated by the detector on every frame so that
+    summaries can be stored with the session instead of recomputed from raw frames.
+    Per-frame values are buffered and folded in once per block, or when the
+    statistics are read.
+    """
+
+    def __init__(self, frame_per_second=1, focal_length=0, keep_blocks=False):
+        self.frame_per_second = frame_per_second
+        self.distance_unit = "cm" if focal_length else "iris_diameter"
+        self.frames = 0
+        self.face_frames = 0
+        self.blinks = 0
+        self.distance = RunningStats(keep_blocks)
+        self.distance_histogram = (
+            FixedHistogram(0, 150, 150)  # 1 cm bins
+            if focal_length
+            else FixedHistogram(0, 0.2, 200)  # Normalized iris diameter
+        )
+        self.shoulder_drift = RunningStats(keep_blocks)
+        self.pending_distances = []
+        self.pending_drifts = []
+
+    def update(self, face_detect, distance, shoulder_drift, blinked):
+        self.frames += 1
+        if face_detect is not False:
+            self.face_frames += 1
+        if blinked:
+            self.blinks += 1
+        if distance:
+            self.pending_distances.append(distance)
+        if shoulder_drift is not None:
+            self.pending_drifts.append(shoulder_drift)
+        if self.frames % STATS_BLOCK_SIZE == 0:
+            self.flush()
+            self.distance.close_block()
+            self.shoulder_drift.close_block()
+
+    def flush(self):
+        """Fold the buffered values into the open blocks."""
+        if self.pending_distances:
+            self.distance.update_many(self.pending_distances)
+            self.distance_histogram.update_many(self.pending_distances)
+            self.pending_distances = []
+        if self.pending_drifts:
+            self.shoulder_drift.update_many(self.pending_drifts)
+            self.pending_drifts = []
+
+    def absorb(self, other):
+        """
+        Append a segment scored from one of our block boundaries with
+        keep_blocks=True, as if its frames had been fed to this instance.
+        """
+        self.flush()
+        other.flush()
+        self.frames += other.frames
+        self.face_frames += other.face_frames
+        self.blinks += other.blinks
+        self.distance.absorb(other.distance)
+        self.distance_histogram.absorb(other.distance_histogram)
+        self.shoulder_drift.absorb(other.shoulder_drift)
+
+    def get_state(self):
+        self.flush()
+        return {
+            "frames": self.frames,
+            "face_frames": self.face_frames,
+            "blinks": self.blinks,
+            "distance": self.distance.get_state(),
+            "distance_histogram": self.distance_histogram.get_state(),
+            "shoulder_drift": self.shoulder_drift.get_state(),
+        }
+
+    def load_state(self, state):
+        self.frames = state["frames"]
+        self.face_frames = state["face_frames"]
+        self.blinks = state["blinks"]
+        self.distance.load_state(state["distance"])
+        self.distance_histogram.load_state(state["distance_histogram"])
+        self.shoulder_drift.load_state(state["shoulder_drift"])
+        self.pending_distances = []
+        self.pending_drifts = []
+
+    def summary(self):
+        self.flush()
+        face_minutes = self.face_frames / self.frame_per_second / 60
+        return {
+            "frames": self.frames,
+            "face_present_ratio": (
+                self.face_frames / self.frames if self.frames else None
+            ),
+            "blink_count": self.blinks,
+            "blink_rate_per_minute": (
+                self.blinks / face_minutes if face_minutes else None
+            ),
+            "distance": {
+                **self.distance.summary(),
+                "unit": self.distance_unit,
+                "p50": self.distance_histogram.percentile(50),
+                "p90": self.distance_histogram.percentile(90),
+            },
+            "shoulder_drift": self.shoulder_drift.summary(),
+        }
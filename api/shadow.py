@@ -0,0 +1,222 @@
+"""
+Shadow evaluation of a candidate detector configuration on live traffic.
+
+A sampled fraction of sessions copies its frames onto a bounded queue that a
+background thread replays through a candidate `detection`. Sampling is per
+session because the detector is stateful: a candidate only gives a meaningful
+timeline if it sees every frame of the session. The live path never waits; when
+the queue is full the frame is dropped and the session's diff is marked
+incomplete. Baseline reloads of the live detector, from a stored baseline or
+after drift, are replayed on the candidate in order with the frames.
+
+    SHADOW_SAMPLE_RATE=0.05
+    SHADOW_DETECTOR_CONFIG='{"thoracic_threshold": 0.04}'
+"""
+
+from collections import deque
+import copy
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+
+from api.detection import detection
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0"))
+SHADOW_DETECTOR_CONFIG = os.getenv("SHADOW_DETECTOR_CONFIG", "{}")
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "10000"))
+SHADOW_RESULT_HISTORY = 100
+# Config keys passed to the constructor, so the values it derives follow them
+DETECTOR_PARAMETERS = frozenset(inspect.signature(detection).parameters)
+
+
+def timeline_frames(intervals, last_frame):
+    """Total frames covered by a timeline; open intervals run to `last_frame`."""
+    return sum(
+        (interval[1] if len(interval) == 2 else last_frame) - interval[0]
+        for interval in intervals
+    )
+
+
+def overlap_frames(a, b, last_frame):
+    """Frames covered by both timelines (intervals are sorted and disjoint)."""
+    a = [(i[0], i[1] if len(i) == 2 else last_frame) for i in a]
+    b = [(i[0], i[1] if len(i) == 2 else last_frame) for i in b]
+    i = j = overlap = 0
+    while i < len(a) and j < len(b):
+        overlap += max(0, min(a[i][1], b[j][1]) - max(a[i][0], b[j][0]))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return overlap
+
+
+def diff_timelines(live, candidate, last_frame):
+    diff = {}
+    for topic, live_intervals in live.items():
+        candidate_intervals = candidate.get(topic, [])
+        live_frames = timeline_frames(live_intervals, last_frame)
+        candidate_frames = timeline_frames(candidate_intervals, last_frame)
+        overlap = overlap_frames(live_intervals, candidate_intervals, last_frame)
+        diff[topic] = {
+            "live_intervals": len(live_intervals),
+            "candidate_intervals": len(candidate_intervals),
+            "live_frames": live_frames,
+            "candidate_frames": candidate_frames,
+            "disagreement_frames": live_frames + candidate_frames - 2 * overlap,
+        }
+    return diff
+
+
+class ShadowSession:
+    def __init__(self, live_detector, config):
+        self.session_id = uuid.uuid4()
+        parameters = {
+            "frame_per_second": live_detector.frame_per_second,
+            "correct_frame": live_detector.correct_frame,
+            "focal_length": live_detector.focal_length,
+        }
+        parameters.update(
+            (name, value)
+            for name, value in config.items()
+            if name in DETECTOR_PARAMETERS
+        )
+        self.detector = detection(**parameters)
+        for name, value in config.items():
+            if name not in DETECTOR_PARAMETERS:
+                setattr(self.detector, name, value)
+        if live_detector.is_calibrated():  # Live detector was warm-started
+            self.detector.load_correct_value(live_detector.correct_values)
+        self.frames = 0
+        self.dropped = 0
+        self.seconds = 0.0
+
+
+class ShadowEvaluator:
+    def __init__(self, config, sample_rate, queue_size=SHADOW_QUEUE_SIZE):
+        self.config = config
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.sessions = 0
+        self.frames = 0
+        self.dropped = 0
+        self.seconds = 0.0
+        self.results = deque(maxlen=SHADOW_RESULT_HISTORY)
+        self._thread = threading.Thread(
+            target=self._worker, name="shadow-detector", daemon=True
+        )
+        self._thread.start()
+
+    def start_session(self, live_detector):
+        """Return a ShadowSession for a sampled session, otherwise None."""
+        if random.random() >= self.sample_rate:
+            return None
+        self.sessions += 1
+        return ShadowSession(live_detector, self.config)
+
+    def submit(self, session, current_values, face_detect, posture_score=None):
+        """Copy one frame to the shadow queue without ever blocking."""
+        self._put(("frame", session, (current_values, face_detect, posture_score)))
+
+    def load_correct_value(self, session, correct_values):
+        """Mirror a baseline reload of the live detector, in order with its frames."""
+        self._put(("baseline", session, dict(correct_values)))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            item[1].dropped += 1
+            self.dropped += 1
+
+    def finish(self, session, live_detector):
+        live_timeline = copy.deepcopy(live_detector.get_timeline_result())
+        try:
+            self._queue.put_nowait(("finish", session, live_timeline))
+        except queue.Full:
+            logger.warning(f"Shadow queue full; result for {session.session_id} lost")
+
+    def _worker(self):
+        while True:
+            kind, session, payload = self._queue.get()
+            try:
+                if kind == "frame":
+                    self._replay_frame(session, *payload)
+                elif kind == "baseline":
+                    session.detector.load_correct_value(payload)
+                else:
+                    self._record_result(session, payload)
+            except Exception as e:
+                logger.error(f"Shadow detector error: {e}")
+
+    def _replay_frame(self, session, current_values, face_detect, posture_score):
+        start = time.perf_counter()
+        detector = session.detector
+        if not detector.is_calibrated():
+            detector.set_correct_value(current_values)
+        else:
+            detector.detect(current_values, face_detect, posture_score)
+        elapsed = time.perf_counter() - start
+        session.frames += 1
+        session.seconds += elapsed
+        self.frames += 1
+        self.seconds += elapsed
+
+    def _record_result(self, session, live_timeline):
+        detector = session.detector
+        detector.finalize_timeline()
+        result = {
+            "session_id": str(session.session_id),
+            "frames": session.frames,
+            "dropped_frames": session.dropped,
+            "complete": session.dropped == 0,
+            "candidate_us_per_frame": (
+                session.seconds / session.frames * 1e6 if session.frames else None
+            ),
+            "timeline_diff": diff_timelines(
+                live_timeline,
+                detector.get_timeline_result(),
+                detector.response_counter,
+            ),
+        }
+        self.results.append(result)
+        logger.info(f"Shadow detector result: {json.dumps(result)}")
+
+    def get_metrics(self):
+        return {
+            "sessions": self.sessions,
+            "frames": self.frames,
+            "dropped_frames": self.dropped,
+            "queue_depth": self._queue.qsize(),
+            "candidate_us_per_frame": (
+                self.seconds / self.frames * 1e6 if self.frames else None
+            ),
+            "recent_results": list(self.results),
+        }
+
+
+_evaluator = None
+_evaluator_loaded = False
+
+
+def get_shadow_evaluator():
+    """Per-worker evaluator, or None when shadow mode is disabled."""
+    global _evaluator, _evaluator_loaded
+    if not _evaluator_loaded:
+        _evaluator_loaded = True
+        if SHADOW_SAMPLE_RATE > 0:
+            try:
+                config = json.loads(SHADOW_DETECTOR_CONFIG)
+                _evaluator = ShadowEvaluator(config, SHADOW_SAMPLE_RATE)
+                logger.info(f"Shadow detector enabled with config {config}")
+            except json.JSONDecodeError as e:
+                logger.error(f"Invalid SHADOW_DETECTOR_CONFIG, shadow disabled: {e}")
+    return _evaluator
@@ -0,0 +1,41 @@
+def compact_closed_interval(intervals, merge_gap, min_duration):
+    """
+    Incrementally compact a timeline right after its last interval closed.
+
+    The new interval is merged into the previous one when the gap between them is
+    at most `merge_gap` frames. Otherwise the previous interval can no longer grow,
+    so it is dropped if it is shorter than `min_duration` frames. The newest
+    interval is only judged once the next one closes, or by `finalize_intervals`.
+    """
+    if len(intervals) < 2:
+        return
+    previous, last = intervals[-2], intervals[-1]
+    if last[0] - previous[1] <= merge_gap:
+        previous[1] = max(previous[1], last[1])
+        intervals.pop()
+    elif previous[1] - previous[0] < min_duration:
+        del intervals[-2]
+
+
+def finalize_intervals(intervals, min_duration):
+    """
+    Drop the newest closed interval if it ended up below `min_duration`. That is
+    the last interval, or the one before it when the session ends with an
+    interval still open.
+    """
+    index = -1 if intervals and len(intervals[-1]) == 2 else -2
+    if len(intervals) >= -index and len(intervals[index]) == 2:
+        start, end = intervals[index]
+        if end - start < min_duration:
+            del intervals[index]
+
+
+def compact_intervals(intervals, merge_gap, min_duration):
+    """Compact a complete timeline in one pass, e.g. for stored raw timelines."""
+    compacted = []
+    for interval in intervals:
+        compacted.append(list(interval))
+        if len(interval) == 2:
+            compact_closed_interval(compacted, merge_gap, min_duration)
+    finalize_intervals(compacted, min_duration)
+    return compacted
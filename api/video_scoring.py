@@ -0,0 +1,279 @@
+from datetime import datetime
+import hashlib
+import logging
+import os
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+
+from api import codec
+from api.baseline import load_baseline_tracker, save_session_baseline
+from api.detection import detection
+from api.parallel_scoring import PARALLEL_SCORING_WORKERS, score_segments
+from api.pipeline import (
+    decimate_frames,
+    decimated_fps,
+    extract_feature_columns,
+    feature_rows,
+    iter_frame_values,
+    scale_timeline,
+    score_values,
+)
+from api.procressData import FrameDecoder
+from api.shadow import get_shadow_evaluator
+from database.model import SittingSession
+
+logger = logging.getLogger(__name__)
+
+VIDEO_FRAME_PER_SECOND = 15
+# Score every k-th frame; VIDEO_TARGET_FPS, when set, picks the nearest k instead
+VIDEO_DECIMATION = int(os.getenv("VIDEO_DECIMATION", "1"))
+VIDEO_TARGET_FPS = float(os.getenv("VIDEO_TARGET_FPS", "0"))
+IDEMPOTENCY_NAMESPACE = uuid.UUID("6f1c2b9e-3d4a-4e8b-9a57-2c0d8e41f7b3")
+
+
+def idempotent_session_id(user_id, idempotency_key):
+    """Stable sitting_session_id for a client's logical upload."""
+    return uuid.uuid5(IDEMPOTENCY_NAMESPACE, f"{user_id}:{idempotency_key}")
+
+
+def session_exists(db, sitting_session_id):
+    return db.get(SittingSession, sitting_session_id) is not None
+
+
+def default_decimation(frame_per_second=VIDEO_FRAME_PER_SECOND):
+    if VIDEO_TARGET_FPS:
+        return max(round(frame_per_second / VIDEO_TARGET_FPS), 1)
+    return max(VIDEO_DECIMATION, 1)
+
+
+# Bump when scoring changes in a way the detector's settings do not show
+SCORING_VERSION = 7
+
+
+def content_hasher(
+    frame_per_second=VIDEO_FRAME_PER_SECOND, decimation=None, baseline=None
+):
+    """
+    sha256 seeded with the scoring version, the detector's settings and the
+    stored baseline values the detector starts from (see stored_baseline_values).
+    """
+    decimation = decimation or default_decimation(frame_per_second)
+    detector = detection(decimated_fps(frame_per_second, decimation))
+    settings = {
+        name: value
+        for name, value in vars(detector).items()
+        if isinstance(value, (int, float, str))
+    }
+    return hashlib.sha256(
+        codec.dumps_canonical(
+            {"version": SCORING_VERSION, "detector": settings, "baseline": baseline}
+        )
+    )
+
+
+def update_content_hash(hasher, frame):
+    hasher.update(codec.dumps_canonical(frame))
+
+
+def hash_frames(frames, frame_per_second=VIDEO_FRAME_PER_SECOND, baseline=None):
+    """Content hash of an upload, independent of key order and whitespace."""
+    hasher = content_hasher(frame_per_second, baseline=baseline)
+    for frame in frames:
+        update_content_hash(hasher, frame)
+    return hasher.hexdigest()
+
+
+class DedupCounters:
+    """Per-worker counts of uploads short-circuited by their content hash."""
+
+    def __init__(self):
+        self.checked = 0
+        self.duplicates = 0
+        self.frames_skipped = 0
+
+    def record(self, frames, duplicate, scored=False):
+        self.checked += 1
+        if duplicate:
+            self.duplicates += 1
+            if not scored:
+                self.frames_skipped += frames
+
+    def get_metrics(self):
+        return {
+            "uploads_checked": self.checked,
+            "duplicates": self.duplicates,
+            "frames_skipped": self.frames_skipped,
+        }
+
+
+dedup_counters = DedupCounters()
+
+
+class VideoScorer:
+    """
+    Scores the frames of one uploaded video, keeping the posture baseline and the
+    shadow detector in step with the live detector. Frames can be added all at
+    once or as they arrive.
+
+    With a decimation of k only every k-th frame is scored, by a detector whose
+    thresholds are scaled to the lower rate. Timelines and the duration are
+    reported in frames at VIDEO_FRAME_PER_SECOND, the unit of every stored
+    session, also for a video scored at a rate of its own.
+    """
+
+    def __init__(
+        self,
+        db,
+        user_id,
+        device_identifier,
+        frame_per_second=VIDEO_FRAME_PER_SECOND,
+        shadow=True,
+        decimation=None,
+    ):
+        self.db = db
+        self.user_id = user_id
+        self.device_identifier = device_identifier
+        self.frame_per_second = frame_per_second
+        self.decimation = decimation or default_decimation(frame_per_second)
+        self.detector = detection(
+            frame_per_second=decimated_fps(frame_per_second, self.decimation)
+        )
+        self.baseline_tracker = load_baseline_tracker(
+            db, self.detector, user_id, device_identifier
+        )
+        # Shadow sessions need every frame in one process, so resumable uploads opt out
+        self.shadow_evaluator = get_shadow_evaluator() if shadow else None
+        self.shadow_session = (
+            self.shadow_evaluator.start_session(self.detector)
+            if self.shadow_evaluator
+            else None
+        )
+        self.frame_decoder = FrameDecoder()
+        self.frames = 0
+
+    def _score(self, current_values, face_detect):
+        score_values(self.detector, current_values, face_detect)
+        if self.shadow_session:
+            self.shadow_evaluator.submit(
+                self.shadow_session, current_values, face_detect
+            )
+        if self.baseline_tracker.observe(current_values) and self.shadow_session:
+            self.shadow_evaluator.load_correct_value(
+                self.shadow_session, self.detector.correct_values
+            )
+
+    def add_frames(self, frames):
+        """Score a batch of frames with vectorized feature extraction."""
+        scored = decimate_frames(frames, self.decimation, self.frames)
+        self.frames += len(frames)
+        for entry, current_values in iter_frame_values(scored):
+            if current_values is not None:
+                self._score(current_values, entry.get("faceDetect"))
+
+    def add_frames_parallel(self, frames, executor, workers=PARALLEL_SCORING_WORKERS):
+        """
+        Score a batch of frames with the detection stage split across a process
+        pool. The result is identical to `add_frames`.
+        """
+        scored = decimate_frames(frames, self.decimation, self.frames)
+        self.frames += len(frames)
+        features, faces, _ = extract_feature_columns(scored)
+
+        # Calibration and the baseline drift check run sequentially first
+        index = 0
+        while index < len(faces) and self.baseline_tracker.session_values is None:
+            current_values = feature_rows(features, index, index + 1)[0]
+            self._score(current_values, faces[index])
+            index += 1
+        if index == len(faces):
+            return
+
+        rest = {key: column[index:] for key, column in features.items()}
+        if self.shadow_session:
+            for current_values, face_detect in zip(feature_rows(rest), faces[index:]):
+                self.shadow_evaluator.submit(
+                    self.shadow_session, current_values, face_detect
+                )
+        score_segments(self.detector, rest, faces[index:], executor, workers)
+
+    def add_frame(self, entry):
+        """Score a single frame as it arrives."""
+        self.frames += 1
+        if (self.frames - 1) % self.decimation:
+            return
+        current_values = self.frame_decoder.extract(entry)
+        if current_values is not None:
+            self._score(current_values, entry.get("faceDetect"))
+
+    def get_state(self):
+        """JSON-serializable scoring progress, restored with `load_state`."""
+        return {
+            "frames": self.frames,
+            "decimation": self.decimation,
+            "detector": self.detector.get_state(),
+            "baseline": self.baseline_tracker.get_state(),
+        }
+
+    def load_state(self, state):
+        self.frames = state["frames"]
+        self.decimation = state.get("decimation", 1)
+        self.detector.load_state(state["detector"])
+        self.baseline_tracker.load_state(state["baseline"])
+
+    def finish(self):
+        self.detector.finalize_timeline()
+        if self.shadow_session:
+            self.shadow_evaluator.finish(self.shadow_session, self.detector)
+        return self.get_timeline_result()
+
+    def stored_frames_per_frame(self):
+        return VIDEO_FRAME_PER_SECOND / self.frame_per_second
+
+    def get_timeline_result(self):
+        return scale_timeline(
+            self.detector.get_timeline_result(),
+            self.decimation * self.stored_frames_per_frame(),
+        )
+
+    def save(self, video_name, thumbnail, sitting_session_id=None, content_hash=None):
+        """Store the scored video as a SittingSession and refine the baseline."""
+        sitting_session_id = sitting_session_id or uuid.uuid4()
+        timeline_result = self.get_timeline_result()
+        db_sitting_session = SittingSession(
+            sitting_session_id=sitting_session_id,
+            user_id=self.user_id,
+            blink=timeline_result["blink"],
+            sitting=timeline_result["sitting"],
+            distance=timeline_result["distance"],
+            thoracic=timeline_result["thoracic"],
+            stats=self.detector.get_session_stats(),
+            date=datetime.now(),
+            duration=round(self.frames * self.stored_frames_per_frame()),
+            file_name=video_name,
+            thumbnail=thumbnail,
+            session_type="video",
+            is_complete=True,
+            content_hash=content_hash,
+        )
+
+        try:
+            self.db.add(db_sitting_session)
+            self.db.commit()
+            self.db.refresh(db_sitting_session)
+        except IntegrityError:
+            self.db.rollback()
+            raise HTTPException(
+                status_code=400, detail="A session with this ID already exists."
+            )
+        except SQLAlchemyError:
+            self.db.rollback()
+            raise HTTPException(
+                status_code=500, detail="Database error while creating sitting session."
+            )
+
+        save_session_baseline(
+            self.db, self.user_id, self.device_identifier, self.baseline_tracker
+        )
+        return sitting_session_id
@@ -0,0 +1,157 @@
+"""
+Calibration wall time versus image count, and the cost of chessboard detection
+per image.
+
+    python -m benchmarks.bench_calibration [--save | --compare] [--repeat 1]
+
+Views are renders of the calibration chessboard. One calibrate operation is a
+whole 1080p calibration set with corner detection on one thread or on the
+calibration thread pool; wall time per set is 1 / ops/sec and is logged for
+each image count at the end together with the speed-up, which is bounded by
+the cores available.
+
+Detect cases time `find_corners` on one image, searching at full resolution or
+coarse-to-fine (CALIBRATION_DETECT_WIDTH), on views with a board and on empty
+frames, the worst case. A full-resolution search of an empty 4K frame takes
+minutes and is left out. The mean reprojection error of both modes is logged
+at the end; they should agree closely.
+
+ChArUco cases time the same operations for the ChArUco board. Robustness is
+logged last: for each board, the views a calibration could use and the
+focal-length error, on sets where a share of the views is partly covered.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+import numpy as np
+
+from api.calibration import (
+    CALIBRATION_BOARDS,
+    CALIBRATION_DETECT_WIDTH,
+    CALIBRATION_WORKERS,
+    calibrate_images,
+    detect_board,
+    find_corners,
+)
+from benchmarks.fixtures import camera_matrix, make_board_views
+from benchmarks.harness import main
+
+logger = logging.getLogger(__name__)
+
+IMAGE_COUNTS = (10, 20, 30)
+RESOLUTIONS = {"1080p": (1920, 1080), "4K": (3840, 2160)}
+VIEWS = make_board_views(max(IMAGE_COUNTS), seed=4)
+CHARUCO_VIEWS = make_board_views(max(IMAGE_COUNTS), seed=4, board="charuco")
+OCCLUSIONS = (0, 0.5, 1)
+
+
+def empty_frame(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.normal(128, 30, size[::-1]), 0, 255).astype(np.uint8)
+
+
+def make_cases(executors):
+    def calibrate(count, executor, board="chessboard"):
+        views = CHARUCO_VIEWS if board == "charuco" else VIEWS
+        images = list(enumerate(views[:count]))
+
+        def case(n):
+            for _ in range(n):
+                calibrate_images(images, executor, board=board)
+
+        return case
+
+    def detect_charuco(image, detect_width):
+        def case(n):
+            for _ in range(n):
+                detect_board(image, "charuco", detect_width)
+
+        return case
+
+    def detect(image, detect_width):
+        def case(n):
+            for _ in range(n):
+                find_corners(image, detect_width)
+
+        return case
+
+    cases = {
+        f"calibrate[{workers} threads, {count} images]": calibrate(count, executor)
+        for count in IMAGE_COUNTS
+        for workers, executor in executors.items()
+    }
+    for name, size in RESOLUTIONS.items():
+        board = make_board_views(1, size, seed=5)[0]
+        empty = empty_frame(size)
+        for mode, width in (("full", 0), ("coarse", CALIBRATION_DETECT_WIDTH)):
+            cases[f"detect[{mode}, {name} board]"] = detect(board, width)
+            if mode == "coarse" or name == "1080p":
+                cases[f"detect[{mode}, {name} empty]"] = detect(empty, width)
+
+    workers = max(executors)
+    for count in IMAGE_COUNTS:
+        cases[f"calibrate[charuco, {workers} threads, {count} images]"] = calibrate(
+            count, executors[workers], "charuco"
+        )
+    for name, size in RESOLUTIONS.items():
+        board = make_board_views(1, size, seed=5, board="charuco")[0]
+        empty = empty_frame(size)
+        for mode, width in (("full", 0), ("coarse", CALIBRATION_DETECT_WIDTH)):
+            cases[f"detect[charuco {mode}, {name} board]"] = detect_charuco(
+                board, width
+            )
+            cases[f"detect[charuco {mode}, {name} empty]"] = detect_charuco(
+                empty, width
+            )
+    return cases
+
+
+def log_accuracy():
+    for board in CALIBRATION_BOARDS:
+        for name, size in RESOLUTIONS.items():
+            views = make_board_views(12, size, seed=6, board=board)
+            errors = [
+                calibrate_images(
+                    list(enumerate(views)), detect_width=width, board=board
+                )["mean_error"]
+                for width in (0, CALIBRATION_DETECT_WIDTH)
+            ]
+            logger.info(
+                f"{board} {name} mean_error: {errors[0]:.5f} full, "
+                f"{errors[1]:.5f} coarse ({errors[1] - errors[0]:+.5f})"
+            )
+
+
+def log_robustness(count=15, size=(1920, 1080)):
+    focal_length = camera_matrix(size)[0, 0]
+    for occlusion in OCCLUSIONS:
+        for board in CALIBRATION_BOARDS:
+            views = make_board_views(count, size, 7, board, occlusion)
+            used = sum(detect_board(view, board) is not None for view in views)
+            result = calibrate_images(list(enumerate(views)), board=board)
+            error = (
+                f"focal length {result['cameraMatrix'][0][0] / focal_length - 1:+.3%}"
+                if result
+                else "calibration failed"
+            )
+            logger.info(
+                f"{occlusion:.0%} occluded, {board:<10} {used:2d}/{count} views, "
+                f"{error}"
+            )
+
+
+if __name__ == "__main__":
+    logging.getLogger("api.calibration").setLevel(logging.CRITICAL)
+    workers = max(CALIBRATION_WORKERS, 2)
+    with ThreadPoolExecutor(1) as single, ThreadPoolExecutor(workers) as pool:
+        results = main("calibration", make_cases({1: single, workers: pool}))
+    for count in IMAGE_COUNTS:
+        sequential = results[f"calibrate[1 threads, {count} images]"]
+        parallel = results[f"calibrate[{workers} threads, {count} images]"]
+        logger.info(
+            f"{count} images: {1 / sequential:.2f}s on 1 thread, "
+            f"{1 / parallel:.2f}s on {workers} ({parallel / sequential:.2f}x)"
+        )
+    log_accuracy()
+    log_robustness()
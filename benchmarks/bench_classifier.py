@@ -0,0 +1,88 @@
+"""
+Batched versus per-frame posture classifier inference on CPU.
+
+    python -m benchmarks.bench_classifier [--save | --compare]
+
+Uses a small reference MLP with the classifier's input contract; every case
+reports frames/sec so the numbers are directly comparable.
+"""
+
+import asyncio
+from itertools import cycle, islice
+import logging
+import os
+import tempfile
+
+from api.classifier import InferenceScheduler, PostureClassifier, encode_features
+from api.pipeline import extract_current_values
+from api.procressData import processData
+from benchmarks.fixtures import make_frames
+from benchmarks.harness import main
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 32
+VALUES = [
+    extract_current_values(processData(frame)) for frame in make_frames(1024, seed=2)
+]
+ROWS = [encode_features(values) for values in VALUES]
+
+
+def build_reference_classifier():
+    import torch
+
+    model = torch.nn.Sequential(
+        torch.nn.Linear(len(ROWS[0]), 32),
+        torch.nn.ReLU(),
+        torch.nn.Linear(32, 1),
+        torch.nn.Sigmoid(),
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "posture.pt")
+        torch.jit.save(torch.jit.script(model), path)
+        return PostureClassifier(path)
+
+
+def make_cases(classifier):
+    def per_frame(n):
+        for values in islice(cycle(VALUES), n):
+            classifier.predict(values)
+
+    def batched(n):
+        rows = list(islice(cycle(ROWS), n))
+        for i in range(0, n, BATCH_SIZE):
+            classifier.predict_batch(rows[i : i + BATCH_SIZE])
+
+    def scheduler(n):
+        # BATCH_SIZE concurrent sessions each sending frames through the scheduler
+        async def session(scheduler, frames):
+            for values in frames:
+                await scheduler.score(values)
+
+        async def run():
+            scheduler = InferenceScheduler(classifier, BATCH_SIZE, max_delay=0.002)
+            per_session = max(n // BATCH_SIZE, 1)
+            await asyncio.gather(
+                *(
+                    session(scheduler, islice(cycle(VALUES), per_session))
+                    for _ in range(BATCH_SIZE)
+                )
+            )
+
+        asyncio.run(run())
+
+    return {
+        "classifier.per_frame": per_frame,
+        f"classifier.batched[{BATCH_SIZE}]": batched,
+        f"classifier.scheduler[{BATCH_SIZE} sessions]": scheduler,
+    }
+
+
+if __name__ == "__main__":
+    try:
+        cases = make_cases(build_reference_classifier())
+    except ImportError:
+        logging.basicConfig(level=logging.INFO)
+        logger.error("torch is not installed; skipping classifier benchmarks.")
+    else:
+        main("classifier", cases)
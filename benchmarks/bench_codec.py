@@ -0,0 +1,97 @@
+"""
+JSON codec benchmarks on large REST and websocket payloads.
+
+    python -m benchmarks.bench_codec [--save | --compare]
+
+Compares the stdlib encoder (with the str()/isoformat() passes the handlers
+needed before) against the shared orjson codec, plus ujson for reference.
+"""
+
+from datetime import datetime, timedelta
+import json
+import random
+import uuid
+
+import ujson
+
+from api import codec
+from benchmarks.fixtures import make_frames
+from benchmarks.harness import main
+
+rng = random.Random(4)
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+# /user/history for a heavy user
+HISTORY = [
+    {
+        "sitting_session_id": uuid.UUID(int=rng.getrandbits(128)),
+        "file_name": f"session_{i}.mp4",
+        "thumbnail": "data:image/jpeg;base64," + "A" * 2000,
+        "date": START + timedelta(minutes=37 * i, microseconds=i),
+        "session_type": rng.choice(("stream", "video")),
+    }
+    for i in range(5000)
+]
+
+# /user/summary timelines of a long noisy session
+TIMELINE = {
+    topic: [
+        [start, start + rng.randint(30, 300)]
+        for start in range(0, 15 * 3600 * 8, rng.randint(200, 400))
+    ]
+    for topic in ("blink", "sitting", "distance", "thoracic")
+}
+
+FRAME_MESSAGES = [json.dumps({"data": frame}) for frame in make_frames(512, seed=5)]
+ALERT = {
+    "type": "all_topic_alerts",
+    "data": {"blink": False, "sitting": True, "distance": False, "thoracic": True},
+}
+
+
+def _history_stdlib():
+    return json.dumps(
+        [
+            {
+                **row,
+                "sitting_session_id": str(row["sitting_session_id"]),
+                "date": row["date"].isoformat(),
+            }
+            for row in HISTORY
+        ]
+    ).encode()
+
+
+def _repeat(func):
+    def case(n):
+        for _ in range(n):
+            func()
+
+    return case
+
+
+def _frames(loads):
+    def case(n):
+        messages = FRAME_MESSAGES
+        for i in range(n):
+            loads(messages[i % len(messages)])
+
+    return case
+
+
+CASES = {
+    "history[5000].stdlib": _repeat(_history_stdlib),
+    "history[5000].codec": _repeat(lambda: codec.dumps(HISTORY)),
+    "timeline.stdlib": _repeat(lambda: json.dumps(TIMELINE).encode()),
+    "timeline.ujson": _repeat(lambda: ujson.dumps(TIMELINE).encode()),
+    "timeline.codec": _repeat(lambda: codec.dumps(TIMELINE)),
+    "ws_frame.loads.stdlib": _frames(json.loads),
+    "ws_frame.loads.ujson": _frames(ujson.loads),
+    "ws_frame.loads.codec": _frames(codec.loads),
+    "ws_alert.dumps.stdlib": _repeat(lambda: json.dumps(ALERT)),
+    "ws_alert.dumps.codec": _repeat(lambda: codec.dumps_text(ALERT)),
+}
+
+
+if __name__ == "__main__":
+    main("codec", CASES)
@@ -0,0 +1,109 @@
+"""
+Timeline accuracy versus CPU when video uploads are scored at a lower rate.
+
+    python -m benchmarks.bench_decimation [--recordings FILE ...] [--save | --compare]
+
+Recorded sessions (any format `api.replay` reads, captured at 15 fps) are
+scored every k-th frame for each step in STEPS, as VideoScorer does with
+VIDEO_DECIMATION=k. Without recordings, synthetic half-hour sessions are used.
+One operation scores every session once, feature extraction included.
+
+Accuracy is the agreement of each topic's timeline with the full-rate one: the
+intersection over union of the source frames covered by alerts (1.0 when
+neither run raised any). It is logged per step after the throughput cases.
+"""
+
+import argparse
+import logging
+
+from api.detection import detection
+from api.pipeline import (
+    decimate_frames,
+    decimated_fps,
+    iter_frame_values,
+    scale_timeline,
+    score_values,
+)
+from api.replay import iter_frames
+from benchmarks.fixtures import make_frames
+from benchmarks.harness import main
+
+logger = logging.getLogger(__name__)
+
+FRAME_PER_SECOND = 15
+STEPS = (1, 2, 3, 5, 15)
+SYNTHETIC_SESSIONS = 2
+SYNTHETIC_FRAMES = 30 * 60 * FRAME_PER_SECOND
+
+
+def score(frames, decimation):
+    detector = detection(frame_per_second=decimated_fps(FRAME_PER_SECOND, decimation))
+    for entry, current_values in iter_frame_values(decimate_frames(frames, decimation)):
+        if current_values is not None:
+            score_values(detector, current_values, entry.get("faceDetect"))
+    detector.finalize_timeline()
+    return scale_timeline(detector.get_timeline_result(), decimation)
+
+
+def covered_frames(intervals, length):
+    covered = set()
+    for interval in intervals:
+        end = interval[1] if len(interval) == 2 else length  # Still open at the end
+        covered.update(range(interval[0], end))
+    return covered
+
+
+def agreement(reference, timeline, length):
+    """Intersection over union of the frames each topic's alerts cover."""
+    result = {}
+    for topic, intervals in reference.items():
+        expected = covered_frames(intervals, length)
+        actual = covered_frames(timeline[topic], length)
+        union = expected | actual
+        result[topic] = len(expected & actual) / len(union) if union else 1.0
+    return result
+
+
+def make_cases(sessions):
+    def scorer(decimation):
+        def case(n):
+            for _ in range(n):
+                for frames in sessions:
+                    score(frames, decimation)
+
+        return case
+
+    return {
+        f"score[k={k}, {decimated_fps(FRAME_PER_SECOND, k):g} fps]": scorer(k)
+        for k in STEPS
+    }
+
+
+def log_accuracy(sessions, results):
+    references = [score(frames, 1) for frames in sessions]
+    baseline = next(iter(results.values()))
+    for k, (name, ops) in zip(STEPS, results.items()):
+        totals = {}
+        for frames, reference in zip(sessions, references):
+            for topic, value in agreement(
+                reference, score(frames, k), len(frames)
+            ).items():
+                totals[topic] = totals.get(topic, 0.0) + value / len(sessions)
+        topics = "  ".join(f"{topic} {value:.3f}" for topic, value in totals.items())
+        logger.info(f"{name:<24} {ops / baseline:5.2f}x  {topics}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--recordings", nargs="+", default=[])
+    args, rest = parser.parse_known_args()
+
+    if args.recordings:
+        sessions = [list(iter_frames(path)) for path in args.recordings]
+    else:
+        sessions = [
+            make_frames(SYNTHETIC_FRAMES, seed=seed)
+            for seed in range(SYNTHETIC_SESSIONS)
+        ]
+    results = main("decimation", make_cases(sessions), rest)
+    log_accuracy(sessions, results)
@@ -0,0 +1,127 @@
+"""
+Hot-path benchmarks for feature extraction, detection and alerting.
+
+    python -m benchmarks.bench_detection             # run
+    python -m benchmarks.bench_detection --save      # refresh the stored baseline
+    python -m benchmarks.bench_detection --compare --max-regression 10
+"""
+
+import contextlib
+import io
+import logging
+from itertools import cycle, islice
+
+from api.alerts import cooldown_periods, should_send_alert
+from api.detection import detection
+from api.pipeline import extract_current_values, iter_frame_values
+from api.procressData import (
+    FrameDecoder,
+    batch_features,
+    frames_to_arrays,
+    processData,
+)
+from benchmarks.fixtures import make_frames
+from benchmarks.harness import main
+
+FRAMES = make_frames(2048, seed=1)
+PROCESSED = [processData(frame) for frame in FRAMES]
+VALUES = [extract_current_values(processed) for processed in PROCESSED]
+FACE_DETECT = [frame["faceDetect"] for frame in FRAMES]
+MALFORMED = [
+    {key: value for key, value in frame.items() if key != "leftEye"} for frame in FRAMES
+]
+
+
+def _processed_method(name):
+    def case(n):
+        for processed in islice(cycle(PROCESSED), n):
+            getattr(processed, name)()
+
+    return case
+
+
+def bench_extract_current_values(n):
+    for frame in islice(cycle(FRAMES), n):
+        extract_current_values(processData(frame))
+
+
+def bench_extract_current_values_malformed(n):
+    logger = logging.getLogger("api.pipeline")
+    logger.disabled = True
+    try:
+        for frame in islice(cycle(MALFORMED), n):
+            extract_current_values(processData(frame))
+    finally:
+        logger.disabled = False
+
+
+def _frame_decoder(frames):
+    def case(n):
+        decoder = FrameDecoder()
+        for frame in islice(cycle(frames), n):
+            decoder.extract(frame)
+
+    return case
+
+
+def bench_batch_features(n):
+    # Counted per frame, including packing the dicts into arrays
+    for start in range(0, n, len(FRAMES)):
+        batch = FRAMES[: min(len(FRAMES), n - start)]
+        batch_features(*frames_to_arrays(batch)[:2])
+
+
+def bench_iter_frame_values(n):
+    for _ in iter_frame_values(islice(cycle(FRAMES), n)):
+        pass
+
+
+def bench_set_correct_value(n):
+    # One operation is a full calibration window on a fresh detector
+    for _ in range(n):
+        detector = detection(frame_per_second=15)
+        for values in VALUES[: detector.correct_frame]:
+            detector.set_correct_value(values)
+
+
+def bench_detect(n):
+    detector = detection(frame_per_second=15)
+    for values in VALUES[: detector.correct_frame]:
+        detector.set_correct_value(values)
+    pairs = islice(cycle(zip(VALUES, FACE_DETECT)), n)
+    for values, face_detect in pairs:
+        detector.detect(values, face_detect)
+
+
+def bench_should_send_alert(n):
+    detector = detection(frame_per_second=1)
+    for values in VALUES[: detector.correct_frame]:
+        detector.set_correct_value(values)
+    track = {i: {"send": False, "last_time": None} for i in cooldown_periods}
+    pairs = islice(cycle(zip(VALUES, FACE_DETECT)), n)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for values, face_detect in pairs:
+            detector.detect(values, face_detect)
+            should_send_alert(detector.get_alert(), cooldown_periods, track)
+
+
+CASES = {
+    "processData.get_shoulder_position": _processed_method("get_shoulder_position"),
+    "processData.get_blink_right": _processed_method("get_blink_right"),
+    "processData.get_blink_left": _processed_method("get_blink_left"),
+    "processData.get_diameter_right": _processed_method("get_diameter_right"),
+    "processData.get_diameter_left": _processed_method("get_diameter_left"),
+    "extract_current_values": bench_extract_current_values,
+    "extract_current_values[malformed]": bench_extract_current_values_malformed,
+    "FrameDecoder.extract": _frame_decoder(FRAMES),
+    "FrameDecoder.extract[malformed]": _frame_decoder(MALFORMED),
+    "batch_features[per frame]": bench_batch_features,
+    "iter_frame_values[per frame]": bench_iter_frame_values,
+    "detection.set_correct_value[15 frames]": bench_set_correct_value,
+    "detection.detect": bench_detect,
+    "detect+should_send_alert": bench_should_send_alert,
+}
+
+
+if __name__ == "__main__":
+    main("detection", CASES)
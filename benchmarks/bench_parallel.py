@@ -0,0 +1,87 @@
+"""
+Sequential versus segment-parallel scoring of hour-long videos at 15 fps.
+
+    python -m benchmarks.bench_parallel [--save | --compare] [--repeat 1]
+
+Covers the detection stage only; vectorized feature extraction is shared by
+both paths and stays in the calling process. One operation is one whole
+video, so ops/sec of the two modes divide into the speed-up, which is logged at
+the end. The speed-up is bounded by the cores available to the pool, which the
+saved baseline records; a baseline taken on one core only shows the pool's
+overhead.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+
+from api.detection import detection
+from api.parallel_scoring import score_segments
+from api.pipeline import extract_feature_columns, feature_rows
+from benchmarks.fixtures import iter_frames
+from benchmarks.harness import main
+
+logger = logging.getLogger(__name__)
+
+FRAME_PER_SECOND = 15
+HOURS = (1, 2, 4)
+WORKERS = int(os.getenv("PARALLEL_SCORING_WORKERS", "4"))
+
+_videos = {}
+
+
+def video_features(hours):
+    if hours not in _videos:
+        frames = iter_frames(hours * 3600 * FRAME_PER_SECOND, seed=hours)
+        features, faces, _ = extract_feature_columns(frames)
+        _videos[hours] = features, faces
+    return _videos[hours]
+
+
+def calibrated_detector(hours):
+    features, faces = video_features(hours)
+    detector = detection(frame_per_second=FRAME_PER_SECOND)
+    for current_values in feature_rows(features, 0, detector.correct_frame):
+        detector.set_correct_value(current_values)
+    rest = {key: column[detector.correct_frame :] for key, column in features.items()}
+    return detector, rest, faces[detector.correct_frame :]
+
+
+def make_cases(executor):
+    def sequential(hours):
+        def case(n):
+            for _ in range(n):
+                detector, features, faces = calibrated_detector(hours)
+                for current_values, face_detect in zip(feature_rows(features), faces):
+                    detector.detect(current_values, face_detect)
+
+        return case
+
+    def parallel(hours):
+        def case(n):
+            for _ in range(n):
+                detector, features, faces = calibrated_detector(hours)
+                score_segments(detector, features, faces, executor, WORKERS)
+
+        return case
+
+    cases = {}
+    for hours in HOURS:
+        cases[f"score[sequential, {hours}h]"] = sequential(hours)
+        cases[f"score[{WORKERS} workers, {hours}h]"] = parallel(hours)
+    return cases
+
+
+if __name__ == "__main__":
+    logging.getLogger("api.parallel_scoring").setLevel(logging.WARNING)
+    with ProcessPoolExecutor(max_workers=WORKERS) as executor:
+        results = main("parallel", make_cases(executor))
+    for hours in HOURS:
+        speedup = (
+            results[f"score[{WORKERS} workers, {hours}h]"]
+            / results[f"score[sequential, {hours}h]"]
+        )
+        logger.info(
+            f"{hours}h speed-up with {WORKERS} workers on {os.cpu_count()} cores: "
+            f"{speedup:.2f}x"
+        )
@@ -0,0 +1,164 @@
+"""
+Deterministic landmark fixtures shaped like the frames the desktop client sends.
+
+Frames follow a seated user at ~15 fps: shoulder height wanders and slumps, eyes
+blink every few seconds, the face occasionally leaves the frame and single
+landmarks drop out the way MediaPipe reports missing points (as None).
+
+Calibration fixtures render a chessboard or ChArUco board through a known pinhole camera
+(CHESSBOARD_CAMERA) from random poses, so a calibration can be checked against
+the true intrinsics.
+"""
+
+import random
+
+RIGHT_EYE = ("33", "133", "144", "153", "158", "160")
+LEFT_EYE = ("263", "362", "373", "380", "385", "387")
+RIGHT_IRIS = ("469", "471")
+LEFT_IRIS = ("474", "476")
+
+
+def _point(x, y):
+    return {"x": x, "y": y}
+
+
+def _eye(rng, cx, cy, openness, keys):
+    # keys: outer/inner corners, then lower pair, then upper pair
+    outer, inner, lower_a, lower_b, upper_b, upper_a = keys
+    half_width = 0.03
+    lid = openness * half_width
+    jitter = rng.gauss
+    return {
+        outer: _point(cx - half_width + jitter(0, 0.0005), cy),
+        inner: _point(cx + half_width + jitter(0, 0.0005), cy),
+        lower_a: _point(cx - half_width / 3, cy + lid),
+        lower_b: _point(cx + half_width / 3, cy + lid),
+        upper_b: _point(cx + half_width / 3, cy - lid),
+        upper_a: _point(cx - half_width / 3, cy - lid),
+    }
+
+
+def make_frame(rng, index, frame_per_second=15):
+    seconds = index / frame_per_second
+    face_detect = rng.random() > 0.02 and int(seconds) % 300 < 295
+    slump = 0.08 if int(seconds) % 120 > 90 else 0.0
+    shoulder_y = 0.78 + slump + rng.gauss(0, 0.004)
+    blinking = index % (4 * frame_per_second) < 3
+    openness = 0.1 if blinking else 0.3 + rng.gauss(0, 0.01)
+    lean = 0.005 * (1 + (int(seconds) % 600 > 400))
+    iris = 0.018 + lean + rng.gauss(0, 0.0004)
+
+    frame = {
+        "faceDetect": face_detect,
+        "leftShoulder": _point(0.68, shoulder_y + rng.gauss(0, 0.002)),
+        "rightShoulder": _point(0.32, shoulder_y + rng.gauss(0, 0.002)),
+        "rightEye": _eye(rng, 0.43, 0.42, openness, RIGHT_EYE),
+        "leftEye": _eye(rng, 0.57, 0.42, openness, LEFT_EYE),
+        "rightIris": {
+            RIGHT_IRIS[0]: _point(0.43 - iris / 2, 0.42),
+            RIGHT_IRIS[1]: _point(0.43 + iris / 2, 0.42),
+        },
+        "leftIris": {
+            LEFT_IRIS[0]: _point(0.57 - iris / 2, 0.42),
+            LEFT_IRIS[1]: _point(0.57 + iris / 2, 0.42),
+        },
+    }
+
+    # Landmark dropouts
+    if rng.random() < 0.03:
+        frame[rng.choice(("leftShoulder", "rightShoulder"))] = None
+    if rng.random() < 0.01:
+        frame["rightIris"][RIGHT_IRIS[1]] = None
+    if not face_detect:
+        for part, keys in (
+            ("rightEye", RIGHT_EYE),
+            ("leftEye", LEFT_EYE),
+            ("rightIris", RIGHT_IRIS),
+            ("leftIris", LEFT_IRIS),
+        ):
+            frame[part] = {key: None for key in keys}
+    return frame
+
+
+def make_frames(count, seed=0, frame_per_second=15):
+    rng = random.Random(seed)
+    return [make_frame(rng, i, frame_per_second) for i in range(count)]
+
+
+def iter_frames(count, seed=0, frame_per_second=15):
+    """Generate frames lazily, for hour-long inputs."""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield make_frame(rng, i, frame_per_second)
+
+
+# Pinhole camera for calibration fixtures, scaled with the image size
+CHESSBOARD_CAMERA = {"fx": 0.7, "fy": 0.7, "cx": 0.5, "cy": 0.5}  # x width
+CHESSBOARD_PIXELS_PER_MM = 4
+
+
+def camera_matrix(size):
+    import numpy as np
+
+    width, height = size
+    return np.array(
+        [
+            [CHESSBOARD_CAMERA["fx"] * width, 0, CHESSBOARD_CAMERA["cx"] * width],
+            [0, CHESSBOARD_CAMERA["fy"] * width, CHESSBOARD_CAMERA["cy"] * height],
+            [0, 0, 1],
+        ]
+    )
+
+
+def make_board_views(count, size=(1920, 1080), seed=0, board="chessboard", occlusion=0):
+    """
+    Grayscale views of a calibration board from random poses. A share
+    `occlusion` of the views has part of the board covered, as by a hand.
+    """
+    import cv2
+    import numpy as np
+
+    from api.calibration import CHARUCO_SIZE, SQUARE_SIZE_MM, render_board
+
+    rng = np.random.default_rng(seed)
+    texture = render_board(board, CHESSBOARD_PIXELS_PER_MM)
+
+    # Texture pixels to board millimetres; the origin of the object points is
+    # the first inner corner of a chessboard and the outer corner of a ChArUco
+    origin = (2 if board == "chessboard" else 1) * SQUARE_SIZE_MM
+    to_board = np.array(
+        [
+            [1 / CHESSBOARD_PIXELS_PER_MM, 0, -origin],
+            [0, 1 / CHESSBOARD_PIXELS_PER_MM, -origin],
+            [0, 0, 1],
+        ]
+    )
+    matrix = camera_matrix(size)
+    # Far enough for the board to span about half the image width
+    distance = matrix[0, 0] * CHARUCO_SIZE[0] * SQUARE_SIZE_MM / size[0] * 2
+    center = np.array([*CHARUCO_SIZE, 0]) * SQUARE_SIZE_MM / 2
+    center[:2] += SQUARE_SIZE_MM - origin
+    views = []
+    for _ in range(count):
+        rotation, _ = cv2.Rodrigues(
+            np.array([*rng.uniform(-0.35, 0.35, 2), rng.uniform(-0.2, 0.2)])
+        )
+        offset = rng.uniform(-0.15, 0.15, 3) * distance
+        # Rotate about the board centre, then place it in front of the camera
+        translation = -rotation @ center + [
+            offset[0],
+            offset[1],
+            distance + offset[2],
+        ]
+        homography = matrix @ np.column_stack([rotation[:, :2], translation]) @ to_board
+        image = cv2.warpPerspective(
+            texture, homography, size, flags=cv2.INTER_AREA, borderValue=180
+        )
+        if occlusion and rng.random() < occlusion:
+            x, y = (rng.uniform(0.3, 0.6, 2) * size).astype(int)
+            side = int(rng.uniform(0.2, 0.3) * size[1])
+            cv2.rectangle(image, (x, y), (x + side, y + side), 90, cv2.FILLED)
+        image = cv2.GaussianBlur(image, (3, 3), 0.8)
+        noise = rng.normal(0, 2.0, image.shape)
+        views.append(np.clip(image + noise, 0, 255).astype(np.uint8))
+    return views
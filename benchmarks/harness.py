@@ -0,0 +1,112 @@
+"""
+Minimal benchmark harness: each case runs `n` operations and reports the best
+ops/sec over several repeats. Results can be saved as a baseline JSON file and
+compared against it to gate throughput regressions.
+
+Baselines are only meaningful on the machine that produced them; refresh them
+with --save on the host that runs the gate.
+"""
+
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+import platform
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+DEFAULT_MAX_REGRESSION = 15.0  # percent
+
+
+def measure(case, number, repeat=5):
+    """Best ops/sec over `repeat` runs of `number` operations."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case(number)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return number / best if best else float("inf")
+
+
+def autorange(case, min_time=0.2):
+    """Pick an operation count that runs for at least `min_time` seconds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        case(number)
+        if time.perf_counter() - start >= min_time:
+            return number
+        number *= 2
+
+
+def run_cases(cases, repeat=5):
+    results = {}
+    for name, case in cases.items():
+        number = autorange(case)
+        results[name] = measure(case, number, repeat)
+        logger.info(f"{name:<40} {results[name]:>14,.0f} ops/sec")
+    return results
+
+
+def save_baseline(path, results):
+    payload = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+    logger.info(f"Saved baseline to {path}")
+
+
+def compare(path, results, max_regression):
+    """Return the cases whose throughput dropped more than `max_regression` %."""
+    baseline = json.loads(path.read_text())["results"]
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            logger.info(f"{name:<40} no baseline")
+            continue
+        change = (current - previous) / previous * 100
+        logger.info(f"{name:<40} {change:+7.1f}% vs baseline")
+        if change < -max_regression:
+            regressions.append((name, change))
+    return regressions
+
+
+def main(suite_name, cases, argv=None):
+    """Command-line entry point shared by every benchmark module."""
+    parser = argparse.ArgumentParser(description=f"Benchmark suite: {suite_name}")
+    parser.add_argument("--save", action="store_true", help="Overwrite the baseline")
+    parser.add_argument(
+        "--compare", action="store_true", help="Fail on regressions vs the baseline"
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=DEFAULT_MAX_REGRESSION,
+        help="Allowed throughput drop in percent",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    results = run_cases(cases, args.repeat)
+    baseline_path = BASELINE_DIR / f"{suite_name}.json"
+
+    if args.save:
+        save_baseline(baseline_path, results)
+    if args.compare:
+        regressions = compare(baseline_path, results, args.max_regression)
+        if regressions:
+            for name, change in regressions:
+                logger.error(f"Regression: {name} {change:.1f}%")
+            sys.exit(1)
+    return results
@@ -2,12 +2,24 @@ import logging
 from typing import List, Optional
 from fastapi import HTTPException
 from pydantic import EmailStr
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 import random
 import string
+from datetime import datetime, timedelta
 from auth.auth_utils import hash_password
-from database.model import User, UserSession, EmailUser, GoogleUser
+from database.model import (
+    CameraCalibration,
+    User,
+    UserSession,
+    EmailUser,
+    GoogleUser,
+    PostureBaseline,
+    SittingSession,
+    VideoJob,
+    VideoUpload,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -251,3 +263,362 @@ def delete_user_sessions(db: Session, user_id: str, device_identifier: str):
         raise HTTPException(
             status_code=500, detail=f"Error deleting user sessions: {str(e)}"
         )
+
+
+### Retrieve the posture baseline for a user's device
+def get_posture_baseline(
+    db: Session, user_id: str, device_identifier: str
+) -> Optional[PostureBaseline]:
+    """
+    Get the stored posture baseline for a user and device.
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (str): The user's unique ID.
+        device_identifier (str): The device the baseline was measured on.
+    Returns:
+        PostureBaseline: The stored baseline if found, else None.
+    """
+    return (
+        db.query(PostureBaseline)
+        .filter_by(user_id=user_id, device_identifier=device_identifier)
+        .first()
+    )
+
+
+### Create or replace the posture baseline for a user's device
+def upsert_posture_baseline(
+    db: Session,
+    user_id: str,
+    device_identifier: str,
+    values: dict,
+    sample_count: int,
+) -> Optional[PostureBaseline]:
+    """
+    Store the posture baseline for a user and device.
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (str): The user's unique ID.
+        device_identifier (str): The device the baseline was measured on.
+        values (dict): shoulderPosition, diameterRight and diameterLeft values.
+        sample_count (int): Number of sessions folded into the baseline.
+    Returns:
+        PostureBaseline: The stored baseline, or None if the write failed.
+    """
+    try:
+        baseline = get_posture_baseline(db, user_id, device_identifier)
+        if baseline is None:
+            baseline = PostureBaseline(
+                user_id=user_id, device_identifier=device_identifier
+            )
+            db.add(baseline)
+        baseline.shoulder_position = values.get("shoulderPosition")
+        baseline.diameter_right = values.get("diameterRight")
+        baseline.diameter_left = values.get("diameterLeft")
+        baseline.sample_count = sample_count
+        baseline.updated_at = datetime.now()
+        db.commit()
+        return baseline
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error saving posture baseline: {str(e)}")
+        return None
+
+
+### Retrieve the camera calibration for a user's device
+def get_camera_calibration(
+    db: Session, user_id: str, device_identifier: str
+) -> Optional[CameraCalibration]:
+    """
+    Get the stored camera calibration for a user and device.
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (str): The user's unique ID.
+        device_identifier (str): The device the camera belongs to.
+    Returns:
+        CameraCalibration: The stored calibration if found, else None.
+    """
+    return (
+        db.query(CameraCalibration)
+        .filter_by(user_id=user_id, device_identifier=device_identifier)
+        .first()
+    )
+
+
+### Create or replace the camera calibration for a user's device
+def upsert_camera_calibration(
+    db: Session,
+    user_id: str,
+    device_identifier: str,
+    calibration_data: dict,
+    resolution: tuple,
+) -> Optional[CameraCalibration]:
+    """
+    Store the camera calibration for a user and device.
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (str): The user's unique ID.
+        device_identifier (str): The device the camera belongs to.
+        calibration_data (dict): cameraMatrix, distCoeffs and mean_error values.
+        resolution (tuple): Width and height of the calibration images.
+    Returns:
+        CameraCalibration: The stored calibration, or None if the write failed.
+    """
+    try:
+        calibration = get_camera_calibration(db, user_id, device_identifier)
+        if calibration is None:
+            calibration = CameraCalibration(
+                user_id=user_id, device_identifier=device_identifier
+            )
+            db.add(calibration)
+        calibration.camera_matrix = calibration_data["cameraMatrix"]
+        calibration.dist_coeffs = calibration_data["distCoeffs"]
+        calibration.mean_error = calibration_data["mean_error"]
+        calibration.image_width, calibration.image_height = resolution
+        calibration.updated_at = datetime.now()
+        db.commit()
+        return calibration
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error saving camera calibration: {str(e)}")
+        return None
+
+
+### Queue a video processing job
+def create_video_job(
+    db: Session,
+    job_id,
+    user_id: str,
+    device_identifier: Optional[str],
+    video_name: str,
+    thumbnail: str,
+    payload_path: str,
+    status: str = "queued",
+    sitting_session_id=None,
+) -> VideoJob:
+    """
+    Persist a queued video processing job.
+    Args:
+        db (Session): SQLAlchemy database session.
+        job_id (UUID): The job's unique ID.
+        user_id (str): The user who uploaded the video.
+        device_identifier (str): The device the video was recorded on.
+        video_name (str): Name of the uploaded video.
+        thumbnail (str): Thumbnail of the uploaded video.
+        payload_path (str): Path of the spooled frames.
+        status (str): Initial status; "done" for an already scored upload.
+        sitting_session_id (UUID): Existing session of an already scored upload.
+    Returns:
+        VideoJob: The created job.
+    """
+    try:
+        job = VideoJob(
+            job_id=job_id,
+            user_id=user_id,
+            device_identifier=device_identifier,
+            video_name=video_name,
+            thumbnail=thumbnail,
+            payload_path=payload_path,
+            status=status,
+        )
+        if sitting_session_id is not None:
+            job.sitting_session_id = sitting_session_id
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error creating video job: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error creating video job.")
+
+
+### Retrieve a user's video processing job
+def get_video_job(db: Session, job_id, user_id: str) -> Optional[VideoJob]:
+    """
+    Get a video processing job owned by a user.
+    Args:
+        db (Session): SQLAlchemy database session.
+        job_id (UUID): The job's unique ID.
+        user_id (str): The user's unique ID.
+    Returns:
+        VideoJob: The job if found, else None.
+    """
+    return db.query(VideoJob).filter_by(job_id=job_id, user_id=user_id).first()
+
+
+def _claimable_video_job(now):
+    """Queued jobs, and running jobs whose worker let the lease expire."""
+    return or_(
+        VideoJob.status == "queued",
+        and_(
+            VideoJob.status == "running",
+            or_(
+                VideoJob.lease_expires_at.is_(None),
+                VideoJob.lease_expires_at < now,
+            ),
+        ),
+    )
+
+
+### Retrieve video processing jobs that have not finished
+def get_unfinished_video_jobs(db: Session) -> List[VideoJob]:
+    """
+    Get queued jobs and running jobs with an expired lease, oldest first, so
+    they can be resumed.
+    Args:
+        db (Session): SQLAlchemy database session.
+    Returns:
+        List[VideoJob]: Jobs that have not reached done or failed and that no
+        worker currently holds.
+    """
+    return (
+        db.query(VideoJob)
+        .filter(_claimable_video_job(datetime.now()))
+        .order_by(VideoJob.created_at)
+        .all()
+    )
+
+
+### Claim a video processing job for the calling worker
+def claim_video_job(db: Session, job_id, lease_seconds: float) -> bool:
+    """
+    Atomically mark a job running with a lease for the caller. Fails if the job
+    has finished or another worker holds an unexpired lease on it.
+    Args:
+        db (Session): SQLAlchemy database session.
+        job_id (UUID): The job's unique ID.
+        lease_seconds (float): How long the claim holds without renewal.
+    Returns:
+        bool: True if the caller now owns the job.
+    """
+    now = datetime.now()
+    claimed = (
+        db.query(VideoJob)
+        .filter(VideoJob.job_id == job_id, _claimable_video_job(now))
+        .update(
+            {
+                "status": "running",
+                "started_at": now,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return claimed == 1
+
+
+### Extend the lease on a running video processing job
+def renew_video_job_lease(db: Session, job_id, lease_seconds: float) -> bool:
+    """
+    Push back the lease of a job the caller is running.
+    Args:
+        db (Session): SQLAlchemy database session.
+        job_id (UUID): The job's unique ID.
+        lease_seconds (float): How long the renewed claim holds.
+    Returns:
+        bool: False if the job is no longer running.
+    """
+    renewed = (
+        db.query(VideoJob)
+        .filter(VideoJob.job_id == job_id, VideoJob.status == "running")
+        .update(
+            {"lease_expires_at": datetime.now() + timedelta(seconds=lease_seconds)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return renewed == 1
+
+
+### Retrieve a user's resumable video upload
+def get_video_upload(
+    db: Session, upload_id, user_id: str, for_update: bool = False
+) -> Optional[VideoUpload]:
+    """
+    Get a resumable video upload owned by a user.
+    Args:
+        db (Session): SQLAlchemy database session.
+        upload_id (UUID): The upload's unique ID.
+        user_id (str): The user's unique ID.
+        for_update (bool): Lock the row until the transaction ends.
+    Returns:
+        VideoUpload: The upload if found, else None.
+    """
+    query = db.query(VideoUpload).filter_by(upload_id=upload_id, user_id=user_id)
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
+
+
+### Create a resumable video upload, or return the one with the same key
+def get_or_create_video_upload(
+    db: Session,
+    user_id: str,
+    idempotency_key: str,
+    device_identifier: Optional[str],
+    video_name: str,
+    thumbnail: str,
+    sitting_session_id,
+) -> VideoUpload:
+    """
+    Start a resumable video upload, idempotent on the client's key.
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (str): The user's unique ID.
+        idempotency_key (str): Client-chosen key for the logical upload.
+        device_identifier (str): The device the video was recorded on.
+        video_name (str): Name of the uploaded video.
+        thumbnail (str): Thumbnail of the uploaded video.
+        sitting_session_id (UUID): Session ID the upload will be stored as.
+    Returns:
+        VideoUpload: The new upload, or the existing one for this key.
+    """
+    query = db.query(VideoUpload).filter_by(
+        user_id=user_id, idempotency_key=idempotency_key
+    )
+    upload = query.first()
+    if upload is not None:
+        return upload
+    try:
+        upload = VideoUpload(
+            user_id=user_id,
+            idempotency_key=idempotency_key,
+            device_identifier=device_identifier,
+            video_name=video_name,
+            thumbnail=thumbnail,
+            sitting_session_id=sitting_session_id,
+        )
+        db.add(upload)
+        db.commit()
+        db.refresh(upload)
+        return upload
+    except IntegrityError:
+        # A concurrent retry created it first
+        db.rollback()
+        return query.first()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error creating video upload: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error creating video upload.")
+
+
+### Retrieve an uploaded session by its content hash
+def get_session_by_content_hash(
+    db: Session, user_id: str, content_hash: str
+) -> Optional[SittingSession]:
+    """
+    Find a session the user already created from identical frames.
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (str): The user's unique ID.
+        content_hash (str): Hash of the uploaded frames and scoring version.
+    Returns:
+        SittingSession: The earliest matching session if found, else None.
+    """
+    return (
+        db.query(SittingSession)
+        .filter_by(user_id=user_id, content_hash=content_hash)
+        .order_by(SittingSession.date)
+        .first()
+    )
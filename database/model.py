@@ -8,6 +8,8 @@ from sqlalchemy import (
     UniqueConstraint,
     JSON,
     Integer,
+    Float,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from auth.token import get_current_time
@@ -115,9 +117,83 @@ class SittingSession(Base):
     sitting = Column(JSON)
     distance = Column(JSON)
     thoracic = Column(JSON)
+    stats = Column(JSON)
     file_name = Column(String)
     thumbnail = Column(String)
     duration = Column(Integer)
     date = Column(DateTime, nullable=False, default=datetime.now)
     session_type = Column(String(50))
     is_complete = Column(Boolean, nullable=False)
+    content_hash = Column(String(64), nullable=True)  # Uploaded videos only
+
+    # Per-user lookup of previously scored uploads
+    __table_args__ = (
+        Index("ix_sitting_sessions_user_content_hash", "user_id", "content_hash"),
+    )
+
+
+class PostureBaseline(Base):
+    __tablename__ = "posture_baselines"
+
+    user_id = Column(String, ForeignKey("users.user_id"), primary_key=True)
+    device_identifier = Column(String, primary_key=True)
+    shoulder_position = Column(Float, nullable=True)
+    diameter_right = Column(Float, nullable=True)
+    diameter_left = Column(Float, nullable=True)
+    sample_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
+
+
+class CameraCalibration(Base):
+    __tablename__ = "camera_calibrations"
+
+    user_id = Column(String, ForeignKey("users.user_id"), primary_key=True)
+    device_identifier = Column(String, primary_key=True)
+    camera_matrix = Column(JSON, nullable=False)
+    dist_coeffs = Column(JSON, nullable=False)
+    mean_error = Column(Float, nullable=False)
+    image_width = Column(Integer, nullable=False)
+    image_height = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
+
+
+class VideoJob(Base):
+    __tablename__ = "video_jobs"
+
+    job_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(String, ForeignKey("users.user_id"), nullable=False, index=True)
+    device_identifier = Column(String, nullable=True)
+    video_name = Column(String)
+    thumbnail = Column(String)
+    payload_path = Column(String, nullable=False)  # Spooled frames on disk
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    # Assigned up front so a job re-run after a crash cannot create a second session
+    sitting_session_id = Column(UUID(as_uuid=True), nullable=False, default=uuid.uuid4)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Held by the worker running the job; an expired lease lets another resume it
+    lease_expires_at = Column(DateTime, nullable=True)
+
+
+class VideoUpload(Base):
+    __tablename__ = "video_uploads"
+
+    upload_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(String, ForeignKey("users.user_id"), nullable=False)
+    idempotency_key = Column(String, nullable=False)
+    device_identifier = Column(String, nullable=True)
+    video_name = Column(String)
+    thumbnail = Column(String)
+    received_frames = Column(Integer, nullable=False, default=0)
+    state = Column(JSON, nullable=True)  # Scoring progress between chunks
+    status = Column(String(20), nullable=False, default="open")
+    sitting_session_id = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
+
+    # One upload, and so one sitting session, per logical client upload
+    __table_args__ = (
+        UniqueConstraint("user_id", "idempotency_key", name="user_idempotency_key_uc"),
+    )
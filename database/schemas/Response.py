@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, field_validator
 
 
@@ -11,6 +11,7 @@ class SessionSummary(BaseModel):
     distance: List
     thoracic: List
     duration: int
+    stats: Optional[Dict[str, Any]] = None
 
     # Validator to ensure lists are returned even if None
     @field_validator("blink", "sitting", "distance", "thoracic")
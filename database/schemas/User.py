@@ -1,5 +1,5 @@
 from typing import Any, Dict, List
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 
 class User(BaseModel):
@@ -16,3 +16,8 @@ class VideoUploadRequest(BaseModel):
     video_name: str
     thumbnail: str
     files: List[Dict[str, Any]]
+
+
+class VideoChunkRequest(BaseModel):
+    offset: int = Field(ge=0)
+    files: List[Dict[str, Any]]
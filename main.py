@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 import os
 import logging
@@ -13,6 +14,10 @@ from api.routes.google_router import google_router
 from api.routes.user_router import user_router
 from api.routes.websocket_router import websocket_router
 from api.routes.delete_router import delete_router
+from api.classifier import get_inference_scheduler
+from api.codec import CodecResponse
+from api.jobs import get_video_job_queue
+from api.landmark_extraction import get_landmark_executor
 from database.database import engine
 import database.model as model
 
@@ -25,7 +30,7 @@ load_dotenv()
 logger.info("Loaded .env file")
 
 # FastAPI app
-app = FastAPI()
+app = FastAPI(default_response_class=CodecResponse)
 
 # CORS
 app.add_middleware(
@@ -79,6 +84,21 @@ app.include_router(files_router, prefix="/files", tags=["Files"])
 app.include_router(delete_router, prefix="/delete", tags=["Delete"])
 
 
+@app.on_event("startup")
+async def resume_video_jobs():
+    get_video_job_queue().recover()
+
+
+@app.on_event("startup")
+async def warm_landmark_models():
+    await run_in_threadpool(get_landmark_executor)
+
+
+@app.on_event("startup")
+async def load_posture_classifier():
+    await run_in_threadpool(get_inference_scheduler)
+
+
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
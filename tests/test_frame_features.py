@@ -0,0 +1,112 @@
+import copy
+import logging
+import math
+import unittest
+
+from api.pipeline import extract_current_values, iter_frame_values
+from api.procressData import FrameDecoder, processData
+from benchmarks.fixtures import make_frames
+
+FRAMES = make_frames(600, seed=3)
+FRAME = next(
+    frame
+    for frame in FRAMES
+    if frame["faceDetect"]
+    and None not in (frame["leftShoulder"], frame["rightShoulder"])
+)
+
+
+def variant(change):
+    frame = copy.deepcopy(FRAME)
+    change(frame)
+    return frame
+
+
+def features(frame):
+    """Values of the scalar, single-frame and batch paths for one frame."""
+    scalar = extract_current_values(processData(frame))
+    decoded = FrameDecoder().extract(frame)
+    [(_, batched)] = iter_frame_values([frame])
+    return scalar, decoded, batched
+
+
+class FeaturePathsAgreeTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def assertSameFeatures(self, frame):
+        scalar, decoded, batched = features(frame)
+        for values in (decoded, batched):
+            if scalar is None or values is None:
+                self.assertIs(values, scalar)
+                continue
+            self.assertEqual(values.keys(), scalar.keys())
+            for key, value in scalar.items():
+                if value is None:
+                    self.assertIsNone(values[key], key)
+                else:
+                    self.assertTrue(math.isclose(values[key], value), key)
+        return scalar
+
+    def test_fixture_frames(self):
+        for frame in FRAMES:
+            self.assertIsNotNone(self.assertSameFeatures(frame))
+
+    def test_degenerate_frames(self):
+        def close_eye(frame):
+            frame["rightEye"]["133"] = dict(frame["rightEye"]["33"])
+
+        def drop_points(frame):
+            frame["leftShoulder"] = None
+            frame["leftIris"]["474"] = None
+
+        def integer_points(frame):
+            frame["rightShoulder"] = {"x": 0, "y": 1}
+
+        for change in (close_eye, drop_points, integer_points):
+            values = self.assertSameFeatures(variant(change))
+            self.assertIsNotNone(values)
+        self.assertIsNone(features(variant(close_eye))[0]["eyeAspectRatioRight"])
+
+    def test_malformed_frames(self):
+        def set_point(part, key, value):
+            def change(frame):
+                if key is None:
+                    frame[part] = value
+                else:
+                    frame[part][key] = value
+
+            return change
+
+        def drop(part, key=None):
+            def change(frame):
+                del (frame if key is None else frame[part])[key or part]
+
+            return change
+
+        def missing_partner(frame):
+            frame["rightIris"]["469"] = None
+            frame["rightIris"]["471"] = {"x": "junk", "y": 0.4}
+
+        changes = [
+            set_point("leftShoulder", None, {"x": 0.7, "y": "0.7"}),
+            set_point("leftShoulder", None, {"x": 0.7, "y": True}),
+            set_point("rightEye", "33", {"x": False, "y": 0.4}),
+            set_point("rightIris", "471", {}),
+            set_point("leftIris", "474", {"x": 0.5}),
+            set_point("leftEye", "263", [0.5, 0.4]),
+            set_point("rightShoulder", None, "shoulder"),
+            set_point("leftEye", None, None),
+            set_point("rightIris", None, [None, None]),
+            drop("leftEye"),
+            drop("rightEye", "160"),
+            missing_partner,
+        ]
+        for change in changes:
+            self.assertIsNone(self.assertSameFeatures(variant(change)))
+        self.assertEqual(features([FRAME]), (None, None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import time
+import unittest
+
+from api.detection import detection
+from api.shadow import ShadowEvaluator, ShadowSession
+
+BASELINE = {"shoulderPosition": 0.5, "diameterRight": 0.02, "diameterLeft": 0.02}
+
+
+class ShadowSessionTest(unittest.TestCase):
+    def test_config_parameters_go_through_the_constructor(self):
+        live = detection(frame_per_second=15)
+        session = ShadowSession(
+            live, {"timeline_merge_gap": 4, "thoracic_threshold": 0.04}
+        )
+        self.assertEqual(session.detector.timeline_merge_gap, 4 * 15)
+        self.assertEqual(
+            session.detector.timeline_min_duration, live.timeline_min_duration
+        )
+        self.assertEqual(session.detector.thoracic_threshold, 0.04)
+
+    def test_starts_from_a_warm_started_baseline(self):
+        live = detection(frame_per_second=15)
+        live.load_correct_value(BASELINE)
+        session = ShadowSession(live, {})
+        self.assertTrue(session.detector.is_calibrated())
+        self.assertEqual(session.detector.correct_values, BASELINE)
+
+
+class ShadowEvaluatorTest(unittest.TestCase):
+    def test_mirrors_baseline_reload(self):
+        evaluator = ShadowEvaluator({}, sample_rate=1)
+        live = detection(frame_per_second=15)
+        session = evaluator.start_session(live)
+        evaluator.load_correct_value(session, BASELINE)
+        evaluator.finish(session, live)
+
+        deadline = time.monotonic() + 5
+        while not evaluator.results and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(evaluator.results)
+        self.assertTrue(session.detector.is_calibrated())
+        self.assertEqual(session.detector.correct_values, BASELINE)
+
+
+if __name__ == "__main__":
+    unittest.main()
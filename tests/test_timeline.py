@@ -0,0 +1,40 @@
+import unittest
+
+from api.timeline import compact_intervals, finalize_intervals
+
+
+class FinalizeIntervalsTest(unittest.TestCase):
+    def test_drops_short_trailing_interval(self):
+        intervals = [[0, 10], [20, 22]]
+        finalize_intervals(intervals, 5)
+        self.assertEqual(intervals, [[0, 10]])
+
+    def test_keeps_long_trailing_interval(self):
+        intervals = [[0, 10], [20, 30]]
+        finalize_intervals(intervals, 5)
+        self.assertEqual(intervals, [[0, 10], [20, 30]])
+
+    def test_judges_closed_interval_before_open_one(self):
+        intervals = [[0, 10], [20, 22], [40]]
+        finalize_intervals(intervals, 5)
+        self.assertEqual(intervals, [[0, 10], [40]])
+
+        intervals = [[20, 30], [40]]
+        finalize_intervals(intervals, 5)
+        self.assertEqual(intervals, [[20, 30], [40]])
+
+    def test_open_interval_alone(self):
+        for intervals in ([], [[40]]):
+            expected = [list(interval) for interval in intervals]
+            finalize_intervals(intervals, 5)
+            self.assertEqual(intervals, expected)
+
+    def test_compact_intervals_drops_blip_before_open_interval(self):
+        self.assertEqual(
+            compact_intervals([[0, 10], [20, 22], [40]], merge_gap=2, min_duration=5),
+            [[0, 10], [40]],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()